@@ -0,0 +1,470 @@
+# Ekstrak arsip (.zip/.tar.*) sambil streaming, setiap member di-upload sebagai file Drive sendiri
+
+import io
+import time
+import asyncio
+import logging
+import tarfile
+import zipfile
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests # type: ignore
+from drive_uploader import resumable_upload, drive_api
+from drive_source import DriveFolderTree
+from source_stream import SourceStream
+from downloader import _get_with_retry
+from bandwidth import bandwidth_manager
+from config import ArchiveConfig, DownloadConfig, GoogleDriveConfig, ErrorMessages
+
+logger = logging.getLogger(__name__)
+
+class ExtractCancelled(Exception):
+    """Ekstraksi dihentikan oleh user"""
+    pass
+
+def archive_kind(filename):
+    """Kembalikan 'zip' / 'tar' sesuai ekstensi, None jika bukan arsip yang didukung"""
+    name = (filename or '').lower()
+    if name.endswith(ArchiveConfig.ZIP_EXTENSIONS):
+        return 'zip'
+    if name.endswith(ArchiveConfig.TAR_EXTENSIONS):
+        return 'tar'
+    return None
+
+def _archive_stem(filename):
+    """Nama folder hasil ekstrak: nama arsip tanpa ekstensi"""
+    name = filename or 'archive'
+    for ext in sorted(ArchiveConfig.ZIP_EXTENSIONS + ArchiveConfig.TAR_EXTENSIONS, key=len, reverse=True):
+        if name.lower().endswith(ext):
+            return name[:-len(ext)] or name
+    return name
+
+def _split_member_path(name):
+    """Pecah path member jadi (folder, nama file), buang komponen kosong, '.' dan '..'"""
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.', '..')]
+    if not parts:
+        return None, None
+    return tuple(parts[:-1]), parts[-1]
+
+class _SourceReader(io.RawIOBase):
+    """File-like read-only di atas SourceStream untuk tarfile mode stream ('r|*')"""
+
+    def __init__(self, source, on_chunk):
+        self._chunks = source.iter_chunks(DownloadConfig.READ_BLOCK_SIZE_KB * 1024)
+        # Buffer dibaca dari offset _pos, bukan diiris ulang setiap read (tarfile membaca per 512 byte)
+        self._buffer = bytearray()
+        self._pos = 0
+        self._on_chunk = on_chunk
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) - self._pos < size:
+            chunk = next(self._chunks, b'')
+            if not chunk:
+                break
+            self._on_chunk(len(chunk))
+            # Buang bagian yang sudah terbaca hanya saat menambah chunk baru
+            del self._buffer[:self._pos]
+            self._pos = 0
+            self._buffer += chunk
+        end = len(self._buffer) if size < 0 else min(self._pos + size, len(self._buffer))
+        with memoryview(self._buffer) as view:
+            data = bytes(view[self._pos:end])
+        self._pos = end
+        return data
+
+class _RangeReader(io.RawIOBase):
+    """
+    File-like seekable di atas HTTP Range untuk zipfile. Bagian akhir file (central
+    directory) di-cache dan dibagi antar reader, selebihnya dibaca per blok RANGE_BLOCK_SIZE_KB.
+    """
+
+    def __init__(self, url, size, tail, on_fetch):
+        self.url = url
+        self.size = size
+        self.tail_start, self.tail = tail
+        self._pos = 0
+        self._block_start = 0
+        self._block = b''
+        self._on_fetch = on_fetch
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._pos = max(0, min(offset, self.size))
+        return self._pos
+
+    def _fill(self, pos, size):
+        end = min(self.tail_start, pos + max(size, ArchiveConfig.RANGE_BLOCK_SIZE_KB * 1024))
+        self._on_fetch(end - pos)
+        self._block = fetch_range(self.url, pos, end)
+        self._block_start = pos
+
+    def read(self, size=-1):
+        if size < 0:
+            size = self.size - self._pos
+        size = min(size, self.size - self._pos)
+        parts = []
+        while size > 0:
+            if self._pos >= self.tail_start:
+                data = self.tail[self._pos - self.tail_start:self._pos - self.tail_start + size]
+            else:
+                # Bagian sebelum tail dibaca dari blok Range, tidak melewati awal tail yang sudah di-cache
+                wanted = min(size, self.tail_start - self._pos)
+                offset = self._pos - self._block_start
+                if not (0 <= offset < len(self._block)):
+                    self._fill(self._pos, wanted)
+                    offset = 0
+                data = self._block[offset:offset + wanted]
+            if not data:
+                break
+            parts.append(data)
+            self._pos += len(data)
+            size -= len(data)
+        return b''.join(parts)
+
+def fetch_range(url, start, end):
+    """GET bytes [start, end) dengan retry, raise jika server tidak membalas 206"""
+    for attempt in range(DownloadConfig.MAX_RETRIES):
+        try:
+            resp = requests.get(
+                url,
+                headers={'Range': f'bytes={start}-{end - 1}'},
+                allow_redirects=True,
+                timeout=(DownloadConfig.TIMEOUT, DownloadConfig.STALL_TIMEOUT)
+            )
+        except requests.RequestException as e:
+            if attempt < DownloadConfig.MAX_RETRIES - 1:
+                time.sleep(DownloadConfig.RETRY_DELAY_MULTIPLIER ** attempt)
+                continue
+            raise Exception(f"Gagal membaca range {start}-{end - 1}: {e}")
+        if resp.status_code != 206:
+            resp.close()
+            raise Exception(f"Server tidak mendukung Range (status {resp.status_code})")
+        return resp.content
+
+class _Pipe:
+    """Antrean chunk berbatas antara thread pembaca tar dan thread upload member"""
+
+    def __init__(self, max_chunks=2):
+        self._chunks = []
+        self._max_chunks = max_chunks
+        self._eof = False
+        self._aborted = False
+        self._cond = threading.Condition()
+        self._buffer = b''
+
+    def write(self, data):
+        with self._cond:
+            self._cond.wait_for(lambda: self._aborted or len(self._chunks) < self._max_chunks)
+            if not self._aborted:
+                self._chunks.append(data)
+                self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._eof = True
+            self._cond.notify_all()
+
+    def abort(self):
+        """Dipanggil sisi upload jika gagal agar pembaca tar tidak menunggu selamanya"""
+        with self._cond:
+            self._aborted = True
+            self._chunks.clear()
+            self._cond.notify_all()
+
+    def read(self, size):
+        while len(self._buffer) < size:
+            with self._cond:
+                self._cond.wait_for(lambda: self._chunks or self._eof)
+                if not self._chunks:
+                    break
+                self._buffer += self._chunks.pop(0)
+                self._cond.notify_all()
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+class ArchiveExtractor:
+    """
+    Ekstraksi satu arsip di thread terpisah. Thread pembaca menjalankan tarfile/zipfile,
+    upload member berjalan di ThreadPoolExecutor dengan MEMBER_CONCURRENCY slot sehingga
+    memori maksimal sekitar MEMBER_CONCURRENCY x (SMALL_FILE_THRESHOLD atau 2 chunk member).
+    Throttle bandwidth dan progress dijalankan di event loop lewat run_coroutine_threadsafe;
+    progress tidak ditunggu oleh thread pembaca (paling banyak satu laporan berjalan).
+    """
+
+    def __init__(self, url, info, loop, progress_callback, cancellation_event, user_id, bandwidth, destinations):
+        self.url = url
+        self.info = info
+        self.size = info.get('size') or 0
+        self.loop = loop
+        self.progress_callback = progress_callback
+        self.cancellation_event = cancellation_event
+        self.user_id = user_id
+        self.bandwidth = bandwidth
+        self.priority = bandwidth.priority_for(self.size)
+        self.destinations = destinations
+        self.trees = []
+        self.slots = threading.Semaphore(ArchiveConfig.MEMBER_CONCURRENCY)
+        self.lock = threading.Lock()
+        self.read_bytes = 0
+        self.uploaded = 0
+        self.failures = []
+        self.last_percent = -1
+        self.last_report_time = 0
+        self.pending_report = None
+        self.member_archives = []
+        self.start_time = time.time()
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def _check_cancel(self):
+        if self.cancellation_event and self.cancellation_event.is_set():
+            raise ExtractCancelled()
+
+    def _throttle(self, direction, nbytes):
+        self._call(self.bandwidth.throttle(direction, nbytes, self.user_id, self.priority))
+
+    def _on_read(self, nbytes):
+        """Dipanggil setiap ada byte arsip terbaca dari sumber"""
+        self._check_cancel()
+        self._throttle('download', nbytes)
+        with self.lock:
+            self.read_bytes += nbytes
+        self._report()
+
+    def _report(self):
+        if not self.progress_callback:
+            return
+        now = time.time()
+        with self.lock:
+            if self.size:
+                percent = min(99, int(self.read_bytes / self.size * 100))
+                if percent <= self.last_percent:
+                    return
+                self.last_percent = percent
+            else:
+                # Arsip tanpa Content-Length: progress byte + throughput per interval
+                if now - self.last_report_time < DownloadConfig.UNKNOWN_SIZE_PROGRESS_INTERVAL:
+                    return
+                self.last_report_time = now
+                percent = None
+            # Laporan sebelumnya belum selesai (mis. edit pesan lambat): lewati, jangan antre
+            if self.pending_report and not self.pending_report.done():
+                return
+            uploaded = self.uploaded
+        elapsed = now - self.start_time
+        self.pending_report = asyncio.run_coroutine_threadsafe(self.progress_callback(
+            percent,
+            downloaded=self.read_bytes,
+            total=self.size or None,
+            speed=self.read_bytes / elapsed if elapsed > 0 else 0,
+            elapsed=elapsed,
+            filename=f"{self.info.get('filename')} ({uploaded} file diekstrak)"
+        ), self.loop)
+        self.pending_report.add_done_callback(self._report_done)
+
+    def _report_done(self, future):
+        if not future.cancelled() and future.exception():
+            logger.warning(f"Gagal mengirim progress ekstraksi: {future.exception()}")
+
+    async def wait_report(self):
+        """Tunggu laporan progress terakhir agar tidak menimpa pesan selesai/gagal"""
+        if self.pending_report and not self.pending_report.done():
+            await asyncio.wait([asyncio.wrap_future(self.pending_report)])
+
+    def _upload_member(self, folder, name, size, fileobj):
+        """Upload satu member ke setiap tujuan (dijalankan di thread pool)"""
+        mime_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        parents = [tree.folder_for(folder) for tree in self.trees]
+        if size <= GoogleDriveConfig.SMALL_FILE_THRESHOLD:
+            data = fileobj.read(size) if size else b''
+            for parent_id in parents:
+                self._throttle('upload', len(data))
+                resumable_upload.multipart_upload(name, mime_type, data, parent_id)
+            return
+
+        sessions = [resumable_upload.init_session(name, mime_type, size, parent_id) for parent_id in parents]
+        chunk_size = ArchiveConfig.MEMBER_CHUNK_SIZE_MB * 1024 * 1024
+        while True:
+            self._check_cancel()
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            for session in sessions:
+                success, result = resumable_upload.upload_chunk(
+                    session, chunk, on_block=lambda nbytes: self._throttle('upload', nbytes)
+                )
+                if not success:
+                    raise Exception(result)
+
+    def _member_done(self, path, error):
+        with self.lock:
+            if error:
+                self.failures.append((path, error))
+            else:
+                self.uploaded += 1
+
+    def _run_member(self, path, folder, name, size, fileobj_factory, pipe=None):
+        try:
+            self._upload_member(folder, name, size, fileobj_factory())
+            self._member_done(path, None)
+        except ExtractCancelled:
+            self._member_done(path, "dibatalkan")
+        except Exception as e:
+            logger.error(f"Upload member {path} gagal: {e}")
+            self._member_done(path, str(e))
+        finally:
+            if pipe:
+                pipe.abort()
+            self.slots.release()
+
+    def _submit(self, pool, *args, pipe=None):
+        """Tunggu slot kosong lalu jalankan upload member di pool"""
+        while not self.slots.acquire(timeout=1):
+            self._check_cancel()
+        pool.submit(self._run_member, *args, pipe=pipe)
+
+    def _extract_tar(self, pool):
+        resp, error_msg = _get_with_retry(self.url)
+        if error_msg:
+            raise Exception(error_msg)
+        source = SourceStream(self.url, resp)
+        try:
+            with tarfile.open(fileobj=_SourceReader(source, self._on_read), mode='r|*') as tar:
+                count = 0
+                for member in tar:
+                    if not member.isfile():
+                        continue
+                    folder, name = _split_member_path(member.name)
+                    if not name:
+                        continue
+                    count += 1
+                    if count > ArchiveConfig.MAX_MEMBERS:
+                        raise Exception(f"Arsip berisi lebih dari {ArchiveConfig.MAX_MEMBERS} file")
+                    fileobj = tar.extractfile(member)
+                    if member.size <= GoogleDriveConfig.SMALL_FILE_THRESHOLD:
+                        data = fileobj.read()
+                        self._submit(pool, member.name, folder, name, member.size, lambda data=data: io.BytesIO(data))
+                        continue
+                    # Member besar dibaca berurutan dari stream tar dan dialirkan ke thread upload
+                    pipe = _Pipe()
+                    self._submit(pool, member.name, folder, name, member.size, lambda pipe=pipe: pipe, pipe=pipe)
+                    chunk_size = ArchiveConfig.MEMBER_CHUNK_SIZE_MB * 1024 * 1024
+                    try:
+                        while True:
+                            chunk = fileobj.read(chunk_size)
+                            if not chunk:
+                                break
+                            pipe.write(chunk)
+                    finally:
+                        # Selalu tutup agar thread upload tidak menunggu selamanya saat pembacaan gagal
+                        pipe.close()
+        finally:
+            source.close()
+
+    def _extract_zip(self, pool):
+        if not self.size:
+            raise Exception("Ukuran zip tidak diketahui, ekstraksi zip membutuhkan Range")
+        tail_start = max(0, self.size - ArchiveConfig.TAIL_PREFETCH_KB * 1024)
+        self._on_read(self.size - tail_start)
+        tail = (tail_start, fetch_range(self.url, tail_start, self.size))
+
+        with zipfile.ZipFile(_RangeReader(self.url, self.size, tail, self._on_read)) as archive:
+            if archive.start_dir < tail_start:
+                # Central directory lebih besar dari prefetch, ambil utuh sekali agar bisa dibagi antar thread
+                self._on_read(tail_start - archive.start_dir)
+                tail = (archive.start_dir, fetch_range(self.url, archive.start_dir, tail_start) + tail[1])
+            members = [item for item in archive.infolist() if not item.is_dir()]
+        if len(members) > ArchiveConfig.MAX_MEMBERS:
+            raise Exception(f"Arsip berisi lebih dari {ArchiveConfig.MAX_MEMBERS} file")
+
+        # Setiap thread upload punya ZipFile sendiri (buffer Range sendiri), central directory dari cache
+        local = threading.local()
+
+        def open_member(item):
+            if not hasattr(local, 'archive'):
+                local.archive = zipfile.ZipFile(_RangeReader(self.url, self.size, tail, self._on_read))
+                with self.lock:
+                    self.member_archives.append(local.archive)
+            return local.archive.open(item)
+
+        for item in members:
+            folder, name = _split_member_path(item.filename)
+            if name:
+                self._submit(pool, item.filename, folder, name, item.file_size, lambda item=item: open_member(item))
+
+    def run(self):
+        """Jalankan ekstraksi (blocking), kembalikan (folder_ids, jumlah file, failures)"""
+        stem = _archive_stem(self.info.get('filename'))
+        for parent_id in self.destinations:
+            self.trees.append(DriveFolderTree(drive_api.create_folder(stem, parent_id)['id']))
+
+        pool = ThreadPoolExecutor(ArchiveConfig.MEMBER_CONCURRENCY, thread_name_prefix='extract')
+        try:
+            if archive_kind(self.info.get('filename')) == 'zip':
+                self._extract_zip(pool)
+            else:
+                self._extract_tar(pool)
+        finally:
+            pool.shutdown(wait=True)
+            # ZipFile per thread hidup selama thread pool, tutup setelah semua upload selesai
+            for archive in self.member_archives:
+                archive.close()
+        self._check_cancel()
+        return [tree.root_id for tree in self.trees], self.uploaded, self.failures
+
+async def extract_archive_to_drive(url, info, progress_callback=None, cancellation_event=None, user_id=None, bandwidth=None, destinations=None):
+    """
+    Mirror arsip dalam mode ekstrak: setiap file di dalam arsip menjadi file Drive sendiri
+    di folder baru bernama arsip (struktur subfolder dipertahankan).
+    tar.* dibaca streaming dari sumber, zip dibaca lewat Range (central directory di akhir file).
+    """
+    extractor = ArchiveExtractor(
+        url, info, asyncio.get_running_loop(), progress_callback, cancellation_event,
+        user_id, bandwidth or bandwidth_manager, destinations or [None]
+    )
+    try:
+        folder_ids, uploaded, failures = await asyncio.to_thread(extractor.run)
+    except ExtractCancelled:
+        await extractor.wait_report()
+        if progress_callback:
+            await progress_callback(0, cancelled=True, message="Proses dihentikan oleh user")
+        return "Proses dihentikan oleh user"
+    except Exception as e:
+        await extractor.wait_report()
+        error_msg = f"{ErrorMessages.PROCESSING_ERROR}: {e}"
+        logger.exception(error_msg)
+        if progress_callback:
+            await progress_callback(0, error=str(e))
+        return error_msg
+
+    await extractor.wait_report()
+    if failures and not uploaded:
+        error_msg = f"{ErrorMessages.UPLOAD_FAILED}: " + "; ".join(f"{path}: {error}" for path, error in failures[:5])
+        if progress_callback:
+            await progress_callback(0, error=error_msg)
+        return error_msg
+
+    if progress_callback:
+        await progress_callback(100, done=True)
+    success_msg = f"Berhasil ekstrak {uploaded} file ke Google Drive! Folder ID: {', '.join(folder_ids)}"
+    if failures:
+        success_msg += f" | {len(failures)} file gagal: " + "; ".join(f"{path}: {error}" for path, error in failures[:5])
+    logger.info(success_msg)
+    return success_msg
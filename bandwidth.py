@@ -0,0 +1,192 @@
+# Pembatasan bandwidth dengan token bucket (global, per user, dan kelas prioritas)
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from config import BandwidthConfig, DownloadConfig
+
+logger = logging.getLogger(__name__)
+
+DIRECTIONS = ('download', 'upload')
+
+# Kelas prioritas, angka kecil = prioritas lebih tinggi
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+class TokenBucket:
+    """
+    Token bucket dengan model hutang: reserve() selalu mengurangi token dan
+    mengembalikan berapa detik pemanggil harus menunggu. rate 0 berarti tanpa batas.
+    """
+
+    def __init__(self, rate):
+        self.rate = 0
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        """Ubah rate (bytes/detik) saat runtime"""
+        self._refill()
+        self.rate = max(0, int(rate or 0))
+        self.tokens = min(self.tokens, self.capacity) if self.rate else 0.0
+
+    @property
+    def capacity(self):
+        return self.rate * BandwidthConfig.BURST_SECONDS
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, nbytes):
+        """Ambil nbytes token, kembalikan waktu tunggu (detik)"""
+        if not self.rate:
+            return 0
+        self._refill()
+        self.tokens -= nbytes
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+class BandwidthManager:
+    """
+    Mengatur pembagian bandwidth download/upload antar job.
+    - Batas global per arah (download/upload)
+    - Batas per user (default dari config, bisa di-override per user)
+    - Kelas prioritas: job prioritas rendah menunggu selama ada job prioritas
+      lebih tinggi yang sedang antre di bucket global
+    """
+
+    def __init__(self):
+        self._global = {
+            'download': TokenBucket(BandwidthConfig.GLOBAL_DOWNLOAD_LIMIT),
+            'upload': TokenBucket(BandwidthConfig.GLOBAL_UPLOAD_LIMIT),
+        }
+        self._user_limits = {}
+        self._user_buckets = {}
+        self._waiting = Counter()
+        self._condition = None
+
+    @staticmethod
+    def priority_for(size):
+        """Tentukan kelas prioritas dari ukuran file (file kecil didahulukan)"""
+        if size and size <= BandwidthConfig.HIGH_PRIORITY_MAX_BYTES:
+            return PRIORITY_HIGH
+        if not size or size >= BandwidthConfig.LOW_PRIORITY_MIN_BYTES:
+            return PRIORITY_LOW
+        return PRIORITY_NORMAL
+
+    def set_global_limit(self, rate, direction=None):
+        """Ubah batas global (bytes/detik, 0 = tanpa batas) untuk satu atau semua arah"""
+        for d in ([direction] if direction else DIRECTIONS):
+            self._global[d].set_rate(rate)
+        logger.info(f"Batas bandwidth global {direction or 'semua arah'} diubah ke {rate} B/s")
+
+    def set_user_limit(self, user_id, rate):
+        """Ubah batas bandwidth satu user (None = kembali ke default config)"""
+        if rate is None:
+            self._user_limits.pop(user_id, None)
+        else:
+            self._user_limits[user_id] = rate
+        for d in DIRECTIONS:
+            bucket = self._user_buckets.get((user_id, d))
+            if bucket:
+                bucket.set_rate(self._user_rate(user_id))
+        logger.info(f"Batas bandwidth user {user_id} diubah ke {rate} B/s")
+
+    def get_limits(self):
+        """Snapshot batas yang sedang berlaku"""
+        return {
+            'global': {d: bucket.rate for d, bucket in self._global.items()},
+            'per_user_default': BandwidthConfig.PER_USER_LIMIT,
+            'users': dict(self._user_limits),
+        }
+
+    def is_limited(self, direction, user_id=None):
+        """True jika ada batas global atau per user yang berlaku untuk arah ini"""
+        return bool(self._global[direction].rate or (user_id is not None and self._user_rate(user_id)))
+
+    def _user_rate(self, user_id):
+        return self._user_limits.get(user_id, BandwidthConfig.PER_USER_LIMIT)
+
+    def _user_bucket(self, user_id, direction):
+        key = (user_id, direction)
+        if key not in self._user_buckets:
+            self._user_buckets[key] = TokenBucket(self._user_rate(user_id))
+        return self._user_buckets[key]
+
+    def _get_condition(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _has_higher_waiting(self, priority):
+        return any(count for p, count in self._waiting.items() if p < priority)
+
+    async def throttle(self, direction, nbytes, user_id=None, priority=PRIORITY_NORMAL):
+        """Tunggu sampai nbytes boleh dikirim/diterima sesuai batas yang berlaku"""
+        if user_id is not None:
+            wait = self._user_bucket(user_id, direction).reserve(nbytes)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        bucket = self._global[direction]
+        if not bucket.rate:
+            return
+
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: not self._has_higher_waiting(priority))
+            self._waiting[priority] += 1
+            wait = bucket.reserve(nbytes)
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+        finally:
+            async with condition:
+                self._waiting[priority] -= 1
+                condition.notify_all()
+
+def thread_throttle(bandwidth, loop, direction, user_id=None, priority=PRIORITY_NORMAL):
+    """
+    Hook sinkron charge(nbytes) untuk thread pembaca/pengunggah: menunggu token dari
+    bandwidth.throttle() di event loop. Jangan dipanggil dari thread event loop itu sendiri.
+    """
+    def charge(nbytes):
+        asyncio.run_coroutine_threadsafe(bandwidth.throttle(direction, nbytes, user_id, priority), loop).result()
+    return charge
+
+class ThrottledBody:
+    """
+    Body request file-like di atas bytes yang memanggil on_block(nbytes) per blok
+    DownloadConfig.READ_BLOCK_SIZE_KB saat dibaca http.client, sehingga upload satu chunk
+    besar tetap mengikuti rate token bucket dan tidak dikirim penuh sekaligus.
+    """
+
+    def __init__(self, data, on_block):
+        self._view = memoryview(data)
+        self._pos = 0
+        self._charged = 0
+        self._on_block = on_block
+
+    def __len__(self):
+        return len(self._view)
+
+    def read(self, size=-1):
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._pos + size)
+        block_size = DownloadConfig.READ_BLOCK_SIZE_KB * 1024
+        while self._charged < end:
+            nbytes = min(block_size, len(self._view) - self._charged)
+            self._on_block(nbytes)
+            self._charged += nbytes
+        data = self._view[self._pos:end].tobytes()
+        self._pos = end
+        return data
+
+# Instance global yang dipakai downloader
+bandwidth_manager = BandwidthManager()
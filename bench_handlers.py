@@ -0,0 +1,268 @@
+# Load test layer handler Telegram: update sintetis ke Application terhadap Bot API tiruan
+# dengan latency dan batas flood (RetryAfter), mengukur latency handler, laju edit dan lag event loop
+
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import itertools
+from collections import Counter
+from fake_bot_api import FakeBotApi
+from config import JobConfig, WorkerConfig, LoadTestConfig
+
+BENCH_TOKEN = '123456:LOAD'
+SOURCE_NAME = 'source.bin'
+
+def percentiles(values):
+    """Ringkasan p50/p95/p99/max dalam milidetik (nearest rank)"""
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+
+    def rank(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+
+    return {'count': len(ordered), 'p50': rank(0.50), 'p95': rank(0.95), 'p99': rank(0.99),
+            'max': round(ordered[-1] * 1000, 2)}
+
+def bench_user(user_id):
+    return {'id': user_id, 'is_bot': False, 'first_name': f"Load{user_id}"}
+
+def message_update(update_id, user_id, text):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': int(time.time()), 'text': text,
+            'chat': {'id': user_id, 'type': 'private'}, 'from': bench_user(user_id)
+        }
+    }
+
+def callback_update(update_id, user_id, message_id, data):
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id), 'from': bench_user(user_id), 'chat_instance': str(user_id), 'data': data,
+            'message': {
+                'message_id': message_id, 'date': int(time.time()), 'text': 'bench',
+                'chat': {'id': user_id, 'type': 'private'}
+            }
+        }
+    }
+
+def make_synthetic_transfer(duration, step_interval):
+    """
+    Pengganti run_transfer: tidak ada download/upload, hanya progress_callback dengan pola
+    yang sama seperti downloader (progress berkala, lalu done/cancelled) agar yang diukur
+    murni layer handler dan pesan progress.
+    """
+    async def run_transfer(job, progress_callback, cancellation_event, pause=None):
+        info = job.get('info') or {}
+        size = info.get('size') or 0
+        steps = max(1, int(duration / step_interval))
+        start = time.monotonic()
+        for step in range(1, steps + 1):
+            if cancellation_event.is_set():
+                await progress_callback(0, cancelled=True, message="Proses dihentikan oleh user")
+                return None
+            if pause and pause.paused:
+                await pause.wait_resumed(cancellation_event)
+            await asyncio.sleep(step_interval)
+            elapsed = time.monotonic() - start
+            downloaded = size * step // steps
+            speed = downloaded / elapsed if elapsed else 0
+            await progress_callback(
+                step * 100 // steps, downloaded=downloaded, total=size, speed=speed,
+                eta=(size - downloaded) / speed if speed else None, elapsed=elapsed,
+                filename=info.get('filename', '')
+            )
+        await progress_callback(100, done=True)
+        return None
+
+    return run_transfer
+
+def timed_progress_callbacks(factory, samples):
+    """Bungkus make_progress_callback agar durasi setiap panggilan progress_callback tercatat"""
+    def make_progress_callback(bot, job_id):
+        callback = factory(bot, job_id)
+
+        async def progress_callback(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await callback(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        return progress_callback
+
+    return make_progress_callback
+
+async def monitor_loop_lag(samples, interval, stop):
+    """Catat keterlambatan bangun sleep(interval) sebagai lag event loop"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - start - interval))
+
+def edit_stats(api, since, duration):
+    """Jumlah dan laju editMessageText, plus edit terbanyak satu chat dalam satu detik"""
+    edits = [(at, params.get('chat_id')) for at, method, params in list(api.calls)
+             if method == 'editMessageText' and at >= since]
+    per_chat_second = Counter((chat_id, int(at - since)) for at, chat_id in edits)
+    return {
+        'total': len(edits),
+        'per_second': round(len(edits) / duration, 2) if duration else None,
+        'max_per_chat_second': max(per_chat_second.values(), default=0),
+    }
+
+async def run_load_test(args):
+    """Jalankan skenario mirror -> konfirmasi -> (stop) untuk args.users user dan kembalikan laporan"""
+    workdir = tempfile.mkdtemp(prefix='bench-handlers-')
+    with open(os.path.join(workdir, SOURCE_NAME), 'wb') as f:
+        f.truncate(args.file_size)
+    api = FakeBotApi(
+        args.api_port, files_dir=workdir, latency=args.latency, latency_jitter=args.latency_jitter,
+        chat_rate=args.chat_rate or None, global_rate=args.global_rate or None, retry_after=args.retry_after
+    ).start()
+
+    from runtime_config import env_name
+    os.environ.update(
+        TELEGRAM_TOKEN=BENCH_TOKEN,
+        TELEGRAM_API_URL=api.url,
+        JOB_STORE_URL=os.path.join(workdir, 'jobs.db'),
+        BOT_CONFIG_FILE=os.path.join(workdir, 'bot_config.json'),
+        LOG_LEVEL=os.getenv('LOG_LEVEL', 'WARNING'),
+    )
+    os.environ[env_name('ui.update_interval')] = str(args.update_interval)
+    # Transfer berjalan di proses ini (tanpa worker pool) dengan transfer sintetis
+    os.environ[WorkerConfig.PROCESS_COUNT_ENV] = '0'
+    import telegram_handler
+    from telegram import Update  # type: ignore
+
+    JobConfig.MAX_CONCURRENT_JOBS = args.max_jobs or args.users
+    progress_samples = []
+    telegram_handler.run_transfer = make_synthetic_transfer(args.transfer_seconds, args.progress_interval)
+    telegram_handler.make_progress_callback = timed_progress_callbacks(
+        telegram_handler.make_progress_callback, progress_samples
+    )
+
+    app = telegram_handler.build_application()
+    await app.initialize()
+    await telegram_handler.on_startup(app)
+    store = telegram_handler.job_store
+    outcomes = Counter()
+    finish_job = store.finish_job
+
+    def counting_finish_job(job_id, instance_id, status, result=None):
+        outcomes[status] += 1
+        return finish_job(job_id, instance_id, status, result)
+
+    store.finish_job = counting_finish_job
+
+    latencies = {'mirror': [], 'confirm': [], 'stop': []}
+    errors = Counter()
+
+    async def count_error(update, context):
+        # Exception yang lolos dari handler (mis. RetryAfter saat pesan fallback juga kena flood)
+        errors[type(context.error).__name__] += 1
+
+    app.add_error_handler(count_error)
+    update_ids = itertools.count(1)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    rng = random.Random(args.seed)
+    lag_samples = []
+    stop_lag = asyncio.Event()
+
+    async def send(kind, data):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await app.process_update(Update.de_json(data, app.bot))
+            except Exception as e:
+                errors[f"{kind}: {type(e).__name__}"] += 1
+            finally:
+                latencies[kind].append(time.perf_counter() - start)
+
+    async def user_session(index, user_id):
+        await asyncio.sleep(index * args.ramp / args.users)
+        url = f"{api.url}/file/bot{BENCH_TOKEN}/{SOURCE_NAME}?user={user_id}"
+        await send('mirror', message_update(next(update_ids), user_id, url))
+        pending = store.get_pending(user_id)
+        if not pending:
+            errors['mirror: tidak ada pending'] += 1
+            return False
+        await send('confirm', callback_update(next(update_ids), user_id, pending.confirm_message_id, 'confirm_yes'))
+        if store.get_pending(user_id):
+            errors['confirm: pending tidak diambil'] += 1
+            return False
+        if rng.random() < args.stop_fraction:
+            await asyncio.sleep(rng.uniform(0, args.transfer_seconds))
+            jobs = store.get_active_jobs(user_id)
+            if jobs:
+                await send('stop', callback_update(next(update_ids), user_id, pending.confirm_message_id, f"stop_mirror:{jobs[0]['id']}"))
+        return True
+
+    lag_task = asyncio.create_task(monitor_loop_lag(lag_samples, LoadTestConfig.LAG_INTERVAL, stop_lag))
+    started = time.perf_counter()
+    try:
+        confirmed = sum(await asyncio.gather(*(
+            user_session(index, args.base_user_id + index) for index in range(args.users)
+        )))
+        # Tunggu semua job yang dikonfirmasi selesai (done/cancelled/failed)
+        deadline = time.perf_counter() + args.timeout
+        while sum(outcomes.values()) < confirmed and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+        duration = time.perf_counter() - started
+    finally:
+        stop_lag.set()
+        await lag_task
+        await telegram_handler.on_shutdown(app)
+        for task in list(telegram_handler.running_jobs.values()):
+            task.cancel()
+        await app.shutdown()
+        api.stop()
+
+    return {
+        'users': args.users,
+        'concurrency': args.concurrency,
+        'max_jobs': JobConfig.MAX_CONCURRENT_JOBS,
+        'duration_seconds': round(duration, 3),
+        'handler_latency_ms': {kind: percentiles(values) for kind, values in latencies.items()},
+        'progress_callback_ms': percentiles(progress_samples),
+        'edit_message_text': edit_stats(api, started, duration),
+        'api_calls': dict(Counter(method for _, method, _ in api.calls)),
+        'flood_rejections': dict(Counter(method for _, method, _ in api.rejected)),
+        'event_loop_lag_ms': percentiles(lag_samples),
+        'jobs': {'confirmed': confirmed, **outcomes, 'unfinished': confirmed - sum(outcomes.values())},
+        'errors': dict(errors),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test handler mirror/konfirmasi/stop dan progress callback")
+    parser.add_argument('--users', type=int, default=100, help="jumlah user sintetis")
+    parser.add_argument('--concurrency', type=int, default=20, help="update yang diproses bersamaan")
+    parser.add_argument('--ramp', type=float, default=5.0, help="detik untuk memulai semua user")
+    parser.add_argument('--max-jobs', type=int, default=0, help="JobConfig.MAX_CONCURRENT_JOBS (0 = sebanyak user)")
+    parser.add_argument('--transfer-seconds', type=float, default=10.0, help="durasi transfer sintetis per job")
+    parser.add_argument('--progress-interval', type=float, default=0.1, help="detik antar progress_callback")
+    parser.add_argument('--update-interval', type=float, default=1.0, help="UIConfig.UPDATE_INTERVAL (detik)")
+    parser.add_argument('--stop-fraction', type=float, default=0.2, help="fraksi user yang menekan Stop")
+    parser.add_argument('--file-size', type=int, default=1024 * 1024, help="ukuran file sumber (byte)")
+    parser.add_argument('--latency', type=float, default=0.05, help="latency Bot API tiruan (detik)")
+    parser.add_argument('--latency-jitter', type=float, default=0.05, help="tambahan latency acak maksimal (detik)")
+    parser.add_argument('--chat-rate', type=int, default=LoadTestConfig.CHAT_RATE, help="batas panggilan/detik per chat (0 = tanpa batas)")
+    parser.add_argument('--global-rate', type=int, default=LoadTestConfig.GLOBAL_RATE, help="batas panggilan/detik total (0 = tanpa batas)")
+    parser.add_argument('--retry-after', type=int, default=LoadTestConfig.RETRY_AFTER, help="retry_after di jawaban 429 (detik)")
+    parser.add_argument('--api-port', type=int, default=LoadTestConfig.API_PORT, help="port Bot API tiruan")
+    parser.add_argument('--base-user-id', type=int, default=100000, help="user ID pertama")
+    parser.add_argument('--seed', type=int, default=1, help="seed pemilihan user yang menekan Stop")
+    parser.add_argument('--timeout', type=float, default=120.0, help="batas tunggu job selesai (detik)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load_test(args))
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
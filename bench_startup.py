@@ -0,0 +1,89 @@
+# Benchmark waktu start bot: dari proses dijalankan sampai webhook pertama dibalas
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+from fake_bot_api import FakeBotApi
+from config import StartupConfig
+
+def post_update(port, update_id, timeout=1.0):
+    """Kirim satu update /start ke webhook bot, kembalikan status HTTP (None jika belum listen)"""
+    update = {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': int(time.time()), 'text': '/start',
+            'chat': {'id': 1000, 'type': 'private'},
+            'from': {'id': 1000, 'is_bot': False, 'first_name': 'Bench'},
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}]
+        }
+    }
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/", data=json.dumps(update).encode(),
+        headers={'Content-Type': 'application/json'}, method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            return resp.status
+    except Exception:
+        return None
+
+def run_benchmark(budget, timeout):
+    """Jalankan bot terhadap Bot API tiruan dan ukur waktu start"""
+    api = FakeBotApi(StartupConfig.BENCH_API_PORT).start()
+    workdir = tempfile.mkdtemp(prefix='bench-startup-')
+    env = dict(
+        os.environ,
+        TELEGRAM_TOKEN='123456:BENCH',
+        WEBHOOK_URL=f"http://127.0.0.1:{StartupConfig.BENCH_BOT_PORT}/",
+        PORT=str(StartupConfig.BENCH_BOT_PORT),
+        TELEGRAM_API_URL=api.url,
+        JOB_STORE_URL=os.path.join(workdir, 'jobs.db'),
+        LOG_LEVEL='WARNING',
+    )
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'telegram_handler.py')
+
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, script], env=env, cwd=workdir)
+    webhook_ready = None
+    try:
+        update_id = 1
+        while time.perf_counter() - start < timeout and process.poll() is None:
+            if post_update(StartupConfig.BENCH_BOT_PORT, update_id) == 200:
+                webhook_ready = time.perf_counter() - start
+                break
+            update_id += 1
+            time.sleep(0.02)
+        first_reply_at = api.wait_for('sendMessage', timeout) if webhook_ready else None
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        api.stop()
+
+    return {
+        'webhook_ready_seconds': round(webhook_ready, 3) if webhook_ready else None,
+        'first_reply_seconds': round(first_reply_at - start, 3) if first_reply_at else None,
+        'budget_seconds': budget,
+        'within_budget': bool(webhook_ready and webhook_ready <= budget),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Ukur waktu start bot sampai webhook pertama dibalas")
+    parser.add_argument('--budget', type=float, default=StartupConfig.BUDGET_SECONDS, help="batas waktu (detik)")
+    parser.add_argument('--timeout', type=float, default=30.0, help="batas tunggu total (detik)")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.budget, args.timeout)
+    print(json.dumps(result, indent=2))
+    # Exit code non-zero agar bisa dipakai sebagai gate di CI
+    sys.exit(0 if result['within_budget'] else 1)
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,15 @@ class DownloadConfig:
     CHUNK_SIZE_MB = 50            # MB - ukuran chunk untuk streaming
     MAX_SPEED_SAMPLES = 10        # jumlah sample untuk hitung kecepatan
     RETRY_DELAY_MULTIPLIER = 2    # exponential backoff multiplier
+    SMALL_FILE_CONCURRENCY = 4    # jumlah file kecil yang diproses bersamaan dalam satu batch
+    MAX_BATCH_FILES = 20          # jumlah URL maksimal dalam satu pesan batch
+    BATCH_VALIDATION_CONCURRENCY = 4  # jumlah URL batch yang divalidasi bersamaan
+    READ_BLOCK_SIZE_KB = 256      # KB - ukuran blok baca dari sumber (granularitas watchdog)
+    STALL_TIMEOUT = 15            # detik - read timeout sebelum sumber dianggap stall
+    STALL_WINDOW = 10             # detik - window waktu baca untuk mengukur throughput
+    STALL_MIN_SPEED_KB = 64       # KB/s - di bawah ini sumber dibuka ulang (jika mendukung Range)
+    MAX_RECONNECTS = 5            # kali - maksimal reconnect sumber per job
+    UNKNOWN_SIZE_PROGRESS_INTERVAL = 2  # detik - interval progress (byte + throughput) untuk sumber tanpa ukuran
 
 class UIConfig:
     """Konfigurasi untuk tampilan UI"""
@@ -51,6 +60,9 @@ class TelegramConfig:
     MAX_FILE_SIZE_GB = 50         # GB - batas ukuran file Google Drive
     MESSAGE_EDIT_DELAY = 0.1      # detik - jeda edit pesan (anti-rate limit)
     CALLBACK_QUERY_TIMEOUT = 300  # detik - timeout untuk callback query
+    API_URL_ENV = 'TELEGRAM_API_URL'            # URL Bot API server (set ke server lokal untuk file > 20MB)
+    DEFAULT_API_URL = 'https://api.telegram.org'
+    CLOUD_DOWNLOAD_LIMIT = 20 * 1024 * 1024     # bytes - batas getFile di Bot API cloud
 
 class ErrorMessages:
     """Pesan error yang distandarisasi"""
@@ -62,6 +74,8 @@ class ErrorMessages:
     CANCELLATION_FAILED = "❌ Gagal menghentikan proses mirroring"
     CONFIRMATION_ERROR = "❌ Terjadi kesalahan saat memproses konfirmasi"
     NO_PENDING_PROCESS = "ℹ️ Tidak ada proses yang menunggu konfirmasi"
+    CONFIRMATION_EXPIRED = "⌛ Konfirmasi kedaluwarsa, kirim ulang URL untuk mirroring"
+    BATCH_TOO_LARGE = "❌ Terlalu banyak URL dalam satu pesan. Maksimal: {limit}"
     
     # Upload errors
     UPLOAD_FAILED = "📤 Gagal upload chunk ke Google Drive"
@@ -80,11 +94,23 @@ class SuccessMessages:
     CONFIRMATION_RECEIVED = "✅ Konfirmasi diterima"
     CONFIRMATION_CANCELLED = "❌ Konfirmasi dibatalkan"
     PROCESS_CANCELLED = "❌ Proses dibatalkan"
+    MIRRORING_PAUSED = "⏸ Mirroring dijeda, koneksi sumber dilepas"
+    MIRRORING_RESUMED = "▶️ Mirroring dilanjutkan"
 
 class LoggingConfig:
     """Konfigurasi untuk logging"""
     LEVEL = logging.INFO
     FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    LEVEL_ENV = 'LOG_LEVEL'                 # override level root (mis. DEBUG)
+    JSON_ENV = 'LOG_JSON'                   # '0' = format teks FORMAT, selain itu JSON per baris
+    MODULE_LEVELS_ENV = 'LOG_LEVELS'        # override per modul: 'downloader=DEBUG,httpx=INFO'
+    MODULE_LEVELS = {                       # library yang terlalu ramai di INFO
+        'httpx': 'WARNING',
+        'telegram': 'WARNING',
+        'urllib3': 'WARNING',
+    }
+    QUEUE_SIZE = 10000                      # record - antrean ke thread listener, penuh = record dibuang
+    SAMPLE_INTERVAL = 5.0                   # detik - event bertanda sample dicatat maksimal sekali per interval
     
     class Colors:
         """Warna untuk terminal logging (opsional)"""
@@ -105,6 +131,121 @@ class GoogleDriveConfig:
     UPLOAD_TIMEOUT = 300  # 5 menit untuk upload besar
     MAX_CHUNK_SIZE = 50 * 1024 * 1024  # 50MB per chunk (resumable upload)
     MAX_FILE_SIZE_BYTES = 10 * 1024 * 1024 * 1024  # 10GB maksimal ukuran file
+    SMALL_FILE_THRESHOLD = 5 * 1024 * 1024  # 5MB - di bawah ini pakai multipart upload (1 request)
+    COPY_CONCURRENCY = 8  # jumlah files.copy bersamaan saat copy folder server-side
+    MAX_DESTINATIONS = 5  # maksimal folder tujuan per job (fan-out)
+    FANOUT_QUEUE_CHUNKS = 2  # chunk antre per tujuan sebelum download menunggu tujuan paling lambat
+    DUPLICATE_POLICY_ENV = 'DRIVE_DUPLICATE_POLICY'  # skip | rename | allow - file bernama sama di folder tujuan
+    DEFAULT_DUPLICATE_POLICY = 'skip'  # skip = lewati jika nama+ukuran(+md5) sama, nama sama lainnya di-rename
+    SUBFOLDER_ENV = 'DRIVE_SUBFOLDER'  # template subfolder per job, mis. '{user_id}/{date}' (kosong = tanpa subfolder)
+    INDEX_CACHE_FILE = 'drive_index.json'  # cache indeks folder tujuan di disk
+    INDEX_REFRESH_INTERVAL = 30  # detik - jarak minimal antar sinkronisasi changes feed
+    NAME_RESERVATION_TTL = 6 * 3600  # detik - nama hasil rename dipesan di job store lintas proses worker
+
+class BandwidthConfig:
+    """Konfigurasi pembatasan bandwidth (0 = tanpa batas)"""
+    GLOBAL_DOWNLOAD_LIMIT = 0     # bytes/detik - batas download semua job
+    GLOBAL_UPLOAD_LIMIT = 0       # bytes/detik - batas upload semua job
+    PER_USER_LIMIT = 0            # bytes/detik - batas default per user (per arah)
+    BURST_SECONDS = 1             # detik - kapasitas bucket = rate * BURST_SECONDS
+    HIGH_PRIORITY_MAX_BYTES = 100 * 1024 * 1024       # file <= 100MB prioritas tinggi
+    LOW_PRIORITY_MIN_BYTES = 2 * 1024 * 1024 * 1024   # file >= 2GB prioritas rendah
+    REMOTE_GRANT_BATCH_KB = 4096  # KB - worker meminta token ke proses bot per batch ini, bukan per blok baca
+    REMOTE_LIMIT_RECHECK = 5      # detik - worker tanpa batas bandwidth mengecek ulang status batas
+
+class WorkerConfig:
+    """Konfigurasi proses worker transfer"""
+    PROCESS_COUNT_ENV = 'TRANSFER_WORKERS'  # env var jumlah proses worker
+    DEFAULT_PROCESS_COUNT = 0     # 0 = transfer berjalan di proses bot
+
+class JobConfig:
+    """Konfigurasi job store dan klaim job antar instance"""
+    STORE_URL_ENV = 'JOB_STORE_URL'       # env var lokasi store (sqlite:///path atau path)
+    DEFAULT_STORE_PATH = 'jobs.db'
+    DB_BUSY_TIMEOUT = 10          # detik - tunggu lock SQLite
+    LEASE_SECONDS = 60            # detik - masa berlaku lease job
+    HEARTBEAT_INTERVAL = 5        # detik - interval renew lease dan cek cancel
+    POLL_INTERVAL = 2             # detik - interval cek antrean job
+    MAX_CONCURRENT_JOBS = 4       # job berjalan bersamaan per instance
+    PENDING_TTL = 900             # detik - pending konfirmasi yang tidak dijawab dianggap ditinggalkan
+    FINISHED_JOB_RETENTION = 7 * 24 * 3600  # detik - job selesai disimpan di store selama ini
+    REAP_INTERVAL = 60            # detik - interval pembersihan pending, job selesai dan record lokal yatim
+
+class NetConfig:
+    """Konfigurasi lapisan koneksi HTTP: cache DNS dan Happy Eyeballs"""
+    ENABLED_ENV = 'HTTP_FAST_CONNECT'       # '0' = pakai koneksi bawaan urllib3
+    RESOLV_CONF = '/etc/resolv.conf'
+    DNS_TIMEOUT = 2.0             # detik - tunggu jawaban satu nameserver
+    DNS_MIN_TTL = 5               # detik - TTL minimal entri cache
+    DNS_MAX_TTL = 3600            # detik - TTL maksimal entri cache
+    DNS_FALLBACK_TTL = 60         # detik - TTL untuk hasil getaddrinfo (TTL asli tidak diketahui)
+    DNS_NEGATIVE_TTL = 10         # detik - cache nama yang tidak ada (NXDOMAIN)
+    DNS_CACHE_MAX_ENTRIES = 1000  # entri - batas cache, entri kedaluwarsa lalu tertua dibuang
+    CONNECT_ATTEMPT_DELAY = 0.25  # detik - jeda sebelum alamat berikutnya dicoba paralel (RFC 8305)
+    LATENCY_SAMPLES = 500         # sample latensi terakhir untuk persentil statistik
+
+class ResolverConfig:
+    """Konfigurasi resolver link hosting (GitHub, Dropbox, OneDrive, MediaFire, SourceForge)"""
+    DEFAULT_TTL = 600             # detik - TTL cache resolusi default
+    STATIC_TTL = 24 * 3600        # detik - resolusi yang hanya menulis ulang URL
+    PAGE_TTL = 300                # detik - resolusi dari halaman/API (link bertanda tangan cepat kedaluwarsa)
+    CACHE_MAX_ENTRIES = 1000      # entri - batas cache, entri kedaluwarsa lalu tertua dibuang
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+class ArchiveConfig:
+    """Konfigurasi mode ekstrak arsip (.zip/.tar.*) langsung ke Google Drive"""
+    ZIP_EXTENSIONS = ('.zip',)
+    TAR_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+    MEMBER_CONCURRENCY = 4        # upload member berjalan bersamaan
+    MEMBER_CHUNK_SIZE_MB = 8      # MB - chunk upload member besar (kelipatan 256KB)
+    RANGE_BLOCK_SIZE_KB = 1024    # KB - ukuran satu request Range saat membaca zip
+    TAIL_PREFETCH_KB = 256        # KB - bagian akhir zip yang diambil sekali (central directory)
+    MAX_MEMBERS = 5000            # batas jumlah file dalam satu arsip
+
+class CrawlConfig:
+    """Konfigurasi crawler direktori HTTP (autoindex Apache/nginx)"""
+    CONCURRENCY = 8               # halaman listing yang diambil bersamaan
+    PER_HOST_CONCURRENCY = 2      # request bersamaan maksimal ke satu host
+    HOST_DELAY = 0.25             # detik - jeda minimal antar request ke host yang sama
+    PROBE_CONCURRENCY = 8         # validasi (HEAD) file bersamaan
+    TRANSFER_CONCURRENCY = 2      # file yang di-mirror bersamaan
+    MAX_DEPTH = 10                # kedalaman subdirektori maksimal
+    MAX_PAGES = 500               # halaman listing maksimal per crawl
+    MAX_FILES = 2000              # file maksimal per crawl
+
+class ScheduleConfig:
+    """Konfigurasi mirror terjadwal (cron) dengan re-fetch kondisional"""
+    CHECK_INTERVAL = 30           # detik - interval cek jadwal yang jatuh tempo
+    MAX_RUNS_PER_CHECK = 2        # jadwal yang diproses per cek, sisanya menunggu cek berikutnya
+    RUN_SPACING = 5               # detik - jeda antar jadwal dalam satu cek
+    CLAIM_LEASE = 300             # detik - jadwal yang sedang diproses tidak diambil instance lain
+    JITTER_FRACTION = 0.1         # sebar waktu jalan hingga 10% interval cron (tetap per jadwal)
+    MAX_JITTER = 900              # detik - batas atas sebaran waktu jalan
+    RETRY_DELAY = 600             # detik - cek ulang setelah gagal (jika lebih cepat dari jadwal berikutnya)
+    MAX_PER_USER = 20             # jadwal maksimal per user
+
+class StartupConfig:
+    """Konfigurasi start bot: modul yang dimuat di background dan budget waktu start"""
+    WARM_UP_MODULES = ('validator', 'downloader', 'archive_extract', 'crawler')
+    BUDGET_SECONDS = 3.0          # detik - batas waktu start sampai webhook pertama dibalas
+    BENCH_BOT_PORT = 18080        # port webhook bot saat benchmark
+    BENCH_API_PORT = 18081        # port Bot API tiruan saat benchmark
+
+class LoadTestConfig:
+    """Konfigurasi load test layer handler Telegram (bench_handlers.py)"""
+    API_PORT = 18082              # port Bot API tiruan saat load test
+    CHAT_RATE = 3                 # panggilan/detik per chat sebelum 429 (±1/detik dengan burst pendek)
+    GLOBAL_RATE = 30              # panggilan/detik total sebelum 429
+    RETRY_AFTER = 1               # detik - retry_after di jawaban 429
+    LAG_INTERVAL = 0.05           # detik - interval sampling lag event loop
+    FILE_BLOCK_SIZE_KB = 64       # ukuran blok saat Bot API tiruan menyajikan file
+
+class RuntimeConfig:
+    """Konfigurasi runtime berlapis (default < file < environment < admin) dengan reload live"""
+    FILE_ENV = 'BOT_CONFIG_FILE'            # env var lokasi file JSON konfigurasi
+    DEFAULT_FILE = 'bot_config.json'
+    ENV_PREFIX = 'BOT_'                     # override environment: BOT_DOWNLOAD_CHUNK_SIZE_MB=32
+    RELOAD_INTERVAL = 10          # detik - interval cek perubahan file dan override admin
 
 # Export semua config untuk kemudahan import
 __all__ = [
@@ -114,5 +255,16 @@ __all__ = [
     'ErrorMessages',
     'SuccessMessages',
     'LoggingConfig',
-    'GoogleDriveConfig'
+    'GoogleDriveConfig',
+    'BandwidthConfig',
+    'WorkerConfig',
+    'JobConfig',
+    'NetConfig',
+    'ResolverConfig',
+    'ArchiveConfig',
+    'CrawlConfig',
+    'ScheduleConfig',
+    'StartupConfig',
+    'LoadTestConfig',
+    'RuntimeConfig'
 ]
\ No newline at end of file
@@ -0,0 +1,262 @@
+# Crawler direktori HTTP (autoindex Apache/nginx) dan mirror isinya ke Google Drive
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse, urldefrag, unquote
+from drive_uploader import drive_api
+from drive_source import DriveFolderTree
+from downloader import stream_download_to_drive
+from validator import validate_url_and_file
+from resolvers import http_fetch
+from bandwidth import bandwidth_manager
+from job_store import create_job_store
+from config import CrawlConfig, ErrorMessages
+
+logger = logging.getLogger(__name__)
+
+class _LinkParser(HTMLParser):
+    """Kumpulkan semua href dari tag <a> di halaman listing"""
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+
+class _HostLimiter:
+    """Politeness per host: batas request bersamaan dan jeda minimal antar request"""
+
+    def __init__(self):
+        self._semaphores = {}
+        self._next_slot = {}
+
+    @asynccontextmanager
+    async def slot(self, url):
+        host = urlparse(url).netloc.lower()
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(CrawlConfig.PER_HOST_CONCURRENCY))
+        async with semaphore:
+            # Reservasi waktu mulai agar request ke host yang sama berjarak HOST_DELAY
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, 0))
+            self._next_slot[host] = start + CrawlConfig.HOST_DELAY
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
+def _normalize_root(url):
+    url = urldefrag(url)[0]
+    return url if url.endswith('/') else url + '/'
+
+def parse_listing(page_url, html, root_url):
+    """
+    Ambil link file dan subdirektori dari halaman autoindex.
+    Hanya link di bawah root_url yang diikuti; link sort (?C=N;O=D), parent dan halaman itu sendiri dilewati.
+    Mengembalikan (dirs, files) berupa URL absolut.
+    """
+    parser = _LinkParser()
+    parser.feed(html)
+    dirs, files = [], []
+    for href in parser.links:
+        link = urldefrag(urljoin(page_url, href))[0]
+        if urlparse(link).query or not link.startswith(root_url) or link == page_url:
+            continue
+        (dirs if link.endswith('/') else files).append(link)
+    return dirs, files
+
+async def crawl_listing(root_url, fetch=None, limiter=None):
+    """
+    Telusuri listing direktori secara BFS dengan konkurensi terbatas.
+    Mengembalikan (files, errors): files berisi (path relatif, url) urut sesuai path.
+    """
+    root_url = _normalize_root(root_url)
+    fetch = fetch or http_fetch
+    limiter = limiter or _HostLimiter()
+    semaphore = asyncio.Semaphore(CrawlConfig.CONCURRENCY)
+    visited = {root_url}
+    files = {}
+    errors = []
+
+    async def visit(page_url, depth):
+        async with semaphore, limiter.slot(page_url):
+            try:
+                result = await asyncio.to_thread(fetch, page_url)
+            except Exception as e:
+                errors.append(f"{page_url}: {e}")
+                return []
+        if result.status_code != 200:
+            errors.append(f"{page_url}: status {result.status_code}")
+            return []
+        dirs, links = parse_listing(page_url, result.text, root_url)
+        for link in links:
+            files.setdefault(unquote(link[len(root_url):]), link)
+        if depth >= CrawlConfig.MAX_DEPTH:
+            return []
+        return [d for d in dirs if d not in visited]
+
+    level = [root_url]
+    depth = 0
+    while level:
+        if len(visited) > CrawlConfig.MAX_PAGES:
+            raise Exception(f"Direktori berisi lebih dari {CrawlConfig.MAX_PAGES} halaman listing")
+        results = await asyncio.gather(*(visit(url, depth) for url in level))
+        level = []
+        for found in results:
+            for url in found:
+                if url not in visited:
+                    visited.add(url)
+                    level.append(url)
+        depth += 1
+        if len(files) > CrawlConfig.MAX_FILES:
+            raise Exception(f"Direktori berisi lebih dari {CrawlConfig.MAX_FILES} file")
+
+    logger.info(f"Crawl {root_url}: {len(visited)} halaman, {len(files)} file")
+    return sorted(files.items()), errors
+
+async def probe_files(files, limiter=None):
+    """
+    Validasi semua file secara bersamaan (HEAD lewat validator, di thread) untuk ukuran dan
+    signature, dibatasi PROBE_CONCURRENCY dan politeness per host.
+    Mengembalikan (valid, rejected): valid berisi (path, info).
+    """
+    limiter = limiter or _HostLimiter()
+    semaphore = asyncio.Semaphore(CrawlConfig.PROBE_CONCURRENCY)
+
+    async def probe(path, url):
+        async with semaphore, limiter.slot(url):
+            return path, await validate_url_and_file(url)
+
+    valid, rejected = [], []
+    for path, (ok, info) in await asyncio.gather(*(probe(path, url) for path, url in files)):
+        if ok:
+            # Nama di Drive mengikuti nama di listing, bukan Content-Disposition
+            valid.append((path, dict(info, filename=path.split('/')[-1])))
+        else:
+            rejected.append((path, info.get('error') if isinstance(info, dict) else str(info)))
+    return valid, rejected
+
+def file_signature(info):
+    """Signature untuk deteksi perubahan pada crawl ulang (ukuran + ETag/Last-Modified)"""
+    return f"{info.get('size')}|{info.get('etag') or info.get('last_modified') or ''}"
+
+async def mirror_directory(url, progress_callback=None, cancellation_event=None, user_id=None, bandwidth=None, destinations=None, store=None, pause=None):
+    """
+    Mirror seluruh isi listing direktori ke Drive dengan struktur folder yang sama.
+    File yang signature-nya sama dengan manifest crawl sebelumnya dilewati.
+    pause: PauseControl opsional, berlaku di batas chunk file besar dan sebelum file berikutnya.
+    """
+    root_url = _normalize_root(url)
+    destinations = destinations or [None]
+    source_key = f"{root_url}|{','.join(d or '' for d in destinations)}"
+    limiter = _HostLimiter()
+
+    try:
+        store = store or await asyncio.to_thread(create_job_store)
+        files, crawl_errors = await crawl_listing(root_url, limiter=limiter)
+        if not files:
+            raise Exception("Tidak ada file di listing direktori" + (f" ({crawl_errors[0]})" if crawl_errors else ""))
+        valid, rejected = await probe_files(files, limiter)
+
+        manifest = await asyncio.to_thread(store.get_mirror_manifest, source_key)
+        todo = [(path, info) for path, info in valid
+                if manifest.get(path, {}).get('signature') != file_signature(info)]
+        skipped = len(valid) - len(todo)
+
+        # Folder root dan subfolder dari run sebelumnya dipakai ulang agar tidak dobel
+        root_name = unquote(urlparse(root_url).path.rstrip('/').split('/')[-1]) or urlparse(root_url).netloc
+        known = {tuple(p.rstrip('/').split('/')): e['ref'].split(',') for p, e in manifest.items()
+                 if e['signature'] == 'folder' and p}
+        roots = manifest[''].get('ref', '').split(',') if '' in manifest else []
+        trees = []
+        for index, parent_id in enumerate(destinations):
+            if len(roots) == len(destinations):
+                root_id = roots[index]
+            else:
+                root_id = (await asyncio.to_thread(drive_api.create_folder, root_name, parent_id))['id']
+            trees.append(DriveFolderTree(root_id, {path: ids[index] for path, ids in known.items() if len(ids) > index}))
+    except Exception as e:
+        error_msg = f"{ErrorMessages.PROCESSING_ERROR}: {e}"
+        logger.exception(error_msg)
+        if progress_callback:
+            await progress_callback(0, error=str(e))
+        return error_msg
+
+    semaphore = asyncio.Semaphore(CrawlConfig.TRANSFER_CONCURRENCY)
+    total_bytes = sum(info.get('size') or 0 for _, info in todo) or None
+    state = {'files': 0, 'bytes': 0, 'mirrored': 0}
+    failures = [(path, error) for path, error in rejected]
+    done_entries = {}
+    start_time = time.time()
+
+    async def transfer(path, info):
+        folder = tuple(path.split('/')[:-1])
+        async with semaphore:
+            if pause and pause.paused:
+                await pause.wait_resumed(cancellation_event)
+            if cancellation_event and cancellation_event.is_set():
+                return
+            parents = [await asyncio.to_thread(tree.folder_for, folder) for tree in trees]
+            result = await stream_download_to_drive(
+                info['url'], info, None, cancellation_event, user_id, bandwidth or bandwidth_manager, parents, pause
+            )
+        if result.startswith("Berhasil"):
+            done_entries[path] = {'signature': file_signature(info), 'ref': None}
+            state['mirrored'] += 1
+        else:
+            failures.append((path, result))
+        state['files'] += 1
+        state['bytes'] += info.get('size') or 0
+        if progress_callback and state['files'] < len(todo):
+            elapsed = time.time() - start_time
+            await progress_callback(
+                int(state['files'] / len(todo) * 100),
+                downloaded=state['bytes'],
+                total=total_bytes,
+                speed=state['bytes'] / elapsed if elapsed > 0 else 0,
+                elapsed=elapsed,
+                filename=f"{state['files']}/{len(todo)} file"
+            )
+
+    try:
+        # Exception satu file tidak menghentikan file lain, dicatat sebagai kegagalan file itu
+        results = await asyncio.gather(*(transfer(path, info) for path, info in todo), return_exceptions=True)
+        for (path, _), result in zip(todo, results):
+            if isinstance(result, Exception):
+                logger.error(f"Mirror {path} gagal: {result}")
+                failures.append((path, f"{ErrorMessages.PROCESSING_ERROR}: {type(result).__name__}"))
+    finally:
+        # Simpan manifest (juga saat dibatalkan): file sukses, folder yang dibuat dan root tiap tujuan
+        folders = [tree.folders for tree in trees]
+        for folder in folders[0]:
+            if folder:
+                done_entries['/'.join(folder) + '/'] = {
+                    'signature': 'folder', 'ref': ','.join(f.get(folder, '') for f in folders)
+                }
+        done_entries[''] = {'signature': 'folder', 'ref': ','.join(tree.root_id for tree in trees)}
+        await asyncio.to_thread(store.save_mirror_entries, source_key, done_entries)
+
+    if cancellation_event and cancellation_event.is_set():
+        if progress_callback:
+            await progress_callback(0, cancelled=True, message="Proses dihentikan oleh user")
+        return "Proses dihentikan oleh user"
+
+    summary = f"{state['mirrored']} file baru/berubah, {skipped} dilewati (tidak berubah), {len(failures)} gagal"
+    if failures and not state['mirrored'] and not skipped:
+        error_msg = f"{ErrorMessages.UPLOAD_FAILED}: {summary} - " + "; ".join(f"{p}: {e}" for p, e in failures[:5])
+        if progress_callback:
+            await progress_callback(0, error=error_msg)
+        return error_msg
+
+    if progress_callback:
+        await progress_callback(100, done=True)
+    success_msg = f"Berhasil mirror direktori: {summary}. Folder ID: {', '.join(tree.root_id for tree in trees)}"
+    if failures:
+        success_msg += " | Gagal: " + "; ".join(f"{p}: {e}" for p, e in failures[:5])
+    logger.info(success_msg)
+    return success_msg
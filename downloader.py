@@ -5,26 +5,30 @@ import logging
 import time
 import asyncio
 from drive_uploader import resumable_upload
+from source_stream import SourceStream, LocalFileStream
+from bandwidth import bandwidth_manager, thread_throttle
+from drive_source import copy_drive_source, direct_download_url
+from drive_index import drive_index, plan_destinations
+from telegram_source import resolve_telegram_file
 from utils import format_bytes, format_time, format_speed, calculate_eta
-from config import DownloadConfig, ErrorMessages
+from config import DownloadConfig, ErrorMessages, GoogleDriveConfig
 
 logger = logging.getLogger(__name__)  
 
-async def stream_download_to_drive(url, info, progress_callback=None, cancellation_event=None):
+def _get_with_retry(url, stream=True):
     """
-    Download streaming dengan chunking dan upload ke Google Drive
-    cancellation_event: asyncio.Event untuk cancellation
+    GET ke sumber dengan retry dan exponential backoff.
+    Mengembalikan (resp, None) jika sukses atau (None, error_msg) jika gagal.
     """
-    # Implementasi retry mechanism
     resp = None
     for attempt in range(DownloadConfig.MAX_RETRIES):
         try:
             logger.info(f"Mencoba download dari {url} (attempt {attempt + 1}/{DownloadConfig.MAX_RETRIES})")
             resp = requests.get(
                 url, 
-                stream=True, 
+                stream=stream, 
                 allow_redirects=True,
-                timeout=DownloadConfig.TIMEOUT
+                timeout=(DownloadConfig.TIMEOUT, DownloadConfig.STALL_TIMEOUT) if stream else DownloadConfig.TIMEOUT
             )
             
             if resp.status_code == 200:
@@ -44,30 +48,319 @@ async def stream_download_to_drive(url, info, progress_callback=None, cancellati
                 logger.warning(f"Timeout pada attempt {attempt + 1}, coba lagi...")
                 continue
             else:
-                error_msg = ErrorMessages.TIMEOUT_ERROR
-                logger.error(error_msg)
-                if progress_callback:
-                    await progress_callback(0, error=error_msg)
-                return error_msg
+                return None, ErrorMessages.TIMEOUT_ERROR
                 
         except requests.ConnectionError:
             if attempt < DownloadConfig.MAX_RETRIES - 1:
                 logger.warning(f"Connection error pada attempt {attempt + 1}, coba lagi...")
                 continue
             else:
-                error_msg = ErrorMessages.CONNECTION_ERROR
-                logger.error(error_msg)
-                if progress_callback:
-                    await progress_callback(0, error=error_msg)
-                return error_msg
+                return None, ErrorMessages.CONNECTION_ERROR
+
+        except requests.RequestException as e:
+            # Pesan exception memuat URL sumber (bisa berisi token bot), detail hanya ke log
+            logger.warning(f"Gagal membuka sumber: {e}")
+            return None, f"{ErrorMessages.CONNECTION_ERROR} ({type(e).__name__})"
     
     if not resp or resp.status_code != 200:
+        if resp is not None:
+            resp.close()
         error_msg = f"Gagal mengunduh file setelah {DownloadConfig.MAX_RETRIES} percobaan. Status: {resp.status_code if resp else 'No response'}"
+        return None, error_msg
+
+    return resp, None
+
+def is_small_file(info):
+    """Cek apakah file cukup kecil untuk fast path multipart upload"""
+    size = info.get('size')
+    return bool(size) and size <= GoogleDriveConfig.SMALL_FILE_THRESHOLD
+
+def _fetch_and_upload_small(url, mime_type, uploads):
+    """
+    Fast path sinkron: download seluruh body sekali lalu upload dengan satu request multipart
+    per tujuan. Dijalankan di thread terpisah agar tidak memblokir event loop.
+    uploads: list (folder_id, nama) dari plan_destinations. Mengembalikan (file_ids, failures).
+    """
+    resp, error_msg = _get_with_retry(url, stream=False)
+    if error_msg:
+        raise Exception(error_msg)
+    file_ids, failures = [], []
+    for folder_id, name in uploads:
+        try:
+            response = resumable_upload.multipart_upload(name, mime_type, resp.content, folder_id)
+            file_ids.append(response.get('id', 'Unknown'))
+            drive_index.record(folder_id, response.get('id'), name, len(resp.content))
+        except Exception as e:
+            failures.append((folder_id, str(e)))
+    return file_ids, failures
+
+def _format_result(file_ids, failures):
+    """Pesan hasil mirror untuk satu atau beberapa tujuan"""
+    if not failures and len(file_ids) == 1:
+        return f"Berhasil mirror ke Google Drive! File ID: {file_ids[0]}"
+    total = len(file_ids) + len(failures)
+    msg = f"Berhasil mirror ke {len(file_ids)}/{total} tujuan Google Drive! File ID: {', '.join(file_ids)}"
+    if failures:
+        msg += " | Gagal: " + "; ".join(f"{folder_id or 'default'}: {error}" for folder_id, error in failures)
+    return msg
+
+def _existing_result(file_ids):
+    """Pesan hasil jika file yang sama sudah ada di semua tujuan"""
+    return f"Berhasil: file sudah ada di Google Drive, upload dilewati. File ID: {', '.join(file_ids)}"
+
+async def small_file_to_drive(url, info, progress_callback=None, cancellation_event=None, user_id=None, bandwidth=None, destinations=None):
+    """
+    Mirror file kecil tanpa sesi resumable dan tanpa update progress per chunk.
+    """
+    filename = info.get('filename') or url.rstrip('/').split('/')[-1].split('?')[0]
+    mime_type = info.get('type', 'application/octet-stream')
+    destinations = destinations or [None]
+
+    if cancellation_event and cancellation_event.is_set():
+        if progress_callback:
+            await progress_callback(0, cancelled=True, message="Proses dihentikan oleh user")
+        return "Proses dihentikan oleh user"
+
+    try:
+        # File kecil diproses utuh, jadi kuota bandwidth diambil di depan untuk kedua arah
+        bandwidth = bandwidth or bandwidth_manager
+        size = info.get('size') or 0
+        priority = bandwidth.priority_for(size)
+        uploads, existing = await asyncio.to_thread(plan_destinations, destinations, filename, info.get('size'), info.get('md5'))
+        if not uploads:
+            if progress_callback:
+                await progress_callback(100, done=True)
+            return _existing_result(existing)
+        await bandwidth.throttle('download', size, user_id, priority)
+        await bandwidth.throttle('upload', size * len(uploads), user_id, priority)
+        file_ids, failures = await asyncio.to_thread(_fetch_and_upload_small, url, mime_type, uploads)
+        file_ids = existing + file_ids
+        if not file_ids:
+            raise Exception("; ".join(error for _, error in failures))
+    except Exception as e:
+        error_msg = f"{ErrorMessages.PROCESSING_ERROR}: {e}"
         logger.error(error_msg)
         if progress_callback:
-            await progress_callback(0, error=error_msg)
+            await progress_callback(0, error=str(e))
         return error_msg
-    
+
+    if progress_callback:
+        await progress_callback(100, done=True)
+
+    success_msg = _format_result(file_ids, failures)
+    logger.info(success_msg)
+    return success_msg
+
+class _Destination:
+    """
+    Satu tujuan fan-out: sesi resumable dengan antrean chunk berbatas dan task upload sendiri.
+    Antrean berbatas membuat download menunggu tujuan paling lambat (backpressure) sehingga
+    memori maksimal sekitar (FANOUT_QUEUE_CHUNKS + 1) chunk per tujuan, ditambah satu chunk
+    lookahead bersama untuk sumber tanpa ukuran.
+    Item antrean: (chunk, last) dengan last=True untuk chunk yang menutup sesi.
+    """
+
+    def __init__(self, folder_id, session, name=None, on_block=None):
+        self.folder_id = folder_id
+        self.session = session
+        self.name = name
+        self.on_block = on_block
+        self.queue = asyncio.Queue(maxsize=GoogleDriveConfig.FANOUT_QUEUE_CHUNKS)
+        self.error = None
+        self.final_response = None
+        self.task = None
+        self.closed = False
+
+    async def run(self):
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                self.closed = True
+                return
+            if self.error:
+                self.queue.task_done()
+                continue  # Tujuan gagal, buang sisa antrean tanpa menghentikan tujuan lain
+            chunk, last = item
+            try:
+                success, result = await asyncio.to_thread(resumable_upload.upload_chunk, self.session, chunk, last, self.on_block)
+            except Exception as e:
+                # Exception di luar upload_chunk (mis. token Drive gagal di-refresh): tandai gagal
+                # dan tetap kuras antrean agar producer tidak tertahan di queue.put
+                success, result = False, str(e)
+            finally:
+                self.queue.task_done()
+            if not success:
+                self.error = result
+                logger.error(f"Upload ke tujuan {self.folder_id or 'default'} gagal: {result}")
+            elif result:
+                self.final_response = result
+
+    def alive(self):
+        """
+        Tujuan masih menerima chunk. Task upload yang berhenti sebelum menerima penutup antrean
+        ikut dianggap gagal agar queue.put tidak menunggu selamanya.
+        """
+        if not self.error and not self.closed and self.task is not None and self.task.done():
+            self.error = "Task upload berhenti sebelum selesai"
+        return not self.error
+
+    async def flush(self):
+        """Tunggu semua chunk di antrean selesai di-upload (atau task upload berhenti)"""
+        joiner = asyncio.ensure_future(self.queue.join())
+        try:
+            await asyncio.wait({joiner, self.task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            joiner.cancel()
+
+async def mirror_small_batch(items, progress_callback=None, cancellation_event=None, user_id=None, bandwidth=None, destinations=None):
+    """
+    Mirror beberapa file kecil secara bersamaan (dibatasi SMALL_FILE_CONCURRENCY).
+    items: list of (url, info). Mengembalikan list (filename, success, message).
+    """
+    semaphore = asyncio.Semaphore(DownloadConfig.SMALL_FILE_CONCURRENCY)
+    total_files = len(items)
+    total_bytes = sum(info.get('size') or 0 for _, info in items)
+    start_time = time.time()
+    state = {'files': 0, 'bytes': 0}
+
+    async def run_one(url, info):
+        filename = info.get('filename') or url
+        async with semaphore:
+            if cancellation_event and cancellation_event.is_set():
+                return filename, False, "Proses dihentikan oleh user"
+            result = await stream_download_to_drive(
+                url, info, cancellation_event=cancellation_event, user_id=user_id, bandwidth=bandwidth, destinations=destinations
+            )
+        ok = result.startswith("Berhasil")
+        state['files'] += 1
+        state['bytes'] += info.get('size') or 0
+        if progress_callback and ok and state['files'] < total_files:
+            elapsed = time.time() - start_time
+            await progress_callback(
+                int(state['files'] / total_files * 100),
+                downloaded=state['bytes'],
+                total=total_bytes,
+                speed=state['bytes'] / elapsed if elapsed > 0 else 0,
+                elapsed=elapsed,
+                filename=f"{state['files']}/{total_files} file"
+            )
+        return filename, ok, result
+
+    results = await asyncio.gather(*(run_one(url, info) for url, info in items))
+
+    if cancellation_event and cancellation_event.is_set():
+        if progress_callback:
+            await progress_callback(0, cancelled=True, message="Proses dihentikan oleh user")
+        return results
+
+    failed = [(name, msg) for name, ok, msg in results if not ok]
+    if progress_callback:
+        if failed:
+            summary = "; ".join(f"{name}: {msg}" for name, msg in failed)
+            await progress_callback(0, error=f"{len(failed)}/{total_files} file gagal - {summary}")
+        else:
+            await progress_callback(100, done=True)
+    return results
+
+def current_chunk_size():
+    """
+    Ukuran chunk upload saat ini dari config (dibaca ulang di setiap batas chunk agar
+    perubahan /config berlaku untuk job berjalan), dibatasi GoogleDriveConfig.MAX_CHUNK_SIZE.
+    """
+    return min(DownloadConfig.CHUNK_SIZE_MB * 1024 * 1024, GoogleDriveConfig.MAX_CHUNK_SIZE)
+
+def _mark_last(chunks, size):
+    """
+    Pasangkan setiap chunk dengan flag chunk terakhir untuk Content-Range sesi resumable.
+    Ukuran diketahui: flag dihitung dari jumlah byte, tanpa menahan chunk.
+    Ukuran tidak diketahui: satu chunk ditahan (lookahead) sampai chunk berikutnya terbaca
+    atau sumber habis; sumber kosong menghasilkan satu chunk b'' untuk menutup sesi.
+    """
+    if size:
+        received = 0
+        for chunk in chunks:
+            received += len(chunk)
+            yield chunk, received >= size
+        return
+    held = None
+    for chunk in chunks:
+        if held is not None:
+            yield held, False
+        held = chunk
+    yield (held if held is not None else b''), True
+
+_END = object()
+
+async def _iter_in_thread(iterator):
+    """
+    Ambil item iterator sinkron satu per satu di thread, agar baca blok sumber (termasuk
+    reconnect dan watchdog stall) tidak memblokir event loop tempat heartbeat lease berjalan.
+    Item berikutnya baru diminta setelah item sebelumnya selesai diproses, sehingga
+    iterator tidak pernah dijalankan dua thread sekaligus.
+    """
+    while True:
+        item = await asyncio.to_thread(next, iterator, _END)
+        if item is _END:
+            return
+        yield item
+
+async def _pause_transfer(source, targets, pause, cancellation_event):
+    """
+    Pause di batas chunk: tunggu chunk yang sudah antre ter-commit di sesi resumable
+    setiap tujuan, lepas koneksi sumber, lalu tunggu resume. Memori yang tertahan hanya
+    sisa blok baca terakhir. Mengembalikan (resumed, durasi pause dalam detik).
+    """
+    paused_at = time.time()
+    await asyncio.gather(*(target.flush() for target in targets))
+    source.suspend()
+    committed = [target.session.get('sent_bytes', 0) for target in targets if not target.error]
+    logger.info(f"Transfer di-pause pada offset sumber {source.offset}, ter-commit di Drive: {committed}")
+    resumed = await pause.wait_resumed(cancellation_event)
+    if resumed:
+        logger.info(f"Transfer dilanjutkan dari offset {source.offset}")
+    return resumed, time.time() - paused_at
+
+async def stream_download_to_drive(url, info, progress_callback=None, cancellation_event=None, user_id=None, bandwidth=None, destinations=None, pause=None):
+    """
+    Download streaming dengan chunking dan upload ke Google Drive
+    cancellation_event: asyncio.Event untuk cancellation
+    user_id: pemilik job, dipakai untuk batas bandwidth per user
+    bandwidth: pengatur bandwidth (default bandwidth_manager, worker memakai proxy IPC)
+    destinations: list folder ID tujuan, setiap chunk di-tee ke semua tujuan (default FOLDER_ID)
+    pause: PauseControl opsional, dicek di setiap batas chunk
+    info['size'] None (sumber tanpa Content-Length) di-upload dengan total '*' sampai chunk terakhir,
+    progress dilaporkan dalam byte dan throughput dengan percent None.
+    """
+    destinations = destinations or [None]
+
+    # Link Google Drive: coba copy server-side dulu, tanpa lewat bandwidth bot
+    if info.get('drive_id'):
+        result = await copy_drive_source(info, progress_callback, cancellation_event, destinations)
+        if result is not None:
+            return result
+        logger.info("Copy server-side tidak diizinkan, fallback ke streaming")
+        url = direct_download_url(info['drive_id'])
+
+    # Dokumen Telegram: URL file diambil saat job berjalan (link getFile hanya berlaku sementara),
+    # Bot API server lokal (--local) mengembalikan path file di disk
+    local_path = None
+    if info.get('telegram_file_id'):
+        try:
+            url, local_path = await asyncio.to_thread(resolve_telegram_file, info['telegram_file_id'])
+        except Exception as e:
+            error_msg = f"{ErrorMessages.PROCESSING_ERROR}: {e}"
+            logger.error(error_msg)
+            if progress_callback:
+                await progress_callback(0, error=str(e))
+            return error_msg
+
+    # File kecil: lewati sesi resumable, cukup satu request multipart
+    if is_small_file(info) and not local_path:
+        return await small_file_to_drive(url, info, progress_callback, cancellation_event, user_id, bandwidth, destinations)
+
+    bandwidth = bandwidth or bandwidth_manager
+
     filename = info.get('filename') or url.rstrip('/').split('/')[-1].split('?')[0]
     size = info.get('size') 
     mime_type = info.get('type', 'application/octet-stream')
@@ -78,20 +371,63 @@ async def stream_download_to_drive(url, info, progress_callback=None, cancellati
         if progress_callback:
             await progress_callback(0, error=error_msg)
         return error_msg
-    
-    session = resumable_upload.init_session(filename, mime_type, size)
-    
+
+    # Cek duplikat di indeks folder tujuan sebelum membuka koneksi ke sumber
+    uploads, existing = await asyncio.to_thread(plan_destinations, destinations, filename, size, info.get('md5'))
+    if not uploads:
+        if progress_callback:
+            await progress_callback(100, done=True)
+        return _existing_result(existing)
+
+    # Bandwidth diambil per blok baca/kirim di thread transfer, bukan per chunk setelah
+    # chunk terbaca penuh, agar rate tetap rata dan tidak berupa burst selebar chunk
+    loop = asyncio.get_running_loop()
+    priority = bandwidth.priority_for(size)
+    read_throttle = thread_throttle(bandwidth, loop, 'download', user_id, priority)
+
+    source = None
+    targets = []
+    failures = []
     sent_bytes = 0
     last_percent_reported = 0
-    final_response = None
-    start_time = time.time()
-    speed_samples = []
-    
-    # Gunakan chunk size dari config
-    chunk_size_bytes = DownloadConfig.CHUNK_SIZE_MB * 1024 * 1024
-    
+    last_report_time = 0
+
+    # Pembukaan sumber dan sesi upload juga di dalam try agar stream dan task tujuan selalu dibereskan
     try:
-        for chunk in resp.iter_content(chunk_size=chunk_size_bytes):
+        if local_path:
+            source = LocalFileStream(local_path)
+        else:
+            # Implementasi retry mechanism (di thread: request dan backoff-nya sinkron)
+            resp, error_msg = await asyncio.to_thread(_get_with_retry, url)
+            if error_msg:
+                logger.error(error_msg)
+                if progress_callback:
+                    await progress_callback(0, error=error_msg)
+                return error_msg
+            source = SourceStream(url, resp)
+
+        # Satu sesi resumable per tujuan, tujuan yang gagal inisialisasi dicatat tanpa membatalkan yang lain
+        for folder_id, name in uploads:
+            try:
+                session = await asyncio.to_thread(resumable_upload.init_session, name, mime_type, size, folder_id)
+                targets.append(_Destination(folder_id, session, name, thread_throttle(bandwidth, loop, 'upload', user_id, priority)))
+            except Exception as e:
+                failures.append((folder_id, str(e)))
+        if not targets:
+            error_msg = f"{ErrorMessages.DRIVE_ERROR}: " + "; ".join(error for _, error in failures)
+            logger.error(error_msg)
+            if progress_callback:
+                await progress_callback(0, error=error_msg)
+            return error_msg
+
+        for target in targets:
+            target.task = asyncio.create_task(target.run())
+
+        start_time = time.time()
+        last_chunk_time = start_time
+        speed_samples = []
+
+        async for chunk, last in _iter_in_thread(_mark_last(source.iter_chunks(current_chunk_size, read_throttle), size)):
             # Cek apakah proses dibatalkan (async-safe)
             if cancellation_event and cancellation_event.is_set():
                 logger.info("Proses dibatalkan oleh user - cancellation event detected")
@@ -102,40 +438,46 @@ async def stream_download_to_drive(url, info, progress_callback=None, cancellati
             # Small delay untuk allow cancellation check
             await asyncio.sleep(0.001)
             
-            if chunk:
-                chunk_start_time = time.time()
-                success, result = resumable_upload.upload_chunk(session, chunk)
-                chunk_end_time = time.time()
-                
-                if not success:
-                    error_msg = f"{ErrorMessages.UPLOAD_FAILED}: {result}"
+            if chunk or last:
+                active = [target for target in targets if target.alive()]
+                if not active:
+                    error_msg = f"{ErrorMessages.UPLOAD_FAILED}: " + "; ".join(str(target.error) for target in targets)
+                    logger.error(error_msg)
+                    if progress_callback:
+                        await progress_callback(0, error=error_msg)
+                    return error_msg
+                if not size and sent_bytes + len(chunk) > GoogleDriveConfig.MAX_FILE_SIZE_BYTES:
+                    error_msg = f"File melebihi {format_bytes(GoogleDriveConfig.MAX_FILE_SIZE_BYTES)}, transfer dihentikan"
                     logger.error(error_msg)
                     if progress_callback:
                         await progress_callback(0, error=error_msg)
                     return error_msg
-                
-                if result:
-                    final_response = result
+
+                for target in active:
+                    if target.alive():
+                        await target.queue.put((chunk, last))
 
                 sent_bytes += len(chunk)
                 
-                # Calculate speed
-                chunk_time = chunk_end_time - chunk_start_time
-                if chunk_time > 0:
+                # Calculate speed (throughput end-to-end, termasuk menunggu tujuan paling lambat)
+                now = time.time()
+                chunk_time = now - last_chunk_time
+                last_chunk_time = now
+                if chunk_time > 0 and chunk:
                     chunk_speed = len(chunk) / chunk_time
                     speed_samples.append(chunk_speed)
                     if len(speed_samples) > DownloadConfig.MAX_SPEED_SAMPLES:
                         speed_samples.pop(0)
                 
                 avg_speed = sum(speed_samples) / len(speed_samples) if speed_samples else 0
-                elapsed_time = time.time() - start_time
+                elapsed_time = now - start_time
                 eta_seconds = calculate_eta(sent_bytes, size, avg_speed) if size and avg_speed > 0 else None
                 
                 if size and size > 0:
                     percent = int((sent_bytes / size) * 100)
                     if percent >= last_percent_reported + 1 or percent == 100:
                         last_percent_reported = percent
-                        logger.info(f"Progress: {percent}%")
+                        logger.info(f"Progress: {percent}%", extra={'sample': 'progress'})
                         if progress_callback:
                             await progress_callback(
                                     percent,
@@ -146,12 +488,55 @@ async def stream_download_to_drive(url, info, progress_callback=None, cancellati
                                     elapsed=elapsed_time,
                                     filename=filename
                                 )
+                elif now - last_report_time >= DownloadConfig.UNKNOWN_SIZE_PROGRESS_INTERVAL:
+                    # Ukuran tidak diketahui: laporkan byte diterima dan throughput saja
+                    last_report_time = now
+                    if progress_callback:
+                        await progress_callback(
+                            None,
+                            downloaded=sent_bytes,
+                            speed=avg_speed,
+                            elapsed=elapsed_time,
+                            filename=filename
+                        )
+
+            if pause and pause.paused:
+                resumed, paused_for = await _pause_transfer(source, targets, pause, cancellation_event)
+                if not resumed:
+                    logger.info("Proses dibatalkan oleh user saat pause")
+                    if progress_callback:
+                        await progress_callback(0, cancelled=True, message="Proses dihentikan oleh user")
+                    return "Proses dihentikan oleh user"
+                # Waktu pause tidak dihitung ke kecepatan dan run time
+                start_time += paused_for
+                last_chunk_time = time.time()
         
+        # Tunggu semua tujuan menyelesaikan antreannya
+        for target in targets:
+            # Tujuan yang gagal tetap menguras antrean, jadi penutup juga dikirim ke sana
+            if not target.task.done():
+                await target.queue.put(None)
+        await asyncio.gather(*(target.task for target in targets), return_exceptions=True)
+        # Task yang berhenti tanpa menerima penutup antrean dicatat sebagai gagal
+        succeeded = [target for target in targets if target.alive()]
+
+        file_ids = [(target.final_response or {}).get('id', 'Unknown') for target in succeeded]
+        failures += [(target.folder_id, target.error) for target in targets if target.error]
+        for target in succeeded:
+            if target.final_response:
+                drive_index.record(target.folder_id, target.final_response.get('id'), target.name, sent_bytes)
+        file_ids = existing + file_ids
+        if not file_ids:
+            error_msg = f"{ErrorMessages.UPLOAD_FAILED}: " + "; ".join(str(error) for _, error in failures)
+            logger.error(error_msg)
+            if progress_callback:
+                await progress_callback(0, error=error_msg)
+            return error_msg
+
         if progress_callback:
             await progress_callback(100, done=True)
         
-        file_id = final_response.get('id') if final_response else "Unknown"
-        success_msg = f"Berhasil mirror ke Google Drive! File ID: {file_id}"
+        success_msg = _format_result(file_ids, failures)
         logger.info(success_msg)
         return success_msg
 
@@ -161,4 +546,9 @@ async def stream_download_to_drive(url, info, progress_callback=None, cancellati
         if progress_callback:
             await progress_callback(0, error=str(e))
         return error_msg
-    return error_msg
\ No newline at end of file
+    finally:
+        for target in targets:
+            if target.task and not target.task.done():
+                target.task.cancel()
+        if source:
+            source.close()
@@ -0,0 +1,417 @@
+# Indeks lokal folder tujuan Drive: cek duplikat dan routing subfolder tanpa request API per job
+
+import os
+import json
+import time
+import logging
+import threading
+from drive_uploader import drive_api, DriveApiError, FOLDER_ID
+from job_store import create_job_store
+from config import GoogleDriveConfig
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_POLICIES = ('skip', 'rename', 'allow')
+
+class DriveIndex:
+    """
+    Cache in-memory (disimpan juga ke disk) isi folder tujuan beserta seluruh subfolder-nya.
+    Setiap root di-list sekali, setelah itu diperbarui bertahap dari Drive changes feed
+    paling sering sekali per INDEX_REFRESH_INTERVAL, sehingga cek "nama/ukuran/md5 sudah ada"
+    dan pencarian subfolder cukup dijawab dari memori.
+
+    Hanya folder eksplisit (DRIVE_FOLDER_ID atau folder tujuan job) yang diindeks; My Drive
+    tidak pernah di-list rekursif. Request API (listing, changes feed) berjalan di luar lock,
+    lock hanya dipegang saat membaca/mengubah struktur in-memory.
+
+    Setiap proses worker punya indeks sendiri, jadi pesanan nama unique_name() disimpan di
+    job store bersama (dibuat saat pertama dipakai), bukan di memori proses.
+    """
+
+    def __init__(self, cache_path=None, store=None):
+        self.cache_path = cache_path
+        self.entries = {}    # file_id -> {'name', 'size', 'md5', 'parent', 'folder'}
+        self.children = {}   # parent_id -> {nama: set(file_id)}
+        self.roots = set()
+        self.page_token = None
+        self.refreshed_at = 0
+        self._loaded = False
+        self._refreshing = False
+        self._lock = threading.RLock()
+        self._create_lock = threading.Lock()  # serialisasi pembuatan subfolder agar tidak dobel
+        self._store = store
+        self._store_lock = threading.Lock()
+
+    # -- penyimpanan ---------------------------------------------------------
+
+    def _load(self):
+        """Muat cache dari disk sekali per proses"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache indeks Drive {self.cache_path} tidak bisa dibaca: {e}")
+            return
+        self.page_token = data.get('page_token')
+        self.roots = set(data.get('roots', []))
+        for file_id, entry in data.get('entries', {}).items():
+            self._add(file_id, entry)
+        logger.info(f"Indeks Drive dimuat dari cache: {len(self.entries)} entri, {len(self.roots)} root")
+
+    def _save(self):
+        """Tulis cache secara atomik (beberapa proses worker bisa berbagi file yang sama)"""
+        if not self.cache_path:
+            return
+        data = {'page_token': self.page_token, 'roots': sorted(self.roots), 'entries': self.entries}
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Gagal menyimpan cache indeks Drive: {e}")
+
+    # -- struktur in-memory --------------------------------------------------
+
+    def _add(self, file_id, entry):
+        if file_id in self.entries:
+            self._unlink(file_id)
+        self.entries[file_id] = entry
+        self.children.setdefault(entry['parent'], {}).setdefault(entry['name'], set()).add(file_id)
+
+    def _unlink(self, file_id):
+        entry = self.entries.pop(file_id)
+        names = self.children.get(entry['parent'], {})
+        ids = names.get(entry['name'], set())
+        ids.discard(file_id)
+        if not ids:
+            names.pop(entry['name'], None)
+
+    def _remove(self, file_id):
+        """Hapus entri beserta isi folder-nya (jika folder)"""
+        if file_id not in self.entries:
+            return
+        for ids in list(self.children.pop(file_id, {}).values()):
+            for child_id in list(ids):
+                self._remove(child_id)
+        self._unlink(file_id)
+
+    def _is_tracked(self, folder_id):
+        entry = self.entries.get(folder_id)
+        return folder_id in self.roots or bool(entry and entry['folder'])
+
+    @staticmethod
+    def _entry(meta, parent_id):
+        return {
+            'name': meta['name'],
+            'size': int(meta['size']) if meta.get('size') else None,
+            'md5': meta.get('md5Checksum'),
+            'parent': parent_id,
+            'folder': meta.get('mimeType') == drive_api.FOLDER_MIME,
+        }
+
+    @classmethod
+    def _list_tree(cls, folder_id):
+        """
+        List rekursif isi folder lewat API (hanya saat root baru atau folder baru pindah masuk).
+        Tidak menyentuh indeks, dipanggil tanpa lock. Mengembalikan list (file_id, entry).
+        """
+        found = []
+        pending = [folder_id]
+        while pending:
+            current = pending.pop()
+            for meta in drive_api.list_children(current):
+                entry = cls._entry(meta, current)
+                found.append((meta['id'], entry))
+                if entry['folder']:
+                    pending.append(meta['id'])
+        return found
+
+    # -- API publik ----------------------------------------------------------
+
+    def track(self, folder_id=None):
+        """
+        Pastikan folder (default FOLDER_ID) masuk indeks. Mengembalikan ID folder, atau None
+        jika tujuan adalah root My Drive (tanpa DRIVE_FOLDER_ID): seluruh My Drive tidak diindeks.
+        """
+        folder_id = folder_id or FOLDER_ID
+        if not folder_id or folder_id == 'root':
+            return None
+        with self._lock:
+            self._load()
+            if self._is_tracked(folder_id):
+                return folder_id
+            page_token = self.page_token
+        if page_token is None:
+            # Ambil token sebelum listing agar perubahan selama listing tidak terlewat
+            page_token = drive_api.get_start_page_token()
+        start = time.time()
+        found = self._list_tree(folder_id)
+        with self._lock:
+            if self.page_token is None:
+                self.page_token = page_token
+                self.refreshed_at = time.time()
+            for file_id, entry in found:
+                self._add(file_id, entry)
+            self.roots.add(folder_id)
+            self._save()
+            logger.info(f"Folder Drive {folder_id} diindeks dalam {time.time() - start:.1f}s ({len(self.entries)} entri)")
+        return folder_id
+
+    def refresh(self, force=False):
+        """
+        Terapkan changes feed sejak sinkronisasi terakhir (dibatasi INDEX_REFRESH_INTERVAL).
+        Halaman changes diambil di luar lock; hanya satu thread yang refresh pada satu waktu,
+        thread lain langsung memakai data terakhir.
+        """
+        with self._lock:
+            self._load()
+            if self._refreshing or not self.page_token or not self.roots:
+                return 0
+            if not force and time.time() - self.refreshed_at < GoogleDriveConfig.INDEX_REFRESH_INTERVAL:
+                return 0
+            self._refreshing = True
+            page_token = self.page_token
+            roots = set(self.roots)
+        try:
+            changes, rebuilt = [], None
+            try:
+                while True:
+                    data = drive_api.list_changes(page_token)
+                    changes += data.get('changes', [])
+                    if data.get('newStartPageToken'):
+                        page_token = data['newStartPageToken']
+                        break
+                    page_token = data['nextPageToken']
+            except DriveApiError as e:
+                if e.status_code not in (400, 404):
+                    raise
+                # Page token kedaluwarsa/tidak valid: bangun ulang indeks dari awal
+                logger.warning(f"Page token changes feed tidak valid ({e.status_code}), indeks Drive dibangun ulang")
+                page_token = drive_api.get_start_page_token()
+                rebuilt = [(root, self._list_tree(root)) for root in roots]
+
+            moved_in = []
+            with self._lock:
+                if rebuilt is not None:
+                    # Root yang di-track selama rebuild ikut terhapus dan akan di-list ulang oleh track()
+                    self.entries, self.children, self.roots = {}, {}, set()
+                    for root, found in rebuilt:
+                        for file_id, entry in found:
+                            self._add(file_id, entry)
+                        self.roots.add(root)
+                    applied = len(self.entries)
+                else:
+                    applied = sum(self._apply_change(change, moved_in) for change in changes)
+                self.page_token = page_token
+                self.refreshed_at = time.time()
+
+            # Folder yang dipindah masuk bisa sudah berisi file
+            for folder_id in moved_in:
+                found = self._list_tree(folder_id)
+                with self._lock:
+                    if self._is_tracked(folder_id):
+                        for file_id, entry in found:
+                            self._add(file_id, entry)
+
+            if applied:
+                with self._lock:
+                    self._save()
+                logger.info(f"Indeks Drive diperbarui dari changes feed: {applied} perubahan")
+            return applied
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _apply_change(self, change, moved_in):
+        """
+        Terapkan satu perubahan, mengembalikan 1 jika indeks berubah. Folder baru yang
+        pindah masuk ditambahkan ke moved_in untuk di-list setelah lock dilepas.
+        """
+        file_id = change.get('fileId')
+        meta = change.get('file')
+        if change.get('removed') or not meta or meta.get('trashed'):
+            if file_id in self.entries:
+                self._remove(file_id)
+                return 1
+            return 0
+        parent_id = next((p for p in meta.get('parents', []) if self._is_tracked(p)), None)
+        if parent_id is None:
+            # Pindah keluar dari pohon yang diindeks
+            if file_id in self.entries:
+                self._remove(file_id)
+                return 1
+            return 0
+        known = file_id in self.entries
+        entry = self._entry(meta, parent_id)
+        self._add(file_id, entry)
+        if entry['folder'] and not known:
+            moved_in.append(file_id)
+        return 1
+
+    def find(self, folder_id, name, size=None, md5=None):
+        """
+        Cari file bernama name di folder_id (dari memori). Jika size/md5 diberikan,
+        hanya file dengan ukuran/md5 sama yang dianggap cocok. Mengembalikan (file_id, entry) atau None.
+        """
+        with self._lock:
+            for file_id in self.children.get(folder_id, {}).get(name, ()):
+                entry = self.entries[file_id]
+                if entry['folder']:
+                    continue
+                if size is not None and entry['size'] != size:
+                    continue
+                if md5 and entry['md5'] and entry['md5'] != md5:
+                    continue
+                return file_id, entry
+            return None
+
+    def _reservations(self):
+        """Job store untuk pesanan nama, dibuat sekali per proses saat pertama dibutuhkan"""
+        with self._store_lock:
+            if self._store is None:
+                self._store = create_job_store()
+            return self._store
+
+    def unique_name(self, folder_id, name):
+        """
+        Nama yang belum dipakai di folder: 'file.zip' -> 'file (1).zip', 'file (2).zip', ...
+        Nama yang dikembalikan dipesan di job store selama NAME_RESERVATION_TTL agar job paralel
+        ke folder yang sama, juga di proses worker lain yang indeksnya belum melihat file hasil
+        upload, tidak mendapat nama yang sama.
+        """
+        store = self._reservations()
+        ttl = GoogleDriveConfig.NAME_RESERVATION_TTL
+        reserved = store.reserved_names(folder_id, ttl)
+        stem, dot, ext = name.rpartition('.')
+        if not stem:
+            stem, dot, ext = name, '', ''
+        counter = 0
+        while True:
+            candidate = f"{stem} ({counter}){dot}{ext}" if counter else name
+            with self._lock:
+                taken = candidate in self.children.get(folder_id, {})
+            # Pesanan bisa kalah balapan dengan proses lain, lanjut ke nomor berikutnya
+            if not taken and candidate not in reserved and store.reserve_name(folder_id, candidate, ttl):
+                return candidate
+            counter += 1
+
+    def folder_for(self, parent_id, parts):
+        """
+        ID subfolder parent_id/parts[0]/parts[1]/... Folder yang sudah ada diambil dari
+        memori, hanya folder yang belum ada yang dibuat lewat API (sekali).
+        """
+        current = self.track(parent_id)
+        if current is None:
+            return self._folder_for_untracked(parent_id or FOLDER_ID or 'root', parts)
+        for name in parts:
+            with self._lock:
+                existing = next((file_id for file_id in self.children.get(current, {}).get(name, ())
+                                 if self.entries[file_id]['folder']), None)
+            if existing is None:
+                with self._create_lock:
+                    # Cek ulang: thread lain mungkin baru saja membuat folder yang sama
+                    with self._lock:
+                        existing = next((file_id for file_id in self.children.get(current, {}).get(name, ())
+                                         if self.entries[file_id]['folder']), None)
+                    if existing is None:
+                        existing = drive_api.create_folder(name, current)['id']
+                        with self._lock:
+                            self._add(existing, {'name': name, 'size': None, 'md5': None, 'parent': current, 'folder': True})
+                            self._save()
+            current = existing
+        return current
+
+    @staticmethod
+    def _folder_for_untracked(parent_id, parts):
+        """Subfolder di folder yang tidak diindeks (root My Drive): cari per level lewat API"""
+        current = parent_id
+        for name in parts:
+            existing = next((meta['id'] for meta in drive_api.list_children(current)
+                             if meta['name'] == name and meta.get('mimeType') == drive_api.FOLDER_MIME), None)
+            current = existing or drive_api.create_folder(name, current)['id']
+        return current
+
+    def record(self, folder_id, file_id, name, size=None, md5=None):
+        """
+        Catat file yang baru di-upload agar langsung terlihat tanpa menunggu changes feed.
+        Pesanan nama dari unique_name() tetap berlaku sampai kedaluwarsa untuk proses lain.
+        """
+        with self._lock:
+            folder_id = folder_id or FOLDER_ID
+            if file_id and self._is_tracked(folder_id):
+                self._add(file_id, {'name': name, 'size': size, 'md5': md5, 'parent': folder_id, 'folder': False})
+
+    def flush(self):
+        """Simpan cache ke disk"""
+        with self._lock:
+            self._save()
+
+drive_index = DriveIndex(GoogleDriveConfig.INDEX_CACHE_FILE)
+
+def duplicate_policy():
+    """Policy file bernama sama di folder tujuan (env DRIVE_DUPLICATE_POLICY)"""
+    policy = os.getenv(GoogleDriveConfig.DUPLICATE_POLICY_ENV, GoogleDriveConfig.DEFAULT_DUPLICATE_POLICY).lower()
+    return policy if policy in DUPLICATE_POLICIES else GoogleDriveConfig.DEFAULT_DUPLICATE_POLICY
+
+def plan_destinations(destinations, filename, size=None, md5=None):
+    """
+    Tentukan upload per folder tujuan berdasarkan indeks.
+    Mengembalikan (uploads, existing): uploads berisi (folder_id, nama) yang perlu di-upload,
+    existing berisi file ID yang sudah ada (nama+ukuran sama) sehingga dilewati.
+    Indeks yang gagal dibaca tidak menghalangi upload.
+    """
+    destinations = destinations or [None]
+    policy = duplicate_policy()
+    if policy == 'allow':
+        return [(folder_id, filename) for folder_id in destinations], []
+
+    uploads, existing = [], []
+    try:
+        drive_index.refresh()
+    except Exception as e:
+        logger.warning(f"Sinkronisasi indeks Drive gagal, memakai data terakhir: {e}")
+    for folder_id in destinations:
+        try:
+            real_id = drive_index.track(folder_id)
+            if real_id is None:
+                # Root My Drive tidak diindeks (set DRIVE_FOLDER_ID untuk cek duplikat)
+                uploads.append((folder_id, filename))
+                continue
+            match = drive_index.find(real_id, filename, size, md5) if size is not None or md5 else None
+            if match and policy == 'skip':
+                logger.info(f"{filename} sudah ada di folder {real_id} (file ID {match[0]}), upload dilewati")
+                existing.append(match[0])
+                continue
+            uploads.append((folder_id, drive_index.unique_name(real_id, filename)))
+        except Exception as e:
+            logger.warning(f"Cek duplikat {filename} di folder {folder_id or 'default'} gagal: {e}")
+            uploads.append((folder_id, filename))
+    return uploads, existing
+
+def subfolder_parts(user_id, template=None, now=None):
+    """Path subfolder dari template, mis. '{user_id}/{date}' -> ['12345', '2024-05-01']"""
+    template = os.getenv(GoogleDriveConfig.SUBFOLDER_ENV, '') if template is None else template
+    now = time.localtime(now)
+    path = template.format(
+        user_id=user_id if user_id is not None else 'unknown',
+        date=time.strftime('%Y-%m-%d', now),
+        year=time.strftime('%Y', now),
+        month=time.strftime('%m', now),
+    )
+    return [part.strip() for part in path.split('/') if part.strip()]
+
+def route_destinations(destinations, user_id):
+    """
+    Arahkan tujuan job ke subfolder per user/tanggal (env DRIVE_SUBFOLDER).
+    Subfolder dicari di indeks, hanya dibuat lewat API jika belum ada.
+    """
+    parts = subfolder_parts(user_id)
+    if not parts:
+        return destinations
+    return [drive_index.folder_for(folder_id, parts) for folder_id in destinations or [None]]
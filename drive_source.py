@@ -0,0 +1,156 @@
+# Sumber Google Drive: deteksi link, validasi lewat API dan copy server-side ke FOLDER_ID
+
+import re
+import asyncio
+import threading
+import logging
+from urllib.parse import urlparse, parse_qs
+from drive_uploader import drive_api, DriveApiError
+from config import GoogleDriveConfig, ErrorMessages
+
+logger = logging.getLogger(__name__)
+
+DRIVE_HOSTS = {'drive.google.com', 'docs.google.com', 'drive.usercontent.google.com'}
+_FOLDER_PATTERN = re.compile(r'/folders/([\w-]+)')
+_FILE_PATTERN = re.compile(r'/d/([\w-]+)')
+
+# Status Drive API yang berarti file tidak boleh/bisa dibaca oleh kredensial kita
+# (mis. scope drive.file, file privat, atau copyRequiresWriterPermission)
+COPY_NOT_PERMITTED_STATUSES = (403, 404)
+
+def parse_drive_url(url):
+    """Kembalikan ('file' | 'folder', id) untuk link Google Drive, None jika bukan link Drive"""
+    parsed = urlparse(url)
+    if parsed.netloc.lower() not in DRIVE_HOSTS:
+        return None
+    match = _FOLDER_PATTERN.search(parsed.path)
+    if match:
+        return 'folder', match.group(1)
+    match = _FILE_PATTERN.search(parsed.path)
+    if match:
+        return 'file', match.group(1)
+    ids = parse_qs(parsed.query).get('id')
+    if ids:
+        return 'file', ids[0]
+    return None
+
+def direct_download_url(file_id):
+    """URL download langsung untuk fallback streaming (file publik)"""
+    return f"https://drive.usercontent.google.com/download?id={file_id}&export=download&confirm=t"
+
+async def validate_drive_url(url, kind, file_id):
+    """
+    Validasi link Drive lewat API (tanpa HEAD ke server download).
+    Mengembalikan (is_valid, result_data), atau None jika file tidak bisa dibaca lewat API
+    sehingga validator harus fallback ke validasi HTTP biasa.
+    """
+    try:
+        meta = await asyncio.to_thread(drive_api.get_metadata, file_id)
+    except DriveApiError as e:
+        if e.status_code in COPY_NOT_PERMITTED_STATUSES:
+            logger.info(f"Link Drive {file_id} tidak bisa dibaca lewat API ({e.status_code}), fallback ke HTTP")
+            return None
+        return False, {"error": f"{ErrorMessages.DRIVE_ERROR}: {e}"}
+    except Exception as e:
+        return False, {"error": f"{ErrorMessages.DRIVE_ERROR}: {e}"}
+
+    is_folder = meta.get('mimeType') == drive_api.FOLDER_MIME
+    return True, {
+        'filename': meta['name'],
+        'size': int(meta['size']) if meta.get('size') else None,
+        'type': 'folder' if is_folder else meta.get('mimeType', 'application/octet-stream'),
+        'url': url,
+        'drive_id': file_id,
+        'drive_kind': 'folder' if is_folder else 'file'
+    }
+
+class DriveFolderTree:
+    """
+    Membuat struktur subfolder Drive di bawah root_id secara lazy dan thread-safe.
+    Folder yang sudah dibuat di-cache per path sehingga setiap folder hanya dibuat sekali.
+    """
+
+    def __init__(self, root_id, known=None):
+        self.root_id = root_id
+        self._folders = dict(known or {})
+        self._folders[()] = root_id
+        self._lock = threading.Lock()
+
+    @property
+    def folders(self):
+        """Snapshot path -> folder ID (termasuk yang sudah ada sebelumnya)"""
+        with self._lock:
+            return dict(self._folders)
+
+    def folder_for(self, parts):
+        """Kembalikan ID folder untuk path (tuple nama folder), buat jika belum ada"""
+        parts = tuple(parts)
+        with self._lock:
+            for depth in range(1, len(parts) + 1):
+                path = parts[:depth]
+                if path not in self._folders:
+                    self._folders[path] = drive_api.create_folder(path[-1], self._folders[path[:-1]])['id']
+            return self._folders[parts]
+
+async def _copy_folder(folder_id, name, parent_id, semaphore, cancellation_event, stats):
+    """Buat folder tujuan lalu copy isinya secara rekursif dengan konkurensi terbatas"""
+    target = await asyncio.to_thread(drive_api.create_folder, name, parent_id)
+    children = await asyncio.to_thread(drive_api.list_children, folder_id)
+
+    async def copy_child(child):
+        if cancellation_event and cancellation_event.is_set():
+            return
+        if child.get('mimeType') == drive_api.FOLDER_MIME:
+            await _copy_folder(child['id'], child['name'], target['id'], semaphore, cancellation_event, stats)
+            return
+        async with semaphore:
+            await asyncio.to_thread(drive_api.copy_file, child['id'], child['name'], target['id'])
+        stats['files'] += 1
+        stats['bytes'] += int(child.get('size') or 0)
+
+    await asyncio.gather(*(copy_child(child) for child in children))
+    return target['id']
+
+async def copy_drive_source(info, progress_callback=None, cancellation_event=None, destinations=None):
+    """
+    Copy server-side file/folder Drive ke FOLDER_ID (atau setiap folder di destinations)
+    tanpa melewati bandwidth bot. Mengembalikan pesan hasil, atau None jika copy file
+    tidak diizinkan (pemanggil lalu fallback ke streaming).
+    """
+    kind = info['drive_kind']
+    file_ids = []
+    try:
+        for parent_id in destinations or [None]:
+            if kind == 'folder':
+                stats = {'files': 0, 'bytes': 0}
+                semaphore = asyncio.Semaphore(GoogleDriveConfig.COPY_CONCURRENCY)
+                file_ids.append(await _copy_folder(info['drive_id'], info['filename'], parent_id, semaphore, cancellation_event, stats))
+                if cancellation_event and cancellation_event.is_set():
+                    if progress_callback:
+                        await progress_callback(0, cancelled=True, message="Proses dihentikan oleh user")
+                    return "Proses dihentikan oleh user"
+                logger.info(f"Copy folder selesai: {stats['files']} file, {stats['bytes']} bytes")
+            else:
+                result = await asyncio.to_thread(drive_api.copy_file, info['drive_id'], info['filename'], parent_id)
+                file_ids.append(result.get('id', 'Unknown'))
+    except DriveApiError as e:
+        if kind == 'file' and not file_ids and e.status_code in COPY_NOT_PERMITTED_STATUSES:
+            logger.info(f"Copy server-side tidak diizinkan untuk {info['drive_id']} ({e.status_code})")
+            return None
+        error_msg = f"{ErrorMessages.DRIVE_ERROR}: {e}"
+        logger.error(error_msg)
+        if progress_callback:
+            await progress_callback(0, error=error_msg)
+        return error_msg
+    except Exception as e:
+        error_msg = f"{ErrorMessages.DRIVE_ERROR}: {e}"
+        logger.exception(error_msg)
+        if progress_callback:
+            await progress_callback(0, error=error_msg)
+        return error_msg
+
+    if progress_callback:
+        await progress_callback(100, done=True)
+    success_msg = f"Berhasil copy server-side ke Google Drive! File ID: {', '.join(file_ids)}"
+    logger.info(success_msg)
+    return success_msg
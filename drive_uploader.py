@@ -1,9 +1,11 @@
 import os
 import json
+import uuid
 import logging
+import threading
 import requests
-from google.oauth2.credentials import Credentials as UserCredentials
-from google.auth.transport.requests import Request
+from bandwidth import ThrottledBody
+from config import GoogleDriveConfig, DownloadConfig
 
 logger = logging.getLogger(__name__)
 
@@ -14,32 +16,49 @@ SCOPES = ['https://www.googleapis.com/auth/drive.file']
 OAUTH_TOKEN_FILE = os.getenv('GOOGLE_OAUTH_TOKEN_FILE', 'token.json')
 FOLDER_ID = os.getenv('DRIVE_FOLDER_ID')
 
-# Muat kredensial user dari file token.json
+# Kredensial user dimuat saat pertama kali dibutuhkan (bukan saat import) agar start bot
+# tidak menunggu parsing token.json dan import stack google-auth
 user_creds = None
-if OAUTH_TOKEN_FILE and os.path.exists(OAUTH_TOKEN_FILE):
+_creds_lock = threading.Lock()
+
+def _load_credentials():
+    """Muat token.json sekali, dipanggil di bawah _creds_lock"""
+    global user_creds
+    if user_creds is not None:
+        return user_creds
+    if not (OAUTH_TOKEN_FILE and os.path.exists(OAUTH_TOKEN_FILE)):
+        logger.error(f"Token OAuth tidak ditemukan di path: {OAUTH_TOKEN_FILE}. Pastikan file ada dan env var GOOGLE_OAUTH_TOKEN_FILE dikonfigurasi.")
+        return None
+    from google.oauth2.credentials import Credentials as UserCredentials
     try:
         user_creds = UserCredentials.from_authorized_user_file(OAUTH_TOKEN_FILE, SCOPES)
         logger.info(f"Loaded OAuth token from {OAUTH_TOKEN_FILE}")
     except Exception as e:
         logger.error(f"Gagal memuat token OAuth dari {OAUTH_TOKEN_FILE}: {e}")
-else:
-    logger.error(f"Token OAuth tidak ditemukan di path: {OAUTH_TOKEN_FILE}. Pastikan file ada dan env var GOOGLE_OAUTH_TOKEN_FILE dikonfigurasi.")
+    return user_creds
 
 class resumable_upload:
     @staticmethod
     def _get_access_token():
         """
         Pastikan credentials user valid, refresh jika perlu, dan simpan kembali token ke file jika terjadi refresh.
+        Lock mencegah beberapa thread upload me-refresh token bersamaan.
         """
-        if not user_creds:
+        with _creds_lock:
+            return resumable_upload._get_access_token_locked()
+
+    @staticmethod
+    def _get_access_token_locked():
+        creds = _load_credentials()
+        if not creds:
             raise Exception("Credentials OAuth user tidak tersedia. Set GOOGLE_OAUTH_TOKEN_FILE ke token.json.")
 
-        creds = user_creds
         # Jika expired dan punya refresh token, refresh
         if not creds.valid:
             if creds.expired and creds.refresh_token:
                 try:
                     logger.info("Refreshing access token...")
+                    from google.auth.transport.requests import Request
                     creds.refresh(Request())
                     # Simpan kembali token yang sudah direfresh agar deployment memiliki token baru
                     try:
@@ -57,27 +76,28 @@ class resumable_upload:
         return creds.token
 
     @staticmethod
-    def init_session(filename, mime_type, size):
+    def init_session(filename, mime_type, size, parent_id=None):
         """
         Meminta sesi resumable upload ke Drive API. Mengembalikan dict session berisi upload_url dsb.
+        parent_id: folder tujuan (default FOLDER_ID)
         """
         access_token = resumable_upload._get_access_token()
         headers = {
             'Authorization': f'Bearer {access_token}',
             'Content-Type': 'application/json; charset=UTF-8'
         }
+        parent_id = parent_id or FOLDER_ID
         metadata = {
             'name': filename,
-            'parents': [FOLDER_ID] if FOLDER_ID else []
+            'parents': [parent_id] if parent_id else []
         }
 
         url = 'https://www.googleapis.com/upload/drive/v3/files?uploadType=resumable&supportsAllDrives=true'
         logger.info(f"Inisialisasi sesi upload untuk file: {filename}")
         logger.debug(f"Request URL: {url}")
-        logger.debug(f"Headers: {json.dumps(headers)}")
         logger.debug(f"Metadata: {json.dumps(metadata)}")
 
-        response = requests.post(url, headers=headers, data=json.dumps(metadata))
+        response = requests.post(url, headers=headers, data=json.dumps(metadata), timeout=DownloadConfig.TIMEOUT)
         logger.info(f"Init session response status: {response.status_code}")
         if response.status_code not in (200, 201):
             # Log body untuk debugging
@@ -88,7 +108,8 @@ class resumable_upload:
         if not upload_url:
             logger.error("Header 'Location' tidak ditemukan pada response inisialisasi sesi.")
             raise Exception("Header 'Location' tidak ditemukan pada response inisialisasi sesi upload.")
-        logger.info(f"Sesi upload berhasil. upload_url: {upload_url}")
+        logger.info(f"Sesi upload berhasil untuk file: {filename}")
+        logger.debug(f"upload_url: {upload_url}")
 
         return {
             'upload_url': upload_url,
@@ -98,44 +119,185 @@ class resumable_upload:
         }
 
     @staticmethod
-    def upload_chunk(session, chunk):
+    def upload_chunk(session, chunk, final=False, on_block=None):
         """
         Upload satu chunk ke upload_url sesi resumable.
+        Sesi tanpa ukuran (sumber tanpa Content-Length) memakai total '*' dan chunk selain
+        terakhir harus kelipatan 256 KB; final=True mengisi total dengan jumlah byte sebenarnya
+        sehingga Drive menutup upload (chunk kosong menjadi 'bytes */<total>').
+        on_block(nbytes): hook throttle sinkron yang dipanggil per blok saat body dikirim.
         Mengembalikan (True, response_json) jika upload selesai (200/201),
         (True, None) jika accepted partial (308), atau (False, error_msg) jika gagal.
         """
         access_token = resumable_upload._get_access_token()
         start = session.get('sent_bytes', 0)
         end = start + len(chunk) - 1
-        total_size = session.get('size')
-        total_field = str(total_size) if total_size else '*'
+        total_size = session.get('size') or None
+        if total_size is None and final:
+            total_size = start + len(chunk)
+        total_field = str(total_size) if total_size is not None else '*'
 
         headers = {
             'Authorization': f'Bearer {access_token}',
             'Content-Type': session.get('mime_type', 'application/octet-stream'),
             'Content-Length': str(len(chunk)),
-            'Content-Range': f'bytes {start}-{end}/{total_field}'
+            'Content-Range': f'bytes {start}-{end}/{total_field}' if chunk else f'bytes */{total_field}'
         }
 
         try:
-            response = requests.put(session['upload_url'], headers=headers, data=chunk)
+            body = ThrottledBody(chunk, on_block) if on_block and chunk else chunk
+            response = requests.put(session['upload_url'], headers=headers, data=body)
         except Exception as e:
             logger.exception(f"Network error saat upload chunk: {e}")
             return False, str(e)
 
-        logger.debug(f"Upload chunk response status: {response.status_code}")
+        logger.debug(f"Upload chunk response status: {response.status_code}", extra={'sample': 'upload_chunk'})
         if response.status_code in (200, 201):
             # Berhasil lengkap
-            session['sent_bytes'] = end + 1
+            session['sent_bytes'] = start + len(chunk)
             try:
                 return True, response.json()
             except Exception:
                 return True, None
         elif response.status_code == 308:
             # Incomplete, chunk diterima
-            session['sent_bytes'] = end + 1
+            session['sent_bytes'] = start + len(chunk)
             return True, None
         else:
             error_msg = f"Gagal upload chunk. Status: {response.status_code}, Response: {response.text}"
             logger.error(error_msg)
             return False, error_msg
+
+    @staticmethod
+    def multipart_upload(filename, mime_type, data, parent_id=None):
+        """
+        Upload file kecil dalam satu request multipart (tanpa sesi resumable).
+        Mengembalikan response_json dari Drive API, raise Exception jika gagal.
+        """
+        access_token = resumable_upload._get_access_token()
+        boundary = f"c2c-{uuid.uuid4().hex}"
+        parent_id = parent_id or FOLDER_ID
+        metadata = {
+            'name': filename,
+            'parents': [parent_id] if parent_id else []
+        }
+
+        body = (
+            f"--{boundary}\r\n"
+            "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+            f"{json.dumps(metadata)}\r\n"
+            f"--{boundary}\r\n"
+            f"Content-Type: {mime_type}\r\n\r\n"
+        ).encode('utf-8') + data + f"\r\n--{boundary}--\r\n".encode('utf-8')
+
+        headers = {
+            'Authorization': f'Bearer {access_token}',
+            'Content-Type': f'multipart/related; boundary={boundary}',
+            'Content-Length': str(len(body))
+        }
+
+        url = 'https://www.googleapis.com/upload/drive/v3/files?uploadType=multipart&supportsAllDrives=true'
+        logger.info(f"Multipart upload untuk file kecil: {filename} ({len(data)} bytes)")
+
+        response = requests.post(url, headers=headers, data=body, timeout=GoogleDriveConfig.UPLOAD_TIMEOUT)
+        if response.status_code not in (200, 201):
+            logger.error(f"Multipart upload failed: {response.status_code} - {response.text}")
+            raise Exception(f"Gagal multipart upload: {response.status_code} - {response.text}")
+
+        try:
+            return response.json()
+        except Exception:
+            return {}
+
+class DriveApiError(Exception):
+    """Error dari Drive API beserta status HTTP-nya"""
+    def __init__(self, status_code, message):
+        super().__init__(f"{status_code} - {message}")
+        self.status_code = status_code
+
+class drive_api:
+    """Operasi metadata Drive API v3 (get, copy, list, create folder, changes) dengan kredensial yang sama"""
+    BASE_URL = 'https://www.googleapis.com/drive/v3'
+    FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+    @staticmethod
+    def _request(method, path, params=None, body=None):
+        access_token = resumable_upload._get_access_token()
+        headers = {'Authorization': f'Bearer {access_token}'}
+        query = {'supportsAllDrives': 'true'}
+        query.update(params or {})
+        if body is not None:
+            headers['Content-Type'] = 'application/json; charset=UTF-8'
+        response = requests.request(
+            method,
+            f"{drive_api.BASE_URL}{path}",
+            headers=headers,
+            params=query,
+            data=json.dumps(body) if body is not None else None,
+            timeout=GoogleDriveConfig.UPLOAD_TIMEOUT
+        )
+        if response.status_code not in (200, 201):
+            raise DriveApiError(response.status_code, response.text)
+        return response.json()
+
+    @staticmethod
+    def get_metadata(file_id):
+        """Ambil nama, ukuran, mimeType dan md5 file/folder"""
+        return drive_api._request('GET', f'/files/{file_id}', {'fields': 'id,name,size,mimeType,md5Checksum'})
+
+    @staticmethod
+    def copy_file(file_id, name=None, parent_id=None):
+        """Copy server-side (files.copy) ke parent_id (default FOLDER_ID)"""
+        parent_id = parent_id or FOLDER_ID
+        body = {'parents': [parent_id] if parent_id else []}
+        if name:
+            body['name'] = name
+        logger.info(f"Copy server-side file {file_id} ke folder {parent_id}")
+        return drive_api._request('POST', f'/files/{file_id}/copy', {'fields': 'id,name,size'}, body)
+
+    @staticmethod
+    def create_folder(name, parent_id=None):
+        """Buat folder baru di parent_id (default FOLDER_ID)"""
+        parent_id = parent_id or FOLDER_ID
+        body = {'name': name, 'mimeType': drive_api.FOLDER_MIME, 'parents': [parent_id] if parent_id else []}
+        return drive_api._request('POST', '/files', {'fields': 'id,name'}, body)
+
+    @staticmethod
+    def get_start_page_token():
+        """Page token changes feed saat ini (titik awal sinkronisasi bertahap)"""
+        return drive_api._request('GET', '/changes/startPageToken')['startPageToken']
+
+    @staticmethod
+    def list_changes(page_token):
+        """
+        Satu halaman changes feed sejak page_token. Response berisi changes dan
+        nextPageToken (masih ada halaman) atau newStartPageToken (sudah sampai akhir).
+        """
+        return drive_api._request('GET', '/changes', {
+            'pageToken': page_token,
+            'fields': 'nextPageToken,newStartPageToken,'
+                      'changes(fileId,removed,file(id,name,size,mimeType,md5Checksum,parents,trashed))',
+            'pageSize': 1000,
+            'includeItemsFromAllDrives': 'true',
+            'spaces': 'drive'
+        })
+
+    @staticmethod
+    def list_children(folder_id):
+        """Daftar isi folder (semua halaman)"""
+        files = []
+        page_token = None
+        while True:
+            params = {
+                'q': f"'{folder_id}' in parents and trashed = false",
+                'fields': 'nextPageToken,files(id,name,size,mimeType,md5Checksum)',
+                'pageSize': 1000,
+                'includeItemsFromAllDrives': 'true'
+            }
+            if page_token:
+                params['pageToken'] = page_token
+            data = drive_api._request('GET', '/files', params)
+            files.extend(data.get('files', []))
+            page_token = data.get('nextPageToken')
+            if not page_token:
+                return files
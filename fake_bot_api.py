@@ -0,0 +1,222 @@
+# Bot API tiruan untuk benchmark dan pengujian lokal (TELEGRAM_API_URL=http://127.0.0.1:<port>)
+
+import os
+import re
+import json
+import time
+import random
+import itertools
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote
+from config import LoadTestConfig
+
+# Method yang terkena batas flood Telegram (pesan keluar per chat dan global)
+FLOOD_METHODS = frozenset(('sendMessage', 'editMessageText', 'editMessageReplyMarkup', 'deleteMessage'))
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def parse_range(header, size):
+    """
+    Range satu rentang (bytes=a-b, bytes=a-, bytes=-n) -> (start, end) inklusif.
+    None jika header tidak ada/tidak didukung (kirim utuh), False jika di luar ukuran file (416).
+    """
+    match = _RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(0, size - int(end)), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+class FakeBotApi:
+    """
+    Server HTTP kecil yang menjawab method Bot API yang dipakai bot dan menyajikan
+    file di files_dir lewat /file/bot<token>/<path> (streaming per blok, dengan Range dan
+    If-Range; path di luar files_dir ditolak). Setiap panggilan dicatat di calls
+    sebagai (waktu, method, parameter) untuk diukur oleh benchmark.
+
+    Untuk load test, setiap jawaban bisa ditunda latency + acak(0, latency_jitter) detik,
+    dan method di FLOOD_METHODS ditolak dengan 429 + retry_after (RetryAfter di bot) jika
+    melebihi chat_rate panggilan/detik per chat atau global_rate panggilan/detik total.
+    Penolakan dicatat di rejected sebagai (waktu, method, chat_id).
+    """
+
+    def __init__(self, port, files_dir=None, latency=0.0, latency_jitter=0.0,
+                 chat_rate=None, global_rate=None, retry_after=1):
+        self.port = port
+        self.files_dir = files_dir
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.chat_rate = chat_rate
+        self.global_rate = global_rate
+        self.retry_after = retry_after
+        self.calls = []
+        self.rejected = []
+        self.message_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._chat_windows = {}  # chat_id -> deque waktu panggilan dalam 1 detik terakhir
+        self._global_window = deque()
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def record(self, method, params):
+        with self._lock:
+            self.calls.append((time.perf_counter(), method, params))
+
+    def check_flood(self, method, params):
+        """Kembalikan retry_after jika panggilan melebihi batas flood, None jika diterima"""
+        if method not in FLOOD_METHODS or not (self.chat_rate or self.global_rate):
+            return None
+        chat_id = str(params.get('chat_id'))
+        now = time.perf_counter()
+        with self._lock:
+            window = self._chat_windows.setdefault(chat_id, deque())
+            for calls in (window, self._global_window):
+                while calls and now - calls[0] >= 1.0:
+                    calls.popleft()
+            if (self.chat_rate and len(window) >= self.chat_rate) or \
+                    (self.global_rate and len(self._global_window) >= self.global_rate):
+                self.rejected.append((now, method, chat_id))
+                return self.retry_after
+            window.append(now)
+            self._global_window.append(now)
+        return None
+
+    def file_path(self, path):
+        """Path file di files_dir untuk /file/bot<token>/<path>, None jika tidak ada atau keluar dari files_dir"""
+        if not self.files_dir:
+            return None
+        root = os.path.realpath(self.files_dir)
+        relative = unquote(path.split('/', 3)[3]) if path.count('/') >= 3 else ''
+        full_path = os.path.realpath(os.path.join(root, relative))
+        if os.path.commonpath([root, full_path]) != root or not os.path.isfile(full_path):
+            return None
+        return full_path
+
+    def wait_for(self, method, timeout):
+        """Tunggu sampai method dipanggil, kembalikan waktu panggilan pertama atau None"""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            with self._lock:
+                for called_at, name, _ in self.calls:
+                    if name == method:
+                        return called_at
+            time.sleep(0.01)
+        return None
+
+    def result_for(self, method, params):
+        """Hasil tiruan per method, True untuk method yang tidak dikenal"""
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot',
+                    'can_join_groups': True, 'can_read_all_group_messages': False, 'supports_inline_queries': False}
+        if method in ('sendMessage', 'editMessageText'):
+            return {'message_id': next(self.message_ids), 'date': int(time.time()),
+                    'chat': {'id': int(params.get('chat_id') or 0), 'type': 'private'}, 'text': params.get('text', '')}
+        if method == 'getFile':
+            return {'file_id': params.get('file_id'), 'file_unique_id': params.get('file_id'),
+                    'file_path': params.get('file_id')}
+        return True
+
+    def start(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _params(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8', 'replace') if length else ''
+                if 'json' in (self.headers.get('Content-Type') or ''):
+                    return json.loads(body or '{}')
+                params = {k: v[0] for k, v in parse_qs(body).items()}
+                params.update({k: v[0] for k, v in parse_qs(self.path.partition('?')[2]).items()})
+                return params
+
+            def _reply(self, status, payload, content_type='application/json'):
+                body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+
+            def _send_file(self, full_path):
+                stat = os.stat(full_path)
+                size = stat.st_size
+                etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+                byte_range = parse_range(self.headers.get('Range'), size)
+                if_range = self.headers.get('If-Range')
+                if byte_range and if_range and if_range != etag:
+                    byte_range = None  # validator tidak cocok: kirim file utuh
+                if byte_range is False:
+                    self.send_response(416)
+                    self.send_header('Content-Range', f"bytes */{size}")
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                start, end = byte_range or (0, size - 1)
+                length = end - start + 1 if size else 0
+                self.send_response(206 if byte_range else 200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(length))
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('ETag', etag)
+                if byte_range:
+                    self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+                self.end_headers()
+                if self.command == 'HEAD':
+                    return
+                block_size = LoadTestConfig.FILE_BLOCK_SIZE_KB * 1024
+                with open(full_path, 'rb') as f:
+                    f.seek(start)
+                    while length > 0:
+                        block = f.read(min(block_size, length))
+                        if not block:
+                            break
+                        self.wfile.write(block)
+                        length -= len(block)
+
+            def _handle(self):
+                path = self.path.partition('?')[0]
+                if path.startswith('/file/bot'):
+                    full_path = api.file_path(path)
+                    if not full_path:
+                        return self._reply(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+                    return self._send_file(full_path)
+                method = path.rsplit('/', 1)[-1]
+                params = self._params()
+                if api.latency or api.latency_jitter:
+                    time.sleep(api.latency + random.uniform(0, api.latency_jitter))
+                retry_after = api.check_flood(method, params)
+                if retry_after is not None:
+                    return self._reply(429, {
+                        'ok': False, 'error_code': 429,
+                        'description': f"Too Many Requests: retry after {retry_after}",
+                        'parameters': {'retry_after': retry_after}
+                    })
+                api.record(method, params)
+                self._reply(200, {'ok': True, 'result': api.result_for(method, params)})
+
+            do_GET = _handle
+            do_POST = _handle
+            do_HEAD = _handle
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
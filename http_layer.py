@@ -0,0 +1,448 @@
+# Lapisan koneksi HTTP bersama: cache DNS dengan TTL dan koneksi Happy Eyeballs (RFC 8305)
+
+import os
+import time
+import errno
+import random
+import socket
+import struct
+import asyncio
+import logging
+import selectors
+import threading
+import ipaddress
+from collections import deque
+from urllib.parse import urlparse
+from config import NetConfig
+
+logger = logging.getLogger(__name__)
+
+_QTYPE_A = 1
+_QTYPE_AAAA = 28
+_QTYPE_CNAME = 5
+_QTYPE_FAMILY = {_QTYPE_A: socket.AF_INET, _QTYPE_AAAA: socket.AF_INET6}
+
+class DnsError(Exception):
+    """Query DNS langsung gagal (timeout, SERVFAIL, response terpotong); dicoba ulang lewat getaddrinfo"""
+    pass
+
+class DnsMismatchError(DnsError):
+    """Pertanyaan di response tidak sama dengan query (paket nyasar/spoof), response diabaikan"""
+    pass
+
+# ---------------------------------------------------------------------------
+# Query DNS minimal (A/AAAA lewat UDP) agar TTL jawaban bisa dipakai untuk cache
+# ---------------------------------------------------------------------------
+
+def _read_nameservers(path=None):
+    """Daftar nameserver dari resolv.conf"""
+    servers = []
+    try:
+        with open(path or NetConfig.RESOLV_CONF) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == 'nameserver':
+                    servers.append(parts[1].split('%')[0])
+    except OSError:
+        pass
+    return servers
+
+def _build_query(query_id, host, qtype):
+    header = struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 0)  # RD=1, satu pertanyaan
+    labels = host.rstrip('.').encode('idna').split(b'.')
+    qname = b''.join(bytes([len(label)]) + label for label in labels) + b'\0'
+    return header + qname + struct.pack('!HH', qtype, 1)
+
+def _normalize_name(host):
+    return host.rstrip('.').encode('idna').decode('ascii').lower()
+
+def _read_name(data, offset):
+    """
+    Baca nama (label, boleh dengan pointer kompresi) mulai offset.
+    Mengembalikan (nama huruf kecil tanpa titik akhir, offset sesudah nama di posisi asli).
+    """
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        length = data[offset]
+        if length == 0:
+            offset += 1
+            break
+        if length & 0xC0 == 0xC0:
+            jumps += 1
+            if jumps > 32:
+                raise DnsError("loop pointer kompresi di response DNS")
+            if end is None:
+                end = offset + 2
+            offset = struct.unpack('!H', data[offset:offset + 2])[0] & 0x3FFF
+            continue
+        if length & 0xC0:
+            raise DnsError("label DNS tidak dikenal")
+        label = data[offset + 1:offset + 1 + length]
+        if len(label) != length:
+            raise DnsError("response DNS terpotong")
+        labels.append(label.decode('ascii', 'replace').lower())
+        offset += length + 1
+    return '.'.join(labels), (end if end is not None else offset)
+
+def _parse_response(data, qtype, host):
+    """
+    Ambil alamat dan TTL minimal dari jawaban DNS untuk host.
+    Pertanyaan di response harus sama dengan query (nama, tipe, kelas IN), alamat hanya diambil
+    dari record milik host atau target CNAME-nya. Mengembalikan (alamat, ttl);
+    NXDOMAIN/tanpa jawaban menghasilkan ([], None).
+    """
+    _, flags, qdcount, ancount, _, _ = struct.unpack('!HHHHHH', data[:12])
+    if flags & 0x0200:
+        raise DnsError("response DNS terpotong")
+    name = _normalize_name(host)
+    if qdcount != 1:
+        raise DnsMismatchError(f"response DNS berisi {qdcount} pertanyaan")
+    question, offset = _read_name(data, 12)
+    if offset + 4 > len(data):
+        raise DnsError("response DNS terpotong")
+    rtype, rclass = struct.unpack('!HH', data[offset:offset + 4])
+    if question != name or rtype != qtype or rclass != 1:
+        raise DnsMismatchError(f"pertanyaan response DNS ({question}, tipe {rtype}) tidak sesuai query {name}")
+    offset += 4
+    rcode = flags & 0x000F
+    if rcode == 3:
+        return [], None
+    if rcode != 0:
+        raise DnsError(f"rcode DNS {rcode}")
+    owners = {name}
+    addresses, ttls = [], []
+    for _ in range(ancount):
+        owner, offset = _read_name(data, offset)
+        if offset + 10 > len(data):
+            raise DnsError("response DNS terpotong")
+        rtype, _, ttl, rdlength = struct.unpack('!HHIH', data[offset:offset + 10])
+        offset += 10
+        rdata_offset = offset
+        offset += rdlength
+        if offset > len(data):
+            raise DnsError("response DNS terpotong")
+        if owner not in owners:
+            continue
+        ttls.append(ttl)  # TTL CNAME di rantai jawaban ikut membatasi
+        if rtype == _QTYPE_CNAME:
+            owners.add(_read_name(data, rdata_offset)[0])
+        elif rtype == qtype:
+            addresses.append(socket.inet_ntop(_QTYPE_FAMILY[qtype], data[rdata_offset:offset]))
+    return addresses, (min(ttls) if ttls else None)
+
+def query_dns(host, nameservers=None, timeout=None):
+    """
+    Kirim query A dan AAAA bersamaan lewat satu socket UDP, coba nameserver berikutnya jika timeout.
+    Mengembalikan (list (family, alamat), ttl).
+    """
+    nameservers = nameservers or _read_nameservers()
+    if not nameservers:
+        raise DnsError("tidak ada nameserver di resolv.conf")
+    timeout = timeout or NetConfig.DNS_TIMEOUT
+    last_error = None
+    for server in nameservers:
+        family = socket.AF_INET6 if ':' in server else socket.AF_INET
+        base_id = random.randint(0, 0xFFFE)
+        queries = {base_id: _QTYPE_AAAA, base_id + 1: _QTYPE_A}
+        answers = {}
+        try:
+            with socket.socket(family, socket.SOCK_DGRAM) as sock:
+                sock.connect((server, 53))
+                for query_id, qtype in queries.items():
+                    sock.send(_build_query(query_id, host, qtype))
+                deadline = time.monotonic() + timeout
+                while len(answers) < len(queries):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DnsError(f"timeout dari nameserver {server}")
+                    sock.settimeout(remaining)
+                    data = sock.recv(4096)
+                    query_id = struct.unpack('!H', data[:2])[0]
+                    if query_id in queries and query_id not in answers:
+                        try:
+                            answers[query_id] = _parse_response(data, queries[query_id], host)
+                        except DnsMismatchError as e:
+                            # ID cocok tapi pertanyaan lain: bukan jawaban query ini, tunggu berikutnya
+                            logger.debug(f"Response DNS dari {server} diabaikan: {e}")
+        except (OSError, DnsError, struct.error, IndexError) as e:
+            last_error = e
+            continue
+
+        # IPv6 lebih dulu, Happy Eyeballs yang menangani rute IPv6 yang rusak
+        addresses, ttls = [], []
+        for query_id in sorted(answers, key=lambda q: queries[q] != _QTYPE_AAAA):
+            found, ttl = answers[query_id]
+            addresses += [(_QTYPE_FAMILY[queries[query_id]], address) for address in found]
+            if ttl is not None:
+                ttls.append(ttl)
+        return addresses, (min(ttls) if ttls else None)
+    raise DnsError(str(last_error))
+
+# ---------------------------------------------------------------------------
+# Cache DNS
+# ---------------------------------------------------------------------------
+
+class _LatencyStats:
+    """Counter dan sample latensi terakhir untuk persentil"""
+
+    def __init__(self):
+        self.counters = {}
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self.samples.setdefault(name, deque(maxlen=NetConfig.LATENCY_SAMPLES)).append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            result = dict(self.counters)
+            for name, samples in self.samples.items():
+                ordered = sorted(samples)
+                if ordered:
+                    result[f'{name}_p50_ms'] = round(ordered[len(ordered) // 2] * 1000, 1)
+                    result[f'{name}_p95_ms'] = round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1)
+            return result
+
+stats = _LatencyStats()
+
+class DnsCache:
+    """
+    Cache hasil resolusi nama per host dengan masa berlaku dari TTL jawaban DNS
+    (dibatasi DNS_MIN_TTL..DNS_MAX_TTL), maksimal DNS_CACHE_MAX_ENTRIES host: saat penuh
+    entri kedaluwarsa dibersihkan lalu entri tertua dibuang. Lookup bersamaan untuk host yang sama digabung
+    sehingga hanya satu query yang dikirim. Jika query langsung gagal, dipakai getaddrinfo
+    sistem dengan DNS_FALLBACK_TTL.
+    """
+
+    def __init__(self):
+        self._entries = {}   # host -> (list (family, alamat), expires_at)
+        self._inflight = {}  # host -> threading.Event
+        self._lock = threading.Lock()
+
+    def _lookup(self, host):
+        start = time.monotonic()
+        addresses, ttl = [], None
+        try:
+            if '.' not in host or host.endswith('.local'):
+                raise DnsError("nama lokal, pakai resolver sistem")
+            addresses, ttl = query_dns(host)
+            stats.count('dns_queries')
+        except DnsError as e:
+            logger.debug(f"Query DNS langsung untuk {host} gagal: {e}")
+        if not addresses:
+            # Resolver sistem juga membaca /etc/hosts, search domain, dsb.
+            stats.count('dns_fallbacks')
+            try:
+                infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+            except socket.gaierror:
+                infos = []
+            addresses = list(dict.fromkeys((info[0], info[4][0]) for info in infos))
+            ttl = NetConfig.DNS_FALLBACK_TTL
+            if not addresses:
+                stats.count('dns_negative')
+                ttl = NetConfig.DNS_NEGATIVE_TTL
+        stats.observe('dns', time.monotonic() - start)
+        ttl = min(max(ttl or 0, NetConfig.DNS_MIN_TTL), NetConfig.DNS_MAX_TTL)
+        return addresses, time.monotonic() + ttl
+
+    def resolve(self, host):
+        """Daftar (family, alamat) untuk host, dari cache jika masih berlaku"""
+        while True:
+            with self._lock:
+                entry = self._entries.get(host)
+                if entry and entry[1] > time.monotonic():
+                    stats.count('dns_hits')
+                    return entry[0]
+                waiter = self._inflight.get(host)
+                if waiter is None:
+                    waiter = self._inflight[host] = threading.Event()
+                    owner = True
+                else:
+                    owner = False
+            if not owner:
+                # Lookup host yang sama sedang berjalan di thread lain
+                waiter.wait(NetConfig.DNS_TIMEOUT * 2)
+                continue
+            stats.count('dns_misses')
+            try:
+                addresses, expires = self._lookup(host)
+                with self._lock:
+                    # Dict berurutan sesuai waktu simpan: entri baru selalu di akhir
+                    self._entries.pop(host, None)
+                    if len(self._entries) >= NetConfig.DNS_CACHE_MAX_ENTRIES:
+                        now = time.monotonic()
+                        for key in [k for k, (_, exp) in self._entries.items() if exp <= now]:
+                            self._entries.pop(key, None)
+                    while len(self._entries) >= NetConfig.DNS_CACHE_MAX_ENTRIES:
+                        # Masih penuh: buang entri tertua
+                        self._entries.pop(next(iter(self._entries)))
+                        stats.count('dns_evictions')
+                    self._entries[host] = (addresses, expires)
+                return addresses
+            finally:
+                with self._lock:
+                    self._inflight.pop(host, None)
+                waiter.set()
+
+    async def resolve_async(self, host):
+        """Versi async resolve() untuk prefetch dari event loop tanpa memblokirnya"""
+        return await asyncio.to_thread(self.resolve, host)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+dns_cache = DnsCache()
+
+# ---------------------------------------------------------------------------
+# Happy Eyeballs
+# ---------------------------------------------------------------------------
+
+def interleave(addresses):
+    """Urutkan alamat berselang-seling IPv6/IPv4, dimulai dari family jawaban pertama (RFC 8305 4)"""
+    if not addresses:
+        return []
+    first = addresses[0][0]
+    primary = [a for a in addresses if a[0] == first]
+    secondary = [a for a in addresses if a[0] != first]
+    ordered = []
+    for index in range(max(len(primary), len(secondary))):
+        ordered += primary[index:index + 1] + secondary[index:index + 1]
+    return ordered
+
+def happy_eyeballs_connect(addresses, port, timeout=None, source_address=None, socket_options=None):
+    """
+    Buka koneksi TCP ke salah satu alamat. Percobaan berikutnya dimulai paralel jika
+    yang sebelumnya belum tersambung dalam CONNECT_ATTEMPT_DELAY (atau langsung jika gagal),
+    koneksi pertama yang berhasil dipakai dan sisanya ditutup.
+    """
+    pending = {}
+    errors = []
+    queue = list(addresses)
+    selector = selectors.DefaultSelector()
+    deadline = time.monotonic() + timeout if timeout else None
+    next_attempt = time.monotonic()
+    try:
+        while queue or pending:
+            now = time.monotonic()
+            if deadline and now >= deadline:
+                raise socket.timeout(f"timeout connect ke port {port}")
+
+            if queue and (not pending or now >= next_attempt):
+                family, address = queue.pop(0)
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                try:
+                    for option in socket_options or ():
+                        sock.setsockopt(*option)
+                    if source_address:
+                        sock.bind(source_address)
+                    sock.setblocking(False)
+                    result = sock.connect_ex((address, port) if family == socket.AF_INET else (address, port, 0, 0))
+                except OSError as e:
+                    sock.close()
+                    errors.append(e)
+                    continue
+                if result in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY):
+                    pending[sock] = (family, now)
+                    selector.register(sock, selectors.EVENT_WRITE)
+                    next_attempt = now + NetConfig.CONNECT_ATTEMPT_DELAY
+                else:
+                    sock.close()
+                    errors.append(OSError(result, os.strerror(result)))
+                continue
+
+            wake_times = [t for t in (next_attempt if queue else None, deadline) if t]
+            wait = max(0, min(wake_times) - now) if wake_times else None
+            for key, _ in selector.select(wait):
+                sock = key.fileobj
+                selector.unregister(sock)
+                family, started = pending.pop(sock)
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if error:
+                    sock.close()
+                    errors.append(OSError(error, os.strerror(error)))
+                    next_attempt = time.monotonic()  # gagal cepat, langsung coba alamat berikutnya
+                    continue
+                sock.setblocking(True)
+                sock.settimeout(timeout)
+                stats.count('connect_ipv6' if family == socket.AF_INET6 else 'connect_ipv4')
+                if errors:
+                    stats.count('connect_fallbacks')
+                return sock
+        raise errors[-1] if errors else OSError("tidak ada alamat untuk dihubungi")
+    finally:
+        for sock in pending:
+            sock.close()
+        selector.close()
+
+def create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None, socket_options=None):
+    """
+    Pengganti urllib3.util.connection.create_connection: resolusi lewat dns_cache lalu
+    koneksi Happy Eyeballs. TLS tetap dibungkus urllib3 dengan hostname asli (SNI).
+    """
+    host, port = address
+    host = host.strip('[]')
+    if timeout is socket._GLOBAL_DEFAULT_TIMEOUT:
+        timeout = socket.getdefaulttimeout()
+    try:
+        addresses = [(socket.AF_INET6 if ipaddress.ip_address(host).version == 6 else socket.AF_INET, host)]
+    except ValueError:
+        addresses = interleave(dns_cache.resolve(host))
+        if not addresses:
+            stats.count('connect_errors')
+            raise socket.gaierror(socket.EAI_NONAME, f"Nama host tidak ditemukan: {host}")
+    start = time.monotonic()
+    try:
+        sock = happy_eyeballs_connect(addresses, port, timeout, source_address, socket_options)
+    except OSError:
+        stats.count('connect_errors')
+        raise
+    stats.observe('connect', time.monotonic() - start)
+    return sock
+
+_installed = {'done': False}
+_install_lock = threading.Lock()
+
+def install():
+    """
+    Pasang create_connection di urllib3 (dipakai requests) sekali per proses.
+    Nonaktif jika HTTP_FAST_CONNECT=0. Mengembalikan True jika terpasang.
+    """
+    with _install_lock:
+        if _installed['done']:
+            return True
+        if os.getenv(NetConfig.ENABLED_ENV, '1') == '0':
+            return False
+        try:
+            from urllib3.util import connection # type: ignore
+        except ImportError:
+            return False
+        connection.create_connection = create_connection
+        _installed['done'] = True
+        logger.info("Cache DNS dan koneksi Happy Eyeballs aktif untuk request HTTP")
+        return True
+
+async def prefetch(url):
+    """Resolve host URL di thread agar connect berikutnya langsung kena cache"""
+    host = urlparse(url).hostname
+    if not host or not _installed['done']:
+        return
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        await dns_cache.resolve_async(host)
+
+def get_net_stats():
+    """Statistik cache DNS dan koneksi untuk monitoring"""
+    result = stats.snapshot()
+    lookups = result.get('dns_hits', 0) + result.get('dns_misses', 0)
+    result['dns_hit_rate'] = round(result.get('dns_hits', 0) / lookups, 3) if lookups else None
+    result['installed'] = _installed['done']
+    return result
@@ -0,0 +1,132 @@
+# Record job dan pending konfirmasi yang ringkas, state machine job, dan laporan memori
+
+import os
+import sys
+import time
+
+PENDING = 'pending'
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+TERMINAL_STATES = frozenset((DONE, FAILED, CANCELLED))
+
+# pending -> queued -> running -> done/failed/cancelled.
+# running -> queued terjadi di store saat lease kedaluwarsa dan job diambil alih instance lain.
+# Store memvalidasi setiap perubahan status job lewat sources_of() (klausa WHERE status IN ...).
+TRANSITIONS = {
+    PENDING: frozenset((QUEUED, CANCELLED)),
+    QUEUED: frozenset((RUNNING, CANCELLED)),
+    RUNNING: frozenset((QUEUED, DONE, FAILED, CANCELLED)),
+    DONE: frozenset(),
+    FAILED: frozenset(),
+    CANCELLED: frozenset(),
+}
+
+class InvalidTransition(Exception):
+    """Perpindahan state job yang tidak diizinkan state machine"""
+    pass
+
+def sources_of(state):
+    """State asal yang boleh pindah ke state, raise InvalidTransition jika tidak ada"""
+    sources = tuple(source for source, targets in TRANSITIONS.items() if state in targets)
+    if not sources:
+        raise InvalidTransition(f"Tidak ada state yang boleh pindah ke {state}")
+    return sources
+
+class PendingRecord:
+    """
+    Pending konfirmasi satu user (pesan info + keyboard Ya/Tidak). Disimpan di job store
+    sebagai dict lewat to_dict(); entri yang lebih tua dari JobConfig.PENDING_TTL dianggap
+    ditinggalkan dan dibersihkan reaper (masa berlaku dicek store lewat created_at).
+    """
+    __slots__ = ('url', 'info', 'info_message_id', 'confirm_message_id', 'chat_id',
+                 'destinations', 'batch', 'crawl', 'created_at')
+    state = PENDING  # konstanta kelas, pending keluar dari store saat di-pop (-> queued/cancelled)
+
+    def __init__(self, url, info, info_message_id, confirm_message_id, chat_id,
+                 destinations=None, batch=None, crawl=False, created_at=None):
+        self.url = url
+        self.info = info
+        self.info_message_id = info_message_id
+        self.confirm_message_id = confirm_message_id
+        self.chat_id = chat_id
+        self.destinations = destinations
+        self.batch = batch
+        self.crawl = crawl
+        self.created_at = created_at or time.time()
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        # Batch disimpan sebagai list (url, info); JSON mengubah tuple menjadi list
+        data = dict(data)
+        if data.get('batch'):
+            data['batch'] = [tuple(item) for item in data['batch']]
+        return cls(**{name: data.get(name) for name in cls.__slots__ if name in data})
+
+class JobRecord:
+    """
+    State lokal satu job yang sedang dijalankan instance ini (registry user_processes).
+    Hanya menyimpan ID pesan, bukan objek bot/context, agar record kecil dan tidak
+    menahan objek lain. Pesan akhir dianggap sudah ditampilkan begitu state terminal.
+    """
+    __slots__ = ('job_id', 'user_id', 'chat_id', 'info_message_id', 'progress_message_id',
+                 'cancellation_event', 'pause', 'state', 'last_edit', 'updated_at')
+
+    def __init__(self, job_id, user_id, chat_id, info_message_id, progress_message_id,
+                 cancellation_event, pause=None, state=RUNNING):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.info_message_id = info_message_id
+        self.progress_message_id = progress_message_id
+        self.cancellation_event = cancellation_event
+        self.pause = pause
+        self.state = state
+        self.last_edit = 0.0
+        self.updated_at = time.monotonic()
+
+    @property
+    def finished(self):
+        return self.state in TERMINAL_STATES
+
+    def transition(self, state):
+        """Pindah ke state baru, raise InvalidTransition jika tidak diizinkan"""
+        if state not in TRANSITIONS[self.state]:
+            raise InvalidTransition(f"Job {self.job_id}: {self.state} -> {state} tidak diizinkan")
+        self.state = state
+        self.touch()
+
+    def touch(self):
+        self.updated_at = time.monotonic()
+
+def process_rss():
+    """RSS proses saat ini dalam byte (None jika tidak bisa dibaca)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss: puncak RSS, KB di Linux dan byte di macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+def records_size(records):
+    """Perkiraan ukuran (byte) record slots beserta atribut skalarnya"""
+    total = 0
+    for record in records:
+        total += sys.getsizeof(record)
+        for name in record.__slots__:
+            value = getattr(record, name, None)
+            if isinstance(value, (int, float, str, bytes)):
+                total += sys.getsizeof(value)
+    return total
@@ -0,0 +1,535 @@
+# Store state job dan pending konfirmasi yang bisa dipakai bersama beberapa instance bot
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from abc import ABC, abstractmethod
+from typing import Optional
+from config import JobConfig
+from job_state import PendingRecord, InvalidTransition, QUEUED, RUNNING, CANCELLED, TERMINAL_STATES, sources_of
+
+logger = logging.getLogger(__name__)
+
+def make_instance_id() -> str:
+    """ID unik instance bot untuk kepemilikan lease"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+class JobStore(ABC):
+    """
+    Interface store untuk pending konfirmasi dan antrean job.
+    Implementasi store jaringan (mis. Redis/Postgres) wajib mengimplementasikan semua method
+    abstrak di bawah; store yang belum lengkap gagal saat dibuat, bukan di tengah job.
+
+    Protokol klaim berbasis lease (status mengikuti job_state.TRANSITIONS):
+    - enqueue_job() memasukkan job berstatus 'queued' (pending -> queued)
+    - claim_job() mengembalikan job 'running' dengan lease kedaluwarsa (mis. instance pemiliknya
+      mati) ke 'queued', lalu mengambil satu job 'queued' secara atomik dan memberi lease
+      ke instance pemanggil
+    - finish_job() hanya menutup job 'running' milik pemanggil (running -> done/failed/cancelled)
+    - renew_lease() wajib dipanggil berkala oleh pemilik, False berarti lease sudah hilang
+    - request_cancel() menandai satu job milik user, pemilik job membacanya saat renew
+    - request_pause() menandai pause/resume satu job antre/berjalan milik user, dibaca pemilik saat
+      renew; job antre yang ditandai mulai dalam keadaan pause saat diklaim
+
+    Manifest mirror direktori menyimpan path -> {'signature', 'ref'} per sumber
+    agar crawl ulang bisa melewati file yang tidak berubah.
+
+    Pesanan nama (reserve_name/reserved_names) dipakai indeks Drive untuk policy 'rename':
+    nama hasil rename dipesan di store bersama selama NAME_RESERVATION_TTL agar job paralel di
+    proses worker atau instance lain tidak memakai nama yang sama sebelum indeks mereka melihat
+    file tersebut lewat changes feed.
+
+    Pending konfirmasi berlaku JobConfig.PENDING_TTL: get_pending()/pop_pending() mengabaikan
+    entri yang lebih tua, reap_pending() menghapusnya. Job selesai dihapus purge_finished_jobs()
+    setelah masa retensi agar tabel tidak tumbuh terus.
+
+    Schedules menyimpan mirror berulang (cron) beserta ETag/Last-Modified terakhir yang berhasil
+    di-mirror. claim_due_schedules() mengambil jadwal jatuh tempo secara atomik dengan memajukan
+    next_run sebesar lease, sehingga satu jadwal hanya diproses satu instance.
+
+    Settings menyimpan override konfigurasi runtime dari admin (/config) agar berlaku
+    di semua instance dan tetap ada setelah restart.
+    """
+
+    @abstractmethod
+    def save_pending(self, user_id: int, record: PendingRecord) -> None:
+        pass
+
+    @abstractmethod
+    def get_pending(self, user_id: int) -> Optional[PendingRecord]:
+        pass
+
+    @abstractmethod
+    def pop_pending(self, user_id: int) -> Optional[PendingRecord]:
+        pass
+
+    @abstractmethod
+    def reap_pending(self, ttl: float) -> list:
+        pass
+
+    @abstractmethod
+    def count_pending(self) -> int:
+        pass
+
+    @abstractmethod
+    def enqueue_job(self, user_id: int, payload: dict) -> int:
+        pass
+
+    @abstractmethod
+    def claim_job(self, instance_id: str, lease_seconds: int) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def renew_lease(self, job_id: int, instance_id: str, lease_seconds: int) -> bool:
+        pass
+
+    @abstractmethod
+    def finish_job(self, job_id: int, instance_id: str, status: str, result: str = None) -> bool:
+        pass
+
+    @abstractmethod
+    def get_active_jobs(self, user_id: int) -> list:
+        pass
+
+    @abstractmethod
+    def purge_finished_jobs(self, retention: float) -> int:
+        pass
+
+    @abstractmethod
+    def request_cancel(self, job_id: int, user_id: int) -> int:
+        pass
+
+    @abstractmethod
+    def is_cancel_requested(self, job_id: int) -> bool:
+        pass
+
+    @abstractmethod
+    def request_pause(self, job_id: int, user_id: int, paused: bool) -> int:
+        pass
+
+    @abstractmethod
+    def is_pause_requested(self, job_id: int) -> bool:
+        pass
+
+    @abstractmethod
+    def get_mirror_manifest(self, source: str) -> dict:
+        pass
+
+    @abstractmethod
+    def save_mirror_entries(self, source: str, entries: dict) -> None:
+        pass
+
+    @abstractmethod
+    def reserved_names(self, folder_id: str, ttl: float) -> set:
+        """Nama file di folder Drive yang sedang dipesan job lain (lebih muda dari ttl)"""
+
+    @abstractmethod
+    def reserve_name(self, folder_id: str, name: str, ttl: float) -> bool:
+        """Pesan nama file di folder Drive, False jika sudah dipesan dan belum kedaluwarsa"""
+
+    @abstractmethod
+    def add_schedule(self, user_id: int, chat_id: int, url: str, cron: str, destinations: Optional[list], next_run: float) -> int:
+        pass
+
+    @abstractmethod
+    def list_schedules(self, user_id: int) -> list:
+        pass
+
+    @abstractmethod
+    def delete_schedule(self, user_id: int, schedule_id: int) -> bool:
+        pass
+
+    @abstractmethod
+    def claim_due_schedules(self, now: float, limit: int, lease_seconds: int) -> list:
+        pass
+
+    @abstractmethod
+    def finish_schedule_run(self, schedule_id: int, next_run: float, status: str, job_id: int = None) -> None:
+        pass
+
+    @abstractmethod
+    def save_schedule_validators(self, schedule_id: int, etag: Optional[str], last_modified: Optional[str]) -> None:
+        pass
+
+    @abstractmethod
+    def get_settings(self) -> dict:
+        pass
+
+    @abstractmethod
+    def save_setting(self, key: str, value) -> None:
+        pass
+
+class SQLiteJobStore(JobStore):
+    """
+    Implementasi JobStore dengan SQLite (mode WAL). Cukup untuk satu host atau
+    beberapa instance yang berbagi volume yang sama.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=JobConfig.DB_BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pending (
+                user_id INTEGER PRIMARY KEY,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                owner TEXT,
+                lease_until REAL,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                pause_requested INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id, status);
+            CREATE TABLE IF NOT EXISTS mirror_manifest (
+                source TEXT NOT NULL,
+                path TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                ref TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (source, path)
+            );
+            CREATE TABLE IF NOT EXISTS name_reservations (
+                folder_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                reserved_at REAL NOT NULL,
+                PRIMARY KEY (folder_id, name)
+            );
+            CREATE TABLE IF NOT EXISTS schedules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                chat_id INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                cron TEXT NOT NULL,
+                destinations TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                next_run REAL NOT NULL,
+                last_run REAL,
+                last_status TEXT,
+                last_job_id INTEGER,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_schedules_due ON schedules (next_run);
+            CREATE INDEX IF NOT EXISTS idx_schedules_user ON schedules (user_id);
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        # Database lama belum punya kolom pause_requested
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(jobs)").fetchall()}
+        if 'pause_requested' not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN pause_requested INTEGER NOT NULL DEFAULT 0")
+        logger.info(f"Job store SQLite aktif di {path}")
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def save_pending(self, user_id, record):
+        self._execute(
+            "INSERT OR REPLACE INTO pending (user_id, data, created_at) VALUES (?, ?, ?)",
+            (user_id, json.dumps(record.to_dict()), record.created_at)
+        )
+
+    def get_pending(self, user_id):
+        rows = self._execute(
+            "SELECT data FROM pending WHERE user_id = ? AND created_at >= ?",
+            (user_id, time.time() - JobConfig.PENDING_TTL)
+        )
+        return PendingRecord.from_dict(json.loads(rows[0]['data'])) if rows else None
+
+    def pop_pending(self, user_id):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT data FROM pending WHERE user_id = ? AND created_at >= ?",
+                    (user_id, time.time() - JobConfig.PENDING_TTL)
+                ).fetchall()
+                self._conn.execute("DELETE FROM pending WHERE user_id = ?", (user_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return PendingRecord.from_dict(json.loads(rows[0]['data'])) if rows else None
+
+    def reap_pending(self, ttl):
+        """Hapus pending yang lebih tua dari ttl detik, mengembalikan list (user_id, PendingRecord)"""
+        cutoff = time.time() - ttl
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT user_id, data FROM pending WHERE created_at < ?", (cutoff,)
+                ).fetchall()
+                self._conn.execute("DELETE FROM pending WHERE created_at < ?", (cutoff,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(row['user_id'], PendingRecord.from_dict(json.loads(row['data']))) for row in rows]
+
+    def count_pending(self):
+        return self._execute("SELECT COUNT(*) AS n FROM pending")[0]['n']
+
+    @staticmethod
+    def _from_clause(state):
+        """Klausa 'status IN (...)' berisi state asal yang boleh pindah ke state"""
+        sources = sources_of(state)
+        return f"status IN ({', '.join('?' * len(sources))})", sources
+
+    def enqueue_job(self, user_id, payload):
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (user_id, payload, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (user_id, json.dumps(payload), QUEUED, now, now)
+            )
+            return cursor.lastrowid
+
+    def claim_job(self, instance_id, lease_seconds):
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE mengunci database untuk penulisan sehingga
+            # dua instance tidak bisa mengklaim job yang sama
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Lease kedaluwarsa: running -> queued (owner lama disimpan untuk log pengambilalihan)
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, lease_until = NULL, updated_at = ? WHERE status = ? AND lease_until < ?",
+                    (QUEUED, now, RUNNING, now)
+                )
+                clause, sources = self._from_clause(RUNNING)
+                rows = self._conn.execute(
+                    f"SELECT * FROM jobs WHERE {clause} ORDER BY created_at LIMIT 1", sources
+                ).fetchall()
+                if not rows:
+                    self._conn.execute("COMMIT")
+                    return None
+                row = rows[0]
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                    (RUNNING, instance_id, now + lease_seconds, now, row['id'])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if row['owner']:
+            logger.warning(f"Job {row['id']} diambil alih dari instance {row['owner']} (lease kedaluwarsa)")
+        return {
+            'id': row['id'],
+            'user_id': row['user_id'],
+            'payload': json.loads(row['payload']),
+            'cancel_requested': bool(row['cancel_requested']),
+            'pause_requested': bool(row['pause_requested'])
+        }
+
+    def renew_lease(self, job_id, instance_id, lease_seconds):
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND owner = ? AND status = ?",
+                (now + lease_seconds, now, job_id, instance_id, RUNNING)
+            )
+            return cursor.rowcount == 1
+
+    def finish_job(self, job_id, instance_id, status, result=None):
+        if status not in TERMINAL_STATES:
+            raise InvalidTransition(f"Status akhir job tidak valid: {status}")
+        # Hanya pemilik lease yang boleh menutup job yang masih berjalan, instance yang kehilangan
+        # lease tidak boleh menimpa status job yang sudah diambil alih atau sudah selesai
+        clause, sources = self._from_clause(status)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET status = ?, result = ?, lease_until = NULL, updated_at = ? WHERE id = ? AND owner = ? AND {clause}",
+                (status, result, time.time(), job_id, instance_id, *sources)
+            )
+            return cursor.rowcount == 1
+
+    def get_active_jobs(self, user_id):
+        rows = self._execute(
+            "SELECT id, status, owner FROM jobs WHERE user_id = ? AND status IN ('queued', 'running')",
+            (user_id,)
+        )
+        return [dict(row) for row in rows]
+
+    def purge_finished_jobs(self, retention):
+        """Hapus job selesai yang lebih tua dari retention detik, mengembalikan jumlah yang dihapus"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND updated_at < ?",
+                (time.time() - retention,)
+            )
+            return cursor.rowcount
+
+    def request_cancel(self, job_id, user_id):
+        now = time.time()
+        with self._lock:
+            # Job yang belum diklaim langsung dibatalkan, yang berjalan ditandai
+            # dan dibatalkan oleh instance pemiliknya saat renew lease.
+            # user_id ikut dicek agar callback_data buatan tidak bisa membatalkan job user lain
+            queued = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND user_id = ? AND status = ?",
+                (CANCELLED, now, job_id, user_id, QUEUED)
+            ).rowcount
+            running = self._conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND user_id = ? AND status = ?",
+                (now, job_id, user_id, RUNNING)
+            ).rowcount
+        return queued + running
+
+    def is_cancel_requested(self, job_id):
+        rows = self._execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,))
+        return bool(rows and rows[0]['cancel_requested'])
+
+    def request_pause(self, job_id, user_id, paused):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET pause_requested = ?, updated_at = ? WHERE id = ? AND user_id = ? AND status IN ('queued', 'running')",
+                (int(paused), time.time(), job_id, user_id)
+            )
+            return cursor.rowcount
+
+    def is_pause_requested(self, job_id):
+        rows = self._execute("SELECT pause_requested FROM jobs WHERE id = ?", (job_id,))
+        return bool(rows and rows[0]['pause_requested'])
+
+    def get_mirror_manifest(self, source):
+        rows = self._execute("SELECT path, signature, ref FROM mirror_manifest WHERE source = ?", (source,))
+        return {row['path']: {'signature': row['signature'], 'ref': row['ref']} for row in rows}
+
+    def save_mirror_entries(self, source, entries):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO mirror_manifest (source, path, signature, ref, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    [(source, path, entry['signature'], entry.get('ref'), now) for path, entry in entries.items()]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def reserved_names(self, folder_id, ttl):
+        cutoff = time.time() - ttl
+        with self._lock:
+            self._conn.execute("DELETE FROM name_reservations WHERE folder_id = ? AND reserved_at <= ?", (folder_id, cutoff))
+            rows = self._conn.execute("SELECT name FROM name_reservations WHERE folder_id = ?", (folder_id,)).fetchall()
+        return {row['name'] for row in rows}
+
+    def reserve_name(self, folder_id, name, ttl):
+        now = time.time()
+        # Primary key (folder_id, name) membuat pesanan atomik lintas proses worker dan instance;
+        # pesanan kedaluwarsa boleh diambil alih
+        with self._lock:
+            cursor = self._conn.execute(
+                """INSERT INTO name_reservations (folder_id, name, reserved_at) VALUES (?, ?, ?)
+                   ON CONFLICT (folder_id, name) DO UPDATE SET reserved_at = excluded.reserved_at
+                   WHERE reserved_at <= ?""",
+                (folder_id, name, now, now - ttl)
+            )
+            return cursor.rowcount == 1
+
+    def _schedule_dict(self, row):
+        schedule = dict(row)
+        schedule['destinations'] = json.loads(row['destinations']) if row['destinations'] else None
+        return schedule
+
+    def add_schedule(self, user_id, chat_id, url, cron, destinations, next_run):
+        with self._lock:
+            cursor = self._conn.execute(
+                """INSERT INTO schedules (user_id, chat_id, url, cron, destinations, next_run, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (user_id, chat_id, url, cron, json.dumps(destinations) if destinations else None, next_run, time.time())
+            )
+            return cursor.lastrowid
+
+    def list_schedules(self, user_id):
+        rows = self._execute("SELECT * FROM schedules WHERE user_id = ? ORDER BY id", (user_id,))
+        return [self._schedule_dict(row) for row in rows]
+
+    def delete_schedule(self, user_id, schedule_id):
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM schedules WHERE id = ? AND user_id = ?", (schedule_id, user_id)
+            )
+            return cursor.rowcount == 1
+
+    def claim_due_schedules(self, now, limit, lease_seconds):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT * FROM schedules WHERE next_run <= ? ORDER BY next_run LIMIT ?", (now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE schedules SET next_run = ? WHERE id = ?",
+                    [(now + lease_seconds, row['id']) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [self._schedule_dict(row) for row in rows]
+
+    def finish_schedule_run(self, schedule_id, next_run, status, job_id=None):
+        self._execute(
+            """UPDATE schedules SET next_run = ?, last_run = ?, last_status = ?,
+                   last_job_id = COALESCE(?, last_job_id) WHERE id = ?""",
+            (next_run, time.time(), status, job_id, schedule_id)
+        )
+
+    def save_schedule_validators(self, schedule_id, etag, last_modified):
+        self._execute(
+            "UPDATE schedules SET etag = ?, last_modified = ? WHERE id = ?",
+            (etag, last_modified, schedule_id)
+        )
+
+    def get_settings(self):
+        rows = self._execute("SELECT key, value FROM settings")
+        return {row['key']: json.loads(row['value']) for row in rows}
+
+    def save_setting(self, key, value):
+        # value None = hapus override
+        if value is None:
+            self._execute("DELETE FROM settings WHERE key = ?", (key,))
+        else:
+            self._execute(
+                "INSERT OR REPLACE INTO settings (key, value, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time())
+            )
+
+def create_job_store(location: str = None) -> JobStore:
+    """
+    Buat job store dari lokasi (env JOB_STORE_URL).
+    Saat ini hanya SQLite: 'sqlite:///path/ke/jobs.db' atau path file biasa.
+    """
+    location = location or os.getenv(JobConfig.STORE_URL_ENV, JobConfig.DEFAULT_STORE_PATH)
+    if location.startswith('sqlite:///'):
+        return SQLiteJobStore(location[len('sqlite:///'):])
+    if '://' in location:
+        raise ValueError(f"Job store tidak didukung: {location}")
+    return SQLiteJobStore(location)
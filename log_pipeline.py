@@ -0,0 +1,169 @@
+# Pipeline logging asinkron: QueueHandler di thread pemanggil, format/redaksi/tulis di thread listener
+
+import os
+import re
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from config import LoggingConfig
+
+# Pola secret yang tidak boleh sampai ke log
+_REDACT_PATTERNS = [
+    (re.compile(r'(Bearer\s+)[A-Za-z0-9._~+/=-]+'), r'\1[REDACTED]'),
+    (re.compile(r'(/bot)\d+:[A-Za-z0-9_-]+'), r'\1[REDACTED]'),                  # token bot di URL Bot API
+    (re.compile(r'\bya29\.[A-Za-z0-9._-]+'), '[REDACTED]'),                        # access token Google
+    (re.compile(r'(upload_id=)[^&\s"\']+'), r'\1[REDACTED]'),                    # URL sesi resumable Drive
+    (re.compile(r'("(?:access_token|refresh_token|client_secret|token)"\s*:\s*")[^"]+'), r'\1[REDACTED]'),
+]
+
+# Atribut bawaan LogRecord, selebihnya (dari extra=...) ikut ditulis sebagai field JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sample'}
+
+def redact(text):
+    """Samarkan token/secret di teks log"""
+    for pattern, replacement in _REDACT_PATTERNS:
+        text = pattern.sub(replacement, text)
+    token = os.getenv("TELEGRAM_TOKEN")
+    if token and token in text:
+        text = text.replace(token, '[REDACTED]')
+    return text
+
+class JsonFormatter(logging.Formatter):
+    """Satu record = satu baris JSON, field extra ikut disertakan"""
+
+    def format(self, record):
+        data = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return redact(json.dumps(data, ensure_ascii=False, default=str))
+
+class RedactingFormatter(logging.Formatter):
+    """Format teks biasa (LoggingConfig.FORMAT) dengan redaksi secret"""
+
+    def format(self, record):
+        return redact(super().format(record))
+
+class SamplingFilter(logging.Filter):
+    """
+    Event frekuensi tinggi ditandai extra={'sample': '<kunci>'} dan hanya diteruskan
+    maksimal sekali per SAMPLE_INTERVAL per kunci (warning ke atas selalu lolos).
+    """
+
+    def __init__(self, interval):
+        super().__init__()
+        self.interval = interval
+        self._last = {}
+        self.dropped = 0
+
+    def filter(self, record):
+        key = getattr(record, 'sample', None)
+        if key is None or record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        if now - self._last.get(key, 0) < self.interval:
+            self.dropped += 1
+            return False
+        self._last[key] = now
+        return True
+
+class _DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler dengan antrean berbatas: jika listener tertinggal, record dibuang
+    (dan dihitung) daripada memblokir event loop atau menghabiskan memori.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Hanya gabungkan pesan + args dan teks exception; format lengkap dikerjakan listener
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_state = {'listener': None, 'handler': None, 'sampler': None}
+_setup_lock = threading.Lock()
+
+def parse_module_levels(text):
+    """Parse 'modul=LEVEL,modul=LEVEL' (env LOG_LEVELS) menjadi dict"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        name, _, level = item.partition('=')
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup_logging():
+    """
+    Pasang pipeline logging untuk proses ini (idempotent). Dipanggil sekali di proses bot
+    dan sekali di setiap proses worker transfer.
+    """
+    with _setup_lock:
+        if _state['listener']:
+            return
+        json_mode = os.getenv(LoggingConfig.JSON_ENV, '1') != '0'
+        stream = logging.StreamHandler()
+        stream.setFormatter(JsonFormatter() if json_mode else RedactingFormatter(LoggingConfig.FORMAT))
+
+        log_queue = queue.Queue(LoggingConfig.QUEUE_SIZE)
+        handler = _DroppingQueueHandler(log_queue)
+        sampler = SamplingFilter(LoggingConfig.SAMPLE_INTERVAL)
+        handler.addFilter(sampler)
+        listener = QueueListener(log_queue, stream, respect_handler_level=False)
+        listener.start()
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(os.getenv(LoggingConfig.LEVEL_ENV, logging.getLevelName(LoggingConfig.LEVEL)).upper())
+
+        levels = dict(LoggingConfig.MODULE_LEVELS)
+        levels.update(parse_module_levels(os.getenv(LoggingConfig.MODULE_LEVELS_ENV)))
+        for name, level in levels.items():
+            logging.getLogger(name).setLevel(level)
+
+        _state.update(listener=listener, handler=handler, sampler=sampler)
+        atexit.register(stop_logging)
+
+def stop_logging():
+    """Flush antrean dan hentikan thread listener"""
+    with _setup_lock:
+        listener = _state['listener']
+        if listener:
+            listener.stop()
+            _state['listener'] = None
+
+def get_logging_stats():
+    """Statistik pipeline logging untuk monitoring"""
+    handler, sampler = _state['handler'], _state['sampler']
+    return {
+        'queued': handler.queue.qsize() if handler else 0,
+        'dropped_queue_full': handler.dropped if handler else 0,
+        'dropped_sampled': sampler.dropped if sampler else 0,
+    }
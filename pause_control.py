@@ -0,0 +1,58 @@
+# Status pause/resume satu job transfer
+
+import asyncio
+
+class PauseControl:
+    """
+    Flag pause satu job. Loop transfer mengecek paused di batas chunk lalu menunggu
+    wait_resumed(); listener dipanggil setiap status berubah (dipakai worker pool untuk
+    meneruskan status ke proses worker).
+    """
+
+    def __init__(self, paused=False):
+        self._running = asyncio.Event()
+        if not paused:
+            self._running.set()
+        self._listeners = []
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def pause(self):
+        if not self.paused:
+            self._running.clear()
+            self._notify()
+
+    def resume(self):
+        if self.paused:
+            self._running.set()
+            self._notify()
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self):
+        for callback in list(self._listeners):
+            callback(self.paused)
+
+    async def wait_resumed(self, cancellation_event=None):
+        """
+        Tunggu sampai job di-resume atau dibatalkan.
+        Mengembalikan False jika yang terjadi pembatalan.
+        """
+        if not cancellation_event:
+            await self._running.wait()
+            return True
+        resumed = asyncio.ensure_future(self._running.wait())
+        cancelled = asyncio.ensure_future(cancellation_event.wait())
+        try:
+            await asyncio.wait({resumed, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            resumed.cancel()
+            cancelled.cancel()
+        return not cancellation_event.is_set()
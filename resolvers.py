@@ -0,0 +1,201 @@
+# Registry resolver sumber: mengubah link share/halaman hosting menjadi URL download langsung
+
+import re
+import json
+import time
+import base64
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, urlencode, parse_qs, urlunparse, unquote
+import requests # type: ignore
+from config import DownloadConfig, ResolverConfig
+
+logger = logging.getLogger(__name__)
+
+# Hasil fetch halaman. Resolver hanya bergantung pada struktur ini sehingga bisa diuji
+# offline dengan fetch palsu yang mengembalikan FetchResult dari fixture rekaman.
+FetchResult = namedtuple('FetchResult', ['status_code', 'url', 'headers', 'text'])
+
+class ResolverError(Exception):
+    """Resolver mengenali URL tetapi gagal mendapatkan URL download langsung"""
+    pass
+
+def http_fetch(url, headers=None):
+    """Fetch default: GET mengikuti redirect dan kembalikan FetchResult"""
+    resp = requests.get(
+        url,
+        headers=dict({'User-Agent': ResolverConfig.USER_AGENT}, **(headers or {})),
+        allow_redirects=True,
+        timeout=DownloadConfig.TIMEOUT
+    )
+    return FetchResult(resp.status_code, resp.url, dict(resp.headers), resp.text)
+
+class SourceResolver(ABC):
+    """
+    Base class plugin resolver.
+    matches() menentukan apakah resolver menangani URL, resolve() mengembalikan dict
+    {'url': direct_url, 'filename': ..., 'size': ...} (filename/size opsional).
+    Plugin tanpa resolve() gagal saat dibuat, bukan saat URL pertama di-resolve.
+    """
+    name = 'base'
+    ttl = ResolverConfig.DEFAULT_TTL
+    hosts: Tuple[str, ...] = ()
+
+    def matches(self, url: str) -> bool:
+        host = urlparse(url).netloc.lower()
+        return any(host == h or host.endswith('.' + h) for h in self.hosts)
+
+    @abstractmethod
+    def resolve(self, url: str, fetch) -> dict:
+        pass
+
+class DropboxResolver(SourceResolver):
+    """Link share Dropbox: paksa dl=1 agar langsung mengarah ke file"""
+    name = 'dropbox'
+    ttl = ResolverConfig.STATIC_TTL
+    hosts = ('dropbox.com',)
+
+    def resolve(self, url, fetch):
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        query['dl'] = ['1']
+        direct = urlunparse(parsed._replace(query=urlencode(query, doseq=True)))
+        return {'url': direct, 'filename': unquote(parsed.path.rstrip('/').split('/')[-1]) or None}
+
+class OneDriveResolver(SourceResolver):
+    """Link share OneDrive (1drv.ms / onedrive.live.com) lewat endpoint shares API"""
+    name = 'onedrive'
+    ttl = ResolverConfig.STATIC_TTL
+    hosts = ('1drv.ms', 'onedrive.live.com')
+
+    def resolve(self, url, fetch):
+        encoded = base64.urlsafe_b64encode(url.encode('utf-8')).decode('ascii').rstrip('=')
+        return {'url': f"https://api.onedrive.com/v1.0/shares/u!{encoded}/root/content"}
+
+class SourceForgeResolver(SourceResolver):
+    """Halaman file SourceForge (.../files/<path>/download) ke downloads.sourceforge.net"""
+    name = 'sourceforge'
+    ttl = ResolverConfig.STATIC_TTL
+    hosts = ('sourceforge.net',)
+    _pattern = re.compile(r'^/projects/([^/]+)/files/(.+?)(?:/download)?/?$')
+
+    def resolve(self, url, fetch):
+        parsed = urlparse(url)
+        match = self._pattern.match(parsed.path)
+        if not match:
+            raise ResolverError("Link SourceForge harus mengarah ke file (/projects/<nama>/files/...)")
+        project, path = match.groups()
+        return {
+            'url': f"https://downloads.sourceforge.net/project/{project}/{path}",
+            'filename': unquote(path.split('/')[-1])
+        }
+
+class GitHubReleaseResolver(SourceResolver):
+    """
+    Release GitHub. Link releases/download sudah langsung; halaman releases/tag/<tag>
+    dan releases/latest di-resolve lewat GitHub API jika release hanya punya satu asset.
+    """
+    name = 'github'
+    ttl = ResolverConfig.PAGE_TTL
+    hosts = ('github.com',)
+    _pattern = re.compile(r'^/([^/]+)/([^/]+)/releases/(?:(latest)|tag/([^/]+))/?$')
+
+    def matches(self, url):
+        return super().matches(url) and '/releases/' in urlparse(url).path
+
+    def resolve(self, url, fetch):
+        path = urlparse(url).path
+        if '/releases/download/' in path:
+            return {'url': url, 'filename': unquote(path.rstrip('/').split('/')[-1])}
+
+        match = self._pattern.match(path)
+        if not match:
+            raise ResolverError("Link release GitHub tidak dikenali")
+        owner, repo, latest, tag = match.groups()
+        api_url = f"https://api.github.com/repos/{owner}/{repo}/releases/" + ('latest' if latest else f"tags/{tag}")
+        result = fetch(api_url, headers={'Accept': 'application/vnd.github+json'})
+        if result.status_code != 200:
+            raise ResolverError(f"GitHub API mengembalikan status {result.status_code}")
+
+        assets = json.loads(result.text).get('assets', [])
+        if len(assets) != 1:
+            names = ", ".join(asset['name'] for asset in assets[:10]) or "tidak ada asset"
+            raise ResolverError(f"Release punya {len(assets)} asset, kirim link asset langsung ({names})")
+        asset = assets[0]
+        return {'url': asset['browser_download_url'], 'filename': asset['name'], 'size': asset.get('size')}
+
+class MediaFireResolver(SourceResolver):
+    """Halaman file MediaFire: ambil tombol download dari HTML"""
+    name = 'mediafire'
+    ttl = ResolverConfig.PAGE_TTL
+    hosts = ('mediafire.com',)
+    _download_link = re.compile(r'href="(https?://download\d*\.mediafire\.com/[^"]+)"')
+
+    def resolve(self, url, fetch):
+        result = fetch(url)
+        if result.status_code != 200:
+            raise ResolverError(f"Halaman MediaFire mengembalikan status {result.status_code}")
+        match = self._download_link.search(result.text)
+        if not match:
+            raise ResolverError("Link download tidak ditemukan di halaman MediaFire")
+        direct = match.group(1)
+        return {'url': direct, 'filename': unquote(urlparse(direct).path.rstrip('/').split('/')[-1])}
+
+# Registry dan cache resolusi
+_resolvers: List[SourceResolver] = []
+_resolution_cache: Dict[str, Tuple[dict, float]] = {}
+
+def register_resolver(resolver: SourceResolver) -> None:
+    """Daftarkan plugin resolver (dicoba sesuai urutan pendaftaran)"""
+    _resolvers.append(resolver)
+
+def find_resolver(url: str) -> Optional[SourceResolver]:
+    """Cari resolver pertama yang menangani URL"""
+    for resolver in _resolvers:
+        if resolver.matches(url):
+            return resolver
+    return None
+
+def get_resolver_stats() -> dict:
+    """Statistik resolver untuk monitoring"""
+    return {
+        'resolvers': [resolver.name for resolver in _resolvers],
+        'cache_size': len(_resolution_cache)
+    }
+
+async def resolve_source(url: str, fetch=None) -> Optional[dict]:
+    """
+    Resolve URL lewat plugin yang cocok (dengan cache per TTL resolver).
+    Mengembalikan None jika tidak ada resolver yang cocok (URL dipakai apa adanya),
+    raise ResolverError jika resolver gagal.
+    """
+    resolver = find_resolver(url)
+    if not resolver:
+        return None
+
+    cached = _resolution_cache.get(url)
+    if cached and cached[1] > time.time():
+        logger.info(f"Cache hit resolver {resolver.name} untuk URL: {url[:50]}...")
+        return cached[0]
+
+    resolved = await asyncio.to_thread(resolver.resolve, url, fetch or http_fetch)
+    resolved['resolver'] = resolver.name
+    # Dict berurutan sesuai waktu simpan: entri baru selalu di akhir
+    _resolution_cache.pop(url, None)
+    if len(_resolution_cache) >= ResolverConfig.CACHE_MAX_ENTRIES:
+        now = time.time()
+        for key in [k for k, (_, expires) in _resolution_cache.items() if expires <= now]:
+            _resolution_cache.pop(key, None)
+    while len(_resolution_cache) >= ResolverConfig.CACHE_MAX_ENTRIES:
+        # Masih penuh: buang entri tertua
+        _resolution_cache.pop(next(iter(_resolution_cache)))
+    _resolution_cache[url] = (resolved, time.time() + resolver.ttl)
+    logger.info(f"Resolver {resolver.name}: {url[:50]}... -> {resolved['url'][:80]}...")
+    return resolved
+
+for _resolver in (GitHubReleaseResolver(), DropboxResolver(), OneDriveResolver(),
+                  MediaFireResolver(), SourceForgeResolver()):
+    register_resolver(_resolver)
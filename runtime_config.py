@@ -0,0 +1,180 @@
+# Konfigurasi runtime berlapis: default (config.py) < file JSON < environment < override admin
+
+import os
+import json
+import logging
+import threading
+from config import DownloadConfig, UIConfig, GoogleDriveConfig, RuntimeConfig
+
+logger = logging.getLogger(__name__)
+
+_DRIVE_CHUNK_ALIGN = 256 * 1024  # chunk resumable Drive wajib kelipatan 256KB
+
+# key -> (kelas config, atribut, tipe, minimum, maksimum, kelipatan)
+TUNABLES = {
+    'download.timeout': (DownloadConfig, 'TIMEOUT', int, 1, 600, None),
+    'download.max_retries': (DownloadConfig, 'MAX_RETRIES', int, 1, 20, None),
+    'download.chunk_size_mb': (DownloadConfig, 'CHUNK_SIZE_MB', int, 1, 1024, None),
+    'download.stall_timeout': (DownloadConfig, 'STALL_TIMEOUT', int, 1, 600, None),
+    'download.stall_min_speed_kb': (DownloadConfig, 'STALL_MIN_SPEED_KB', int, 0, 1024 * 1024, None),
+    'ui.update_interval': (UIConfig, 'UPDATE_INTERVAL', float, 0, 60, None),
+    'drive.max_chunk_size': (GoogleDriveConfig, 'MAX_CHUNK_SIZE', int, _DRIVE_CHUNK_ALIGN, 1024 ** 3, _DRIVE_CHUNK_ALIGN),
+    'drive.small_file_threshold': (GoogleDriveConfig, 'SMALL_FILE_THRESHOLD', int, 0, 100 * 1024 * 1024, None),
+    'drive.upload_timeout': (GoogleDriveConfig, 'UPLOAD_TIMEOUT', int, 10, 3600, None),
+}
+
+def env_name(key):
+    """Nama env var untuk key, mis. download.chunk_size_mb -> BOT_DOWNLOAD_CHUNK_SIZE_MB"""
+    return RuntimeConfig.ENV_PREFIX + key.upper().replace('.', '_')
+
+def parse_value(key, raw):
+    """
+    Validasi dan konversi nilai (string dari env/command atau nilai JSON).
+    Raise ValueError jika key tidak dikenal atau nilai di luar batas.
+    """
+    if key not in TUNABLES:
+        raise ValueError(f"Key konfigurasi tidak dikenal: {key}")
+    _, _, kind, minimum, maximum, multiple = TUNABLES[key]
+    try:
+        value = kind(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} harus {kind.__name__}: {raw}")
+    if isinstance(raw, float) and kind is int and raw != value:
+        raise ValueError(f"{key} harus bilangan bulat: {raw}")
+    if not minimum <= value <= maximum:
+        raise ValueError(f"{key} harus di antara {minimum} dan {maximum}: {value}")
+    if multiple and value % multiple:
+        raise ValueError(f"{key} harus kelipatan {multiple}: {value}")
+    return value
+
+def _flatten(data, prefix=''):
+    """{'download': {'timeout': 30}} -> {'download.timeout': 30}, key datar dibiarkan"""
+    flat = {}
+    for name, value in data.items():
+        key = f"{prefix}{name}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, key + '.'))
+        else:
+            flat[key] = value
+    return flat
+
+def check_env(env=None):
+    """Daftar error untuk override environment yang tidak valid (dipakai validasi start)"""
+    env = os.environ if env is None else env
+    errors = []
+    for key in TUNABLES:
+        raw = env.get(env_name(key))
+        if raw is not None:
+            try:
+                parse_value(key, raw)
+            except ValueError as e:
+                errors.append(f"{env_name(key)}: {e}")
+    return errors
+
+class RuntimeSettings:
+    """
+    Nilai efektif tunable dari empat lapisan. Nilai diterapkan langsung ke atribut kelas
+    di config.py, sehingga kode transfer yang membaca DownloadConfig.TIMEOUT dsb. saat
+    dipakai (per request, per chunk) otomatis memakai nilai baru tanpa restart.
+    """
+
+    LAYERS = ('default', 'file', 'env', 'admin')
+
+    def __init__(self):
+        self.defaults = {key: getattr(cls, attr) for key, (cls, attr, *_) in TUNABLES.items()}
+        self.layers = {'file': {}, 'env': {}, 'admin': {}}
+        self._file_mtime = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return os.getenv(RuntimeConfig.FILE_ENV, RuntimeConfig.DEFAULT_FILE)
+
+    def _read_layer(self, name, raw_values):
+        """Validasi satu lapisan, nilai yang tidak valid dilewati dengan warning"""
+        values = {}
+        for key, raw in raw_values.items():
+            try:
+                values[key] = parse_value(key, raw)
+            except ValueError as e:
+                logger.warning(f"Konfigurasi {name} diabaikan: {e}")
+        return values
+
+    def _load_file(self):
+        """Baca ulang file JSON hanya jika mtime berubah, None berarti tidak ada perubahan"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._file_mtime:
+            return None
+        self._file_mtime = mtime
+        if mtime is None:
+            return {}
+        try:
+            with open(self.path) as f:
+                return _flatten(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.error(f"Gagal membaca file konfigurasi {self.path}: {e}")
+            return None
+
+    def effective(self):
+        """Nilai efektif per key: lapisan tertinggi yang mengisi key menang"""
+        values = dict(self.defaults)
+        for name in ('file', 'env', 'admin'):
+            values.update(self.layers[name])
+        return values
+
+    def source_of(self, key):
+        """Nama lapisan asal nilai efektif key"""
+        for name in ('admin', 'env', 'file'):
+            if key in self.layers[name]:
+                return name
+        return 'default'
+
+    def reload(self, store=None):
+        """
+        Muat ulang file, environment dan override admin (dari job store bersama),
+        lalu terapkan. Mengembalikan dict key -> nilai baru untuk key yang berubah.
+        """
+        with self._lock:
+            before = self.effective()
+            file_values = self._load_file()
+            if file_values is not None:
+                self.layers['file'] = self._read_layer('file', file_values)
+            self.layers['env'] = self._read_layer('env', {
+                key: os.environ[env_name(key)] for key in TUNABLES if env_name(key) in os.environ
+            })
+            if store is not None:
+                self.layers['admin'] = self._read_layer('admin', store.get_settings())
+            return self._apply(before, self.effective())
+
+    def apply_values(self, values):
+        """Terapkan snapshot nilai efektif dari proses lain (proses worker transfer)"""
+        with self._lock:
+            before = self.effective()
+            self.layers['admin'] = self._read_layer('snapshot', values)
+            return self._apply(before, self.effective())
+
+    def _apply(self, before, after):
+        changed = {key: value for key, value in after.items() if before.get(key) != value
+                   or getattr(TUNABLES[key][0], TUNABLES[key][1]) != value}
+        for key, value in changed.items():
+            cls, attr = TUNABLES[key][:2]
+            setattr(cls, attr, value)
+        if changed:
+            logger.info(f"Konfigurasi runtime diperbarui: {changed}")
+        return changed
+
+    def snapshot(self):
+        """Nilai efektif saat ini untuk dikirim ke proses worker"""
+        with self._lock:
+            return self.effective()
+
+    def describe(self):
+        """Daftar (key, nilai, lapisan asal) untuk ditampilkan ke admin"""
+        with self._lock:
+            values = self.effective()
+            return [(key, values[key], self.source_of(key)) for key in TUNABLES]
+
+runtime_settings = RuntimeSettings()
@@ -0,0 +1,111 @@
+# Jadwal cron untuk mirror berulang: parsing ekspresi dan waktu jalan berikutnya yang disebar
+
+import time
+import zlib
+from datetime import datetime, timedelta
+from config import ScheduleConfig
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+# (min, max) untuk menit, jam, tanggal, bulan, hari (0 dan 7 = Minggu)
+_FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+_FIELD_NAMES = ('menit', 'jam', 'tanggal', 'bulan', 'hari')
+
+class CronError(ValueError):
+    """Ekspresi cron tidak valid atau tidak pernah cocok dengan tanggal mana pun"""
+    pass
+
+def _parse_field(text, low, high, name):
+    """Parse satu kolom cron ('*', '5', '1-5', '*/15', '0,30', '10-50/10') menjadi set nilai"""
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            if not step_text.isdigit() or int(step_text) < 1:
+                raise CronError(f"Step {name} tidak valid: {text}")
+            step = int(step_text)
+        try:
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(x) for x in part.split('-', 1))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+        except ValueError:
+            raise CronError(f"Kolom {name} tidak valid: {text}")
+        if start < low or end > high or start > end:
+            raise CronError(f"Kolom {name} di luar rentang {low}-{high}: {text}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+class CronSchedule:
+    """
+    Ekspresi cron 5 kolom (menit jam tanggal bulan hari) atau alias @hourly/@daily/@weekly/@monthly,
+    dievaluasi dalam waktu lokal server. Seperti cron standar, jika tanggal dan hari sama-sama
+    dibatasi, cukup salah satu yang cocok.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        fields = ALIASES.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise CronError("Ekspresi cron harus 5 kolom: menit jam tanggal bulan hari")
+        parsed = [_parse_field(field, low, high, name)
+                  for field, (low, high), name in zip(fields, _FIELD_RANGES, _FIELD_NAMES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = frozenset(0 if day == 7 else day for day in weekdays)
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def _day_matches(self, moment):
+        weekday = (moment.weekday() + 1) % 7  # datetime: Senin=0, cron: Minggu=0
+        day_ok = moment.day in self.days
+        weekday_ok = weekday in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, after):
+        """Menit pertama setelah after (datetime) yang cocok dengan ekspresi"""
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 4)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise CronError(f"Ekspresi cron tidak pernah cocok: {self.expression}")
+
+def spread_offset(key, interval):
+    """
+    Offset tetap (detik) per jadwal agar jadwal dengan ekspresi sama tidak jalan bersamaan.
+    Maksimal JITTER_FRACTION dari interval cron, dibatasi MAX_JITTER.
+    """
+    window = int(min(ScheduleConfig.MAX_JITTER, interval * ScheduleConfig.JITTER_FRACTION))
+    if window < 1:
+        return 0
+    return zlib.crc32(key.encode()) % window
+
+def next_run_time(expression, key, now=None):
+    """Timestamp jalan berikutnya untuk jadwal (key: identitas tetap jadwal, mis. 'user_id:url')"""
+    cron = CronSchedule(expression)
+    base = cron.next_after(datetime.fromtimestamp(now or time.time()))
+    interval = (cron.next_after(base) - base).total_seconds()
+    return base.timestamp() + spread_offset(key, interval)
+
+def schedule_key(user_id, url):
+    return f"{user_id}:{url}"
@@ -0,0 +1,277 @@
+# Pembacaan sumber HTTP dengan watchdog stall dan reconnect via Range
+
+import requests # type: ignore
+import logging
+import time
+from config import DownloadConfig
+from http_layer import install as install_http_layer
+
+logger = logging.getLogger(__name__)
+
+install_http_layer()
+
+class SourceStallError(Exception):
+    """Sumber stall dan tidak bisa dibuka ulang"""
+    pass
+
+class SourceChangedError(SourceStallError):
+    """File sumber berubah di antara dua koneksi, melanjutkan berarti menyambung dua versi"""
+    pass
+
+def _total_length(resp):
+    """Ukuran total file dari Content-Range (206) atau Content-Length (200), None jika tidak diketahui"""
+    if resp.status_code == 206:
+        total = resp.headers.get('Content-Range', '').rpartition('/')[2]
+    else:
+        total = resp.headers.get('Content-Length', '')
+    return int(total) if total.isdigit() else None
+
+def _size_getter(chunk_size):
+    """Samakan chunk_size int dan callable menjadi callable"""
+    return chunk_size if callable(chunk_size) else (lambda: chunk_size)
+
+class SourceStream:
+    """
+    Membaca response sumber per blok kecil sambil memantau throughput baca.
+    Jika koneksi putus, read timeout, atau throughput di bawah batas selama satu window,
+    sumber dibuka ulang dengan header Range: bytes=<offset>- dan pembacaan dilanjutkan
+    dari offset yang sama sehingga sesi upload Drive tetap dipakai.
+    ETag, Last-Modified dan ukuran total dari response pertama dikirim lewat If-Range dan
+    dibandingkan dengan response baru, agar file yang berubah di tengah transfer tidak
+    tersambung dari dua versi berbeda.
+    """
+
+    def __init__(self, url, resp):
+        self.url = url
+        self.resp = resp
+        self.offset = 0
+        self.reconnects = 0
+        self.supports_range = resp.headers.get('Accept-Ranges', '').lower() == 'bytes'
+        self.etag = resp.headers.get('ETag')
+        self.last_modified = resp.headers.get('Last-Modified')
+        self.total = _total_length(resp)
+        self._blocks = None
+        self._leftover = b''
+        self._suspended = False
+        self._reset_window()
+
+    def _reset_window(self):
+        """Mulai ulang window pengukuran throughput"""
+        self._window_bytes = 0
+        self._window_read_time = 0.0
+
+    def _read_block(self):
+        """Baca satu blok dari response aktif, b'' berarti EOF"""
+        if self._leftover:
+            block, self._leftover = self._leftover, b''
+            return block
+        if self._suspended:
+            # Job di-resume: buka ulang sumber dari offset terakhir
+            self._suspended = False
+            logger.info(f"Melanjutkan sumber dari offset {self.offset}")
+            self._open_at_offset()
+        if self._blocks is None:
+            block_size = DownloadConfig.READ_BLOCK_SIZE_KB * 1024
+            self._blocks = self.resp.iter_content(chunk_size=block_size)
+        return next(self._blocks, b'')
+
+    def _is_slow(self):
+        """
+        Cek throughput dalam window. Hanya waktu baca yang dihitung, bukan waktu upload,
+        supaya jeda upload chunk tidak dianggap stall.
+        """
+        if self._window_read_time < DownloadConfig.STALL_WINDOW:
+            return False
+        speed = self._window_bytes / self._window_read_time
+        self._reset_window()
+        return speed < DownloadConfig.STALL_MIN_SPEED_KB * 1024
+
+    def _reopen(self, reason):
+        """Buka ulang sumber mulai dari offset saat ini"""
+        if self.reconnects >= DownloadConfig.MAX_RECONNECTS:
+            raise SourceStallError(f"Sumber stall ({reason}) setelah {self.reconnects} kali reconnect")
+        self.reconnects += 1
+        logger.warning(
+            f"Sumber stall ({reason}) pada offset {self.offset}, reconnect "
+            f"{self.reconnects}/{DownloadConfig.MAX_RECONNECTS}"
+        )
+        self.close()
+        self._open_at_offset()
+
+    def _range_headers(self):
+        """Header Range + If-Range (ETag kuat, jika tidak ada Last-Modified) untuk offset saat ini"""
+        if not (self.supports_range and self.offset):
+            return {}
+        headers = {'Range': f'bytes={self.offset}-'}
+        # If-Range hanya boleh memakai ETag kuat; ETag lemah (W/...) diganti Last-Modified
+        validator = self.etag if self.etag and not self.etag.startswith('W/') else self.last_modified
+        if validator:
+            headers['If-Range'] = validator
+        return headers
+
+    def _check_unchanged(self, resp):
+        """Raise SourceChangedError jika validator atau ukuran total response baru berbeda"""
+        etag = resp.headers.get('ETag')
+        last_modified = resp.headers.get('Last-Modified')
+        total = _total_length(resp)
+        if self.etag and etag and etag != self.etag:
+            reason = f"ETag {self.etag} -> {etag}"
+        elif self.last_modified and last_modified and last_modified != self.last_modified:
+            reason = f"Last-Modified {self.last_modified} -> {last_modified}"
+        elif self.total is not None and total is not None and total != self.total:
+            reason = f"ukuran {self.total} -> {total}"
+        else:
+            return
+        self.close()
+        raise SourceChangedError(f"File sumber berubah selama transfer ({reason})")
+
+    def _open_at_offset(self):
+        """Request ulang sumber dengan Range mulai self.offset dan validasi responsenya"""
+        headers = self._range_headers()
+        try:
+            resp = requests.get(
+                self.url,
+                stream=True,
+                allow_redirects=True,
+                headers=headers,
+                timeout=(DownloadConfig.TIMEOUT, DownloadConfig.STALL_TIMEOUT)
+            )
+        except requests.RequestException as e:
+            # Pesan exception memuat URL sumber (bisa berisi token bot), detail hanya ke log
+            logger.warning(f"Gagal membuka ulang sumber: {e}")
+            raise SourceStallError(f"Gagal membuka ulang sumber ({type(e).__name__})")
+
+        self.resp = resp
+        self._blocks = None
+        self._leftover = b''
+        self._reset_window()
+
+        if resp.status_code == 206:
+            content_range = resp.headers.get('Content-Range', '')
+            if not content_range.startswith(f'bytes {self.offset}-'):
+                self.close()
+                raise SourceStallError(f"Content-Range tidak sesuai offset {self.offset}: {content_range}")
+            self._check_unchanged(resp)
+        elif resp.status_code == 200:
+            # 200 atas If-Range berarti validator tidak cocok; tanpa perubahan validator
+            # berarti server mengabaikan Range, buang byte yang sudah diterima
+            self._check_unchanged(resp)
+            self.supports_range = False
+            self._skip(self.offset)
+        else:
+            self.close()
+            raise SourceStallError(f"Gagal membuka ulang sumber. Status: {resp.status_code}")
+
+    def _skip(self, nbytes):
+        """Lewati nbytes pertama dari response baru (server tanpa dukungan Range)"""
+        remaining = nbytes
+        while remaining > 0:
+            block = self._read_block()
+            if not block:
+                raise SourceStallError("Sumber berakhir sebelum offset tercapai")
+            if len(block) > remaining:
+                self._leftover = block[remaining:]
+            remaining -= len(block)
+
+    def iter_chunks(self, chunk_size, on_block=None):
+        """
+        Generator chunk berukuran chunk_size (chunk terakhir boleh lebih kecil).
+        chunk_size boleh berupa callable yang dievaluasi ulang di setiap batas chunk,
+        sehingga perubahan konfigurasi runtime berlaku untuk job yang sedang berjalan.
+        Reconnect dilakukan secara transparan di antara blok baca.
+        on_block(nbytes): hook sinkron per blok baca (mis. throttle bandwidth), waktu tunggunya
+        tidak dihitung ke throughput watchdog.
+        """
+        next_size = _size_getter(chunk_size)
+        size = next_size()
+        buffer = bytearray()
+        while True:
+            read_start = time.time()
+            try:
+                block = self._read_block()
+            except requests.RequestException as e:
+                self._reopen(f"error baca: {type(e).__name__}")
+                continue
+            self._window_read_time += time.time() - read_start
+
+            if not block:
+                break
+
+            buffer += block
+            self.offset += len(block)
+            self._window_bytes += len(block)
+            if on_block:
+                on_block(len(block))
+
+            # Throughput lambat hanya ditangani jika server mendukung Range,
+            # tanpa Range reconnect berarti mengulang dari awal
+            if self._is_slow() and self.supports_range:
+                self._reopen("throughput rendah")
+
+            while len(buffer) >= size:
+                yield bytes(buffer[:size])
+                del buffer[:size]
+                size = next_size()
+
+        if buffer:
+            yield bytes(buffer)
+
+    def suspend(self):
+        """
+        Lepas koneksi sumber saat job di-pause. Pembacaan berikutnya membuka ulang sumber
+        dengan Range dari offset terakhir (tanpa dihitung sebagai reconnect stall).
+        """
+        if not self.supports_range:
+            logger.warning("Sumber tidak mendukung Range, resume akan mengunduh ulang dan melewati byte yang sudah diterima")
+        self.close()
+        self._blocks = None
+        self._suspended = True
+
+    def close(self):
+        """Tutup response aktif dan lepaskan koneksi"""
+        try:
+            self.resp.close()
+        except Exception:
+            pass
+
+class LocalFileStream:
+    """
+    Sumber file lokal (mis. file dari Bot API server mode --local) dengan antarmuka
+    iter_chunks()/close() yang sama seperti SourceStream.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.offset = 0
+        self.reconnects = 0
+
+    def iter_chunks(self, chunk_size, on_block=None):
+        """
+        Generator chunk berukuran chunk_size (int atau callable, chunk terakhir boleh lebih kecil).
+        on_block dipanggil per chunk; file lokal tidak lewat jaringan sehingga tidak dipecah per blok.
+        """
+        next_size = _size_getter(chunk_size)
+        while True:
+            if self.file.closed:
+                # Dibuka ulang setelah suspend()
+                self.file = open(self.path, 'rb')
+                self.file.seek(self.offset)
+            chunk = self.file.read(next_size())
+            if not chunk:
+                return
+            self.offset += len(chunk)
+            if on_block:
+                on_block(len(chunk))
+            yield chunk
+
+    def suspend(self):
+        """Tutup file saat job di-pause, dibuka ulang di offset yang sama saat dibaca lagi"""
+        self.close()
+
+    def close(self):
+        """Tutup file"""
+        try:
+            self.file.close()
+        except Exception:
+            pass
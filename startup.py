@@ -0,0 +1,86 @@
+# Validasi konfigurasi cepat dan pemanasan modul berat saat start bot
+
+import os
+import re
+import time
+import logging
+import importlib
+from urllib.parse import urlparse
+from runtime_config import check_env
+from config import StartupConfig, WorkerConfig, JobConfig, TelegramConfig, GoogleDriveConfig
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r'^\d+:[A-Za-z0-9_-]+$')
+
+def validate_config(env=None):
+    """
+    Cek konfigurasi environment tanpa import modul berat dan tanpa akses jaringan.
+    Mengembalikan (errors, warnings): errors membuat bot tidak boleh start.
+    """
+    env = os.environ if env is None else env
+    errors, warnings = [], []
+
+    token = env.get("TELEGRAM_TOKEN")
+    if not token:
+        errors.append("TELEGRAM_TOKEN belum diset")
+    elif not _TOKEN_PATTERN.match(token):
+        errors.append("TELEGRAM_TOKEN tidak berformat <id>:<secret>")
+
+    webhook_url = env.get("WEBHOOK_URL")
+    if not webhook_url:
+        errors.append("WEBHOOK_URL belum diset")
+    elif urlparse(webhook_url).scheme not in ('http', 'https') or not urlparse(webhook_url).netloc:
+        errors.append(f"WEBHOOK_URL tidak valid: {webhook_url}")
+
+    for name, default, minimum in (("PORT", "8080", 1), (WorkerConfig.PROCESS_COUNT_ENV, "0", 0)):
+        value = env.get(name, default)
+        if not value.isdigit() or int(value) < minimum:
+            errors.append(f"{name} harus bilangan bulat >= {minimum}: {value}")
+
+    admin_ids = [x.strip() for x in env.get("ADMIN_IDS", "").split(",") if x.strip()]
+    if any(not x.lstrip('-').isdigit() for x in admin_ids):
+        errors.append("ADMIN_IDS harus daftar user ID dipisah koma")
+
+    store_url = env.get(JobConfig.STORE_URL_ENV, JobConfig.DEFAULT_STORE_PATH)
+    if '://' in store_url and not store_url.startswith('sqlite:///'):
+        errors.append(f"{JobConfig.STORE_URL_ENV} tidak didukung: {store_url}")
+
+    api_url = env.get(TelegramConfig.API_URL_ENV)
+    if api_url and urlparse(api_url).scheme not in ('http', 'https'):
+        errors.append(f"{TelegramConfig.API_URL_ENV} tidak valid: {api_url}")
+
+    errors += check_env(env)
+
+    subfolder = env.get(GoogleDriveConfig.SUBFOLDER_ENV)
+    if subfolder:
+        try:
+            subfolder.format(user_id=0, date='', year='', month='')
+        except (KeyError, IndexError, ValueError) as e:
+            errors.append(f"{GoogleDriveConfig.SUBFOLDER_ENV} hanya boleh memakai {{user_id}}, {{date}}, {{year}}, {{month}}: {e}")
+    policy = env.get(GoogleDriveConfig.DUPLICATE_POLICY_ENV)
+    if policy and policy.lower() not in ('skip', 'rename', 'allow'):
+        errors.append(f"{GoogleDriveConfig.DUPLICATE_POLICY_ENV} harus skip, rename atau allow: {policy}")
+
+    token_file = env.get('GOOGLE_OAUTH_TOKEN_FILE', 'token.json')
+    if not os.path.exists(token_file):
+        warnings.append(f"Token OAuth {token_file} tidak ditemukan, upload ke Drive akan gagal")
+    if not env.get('DRIVE_FOLDER_ID'):
+        warnings.append("DRIVE_FOLDER_ID belum diset, file di-upload ke root Drive")
+
+    return errors, warnings
+
+def warm_up(modules=None):
+    """
+    Import modul transfer di background setelah bot siap menerima webhook,
+    supaya request pertama tidak menanggung biaya import. Mengembalikan durasi (detik).
+    """
+    start = time.perf_counter()
+    for name in modules or StartupConfig.WARM_UP_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning(f"Gagal memuat modul {name} saat warm up: {e}")
+    elapsed = time.perf_counter() - start
+    logger.info(f"Warm up modul selesai dalam {elapsed:.2f}s")
+    return elapsed
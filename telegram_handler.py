@@ -1,15 +1,26 @@
 import os
+import time
 import logging
 import asyncio
+from urllib.parse import urlparse
 from telegram import Update, ReplyKeyboardMarkup, InlineKeyboardButton, InlineKeyboardMarkup # type: ignore
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler # type: ignore
 from dotenv import load_dotenv # type: ignore
-from validator import validate_url_and_file
-from downloader import stream_download_to_drive
-from utils import format_bytes, format_time, format_speed
+from telegram_source import document_info, get_api_url, is_cloud_api
+from bandwidth import bandwidth_manager
+from worker_pool import TransferWorkerPool
+from job_store import create_job_store, make_instance_id
+from log_pipeline import setup_logging, get_logging_stats
+from http_layer import get_net_stats
+from startup import validate_config, warm_up
+from runtime_config import runtime_settings, parse_value, TUNABLES
+from pause_control import PauseControl
+from scheduler import CronSchedule, CronError, next_run_time, schedule_key
+from job_state import JobRecord, PendingRecord, RUNNING, DONE, FAILED, CANCELLED, process_rss, records_size
+from utils import format_bytes, format_time, format_speed, parse_bytes
 from config import (
     DownloadConfig, UIConfig, TelegramConfig, 
-    ErrorMessages, SuccessMessages
+    ErrorMessages, SuccessMessages, GoogleDriveConfig, WorkerConfig, JobConfig, RuntimeConfig, ScheduleConfig
 )
 
 # Load environment variables
@@ -17,9 +28,11 @@ load_dotenv()
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")
 PORT = int(os.getenv("PORT", 8080))
+ADMIN_IDS = {int(x) for x in os.getenv("ADMIN_IDS", "").split(",") if x.strip()}
+TRANSFER_WORKERS = int(os.getenv(WorkerConfig.PROCESS_COUNT_ENV, WorkerConfig.DEFAULT_PROCESS_COUNT))
 
 # Setup logging
-logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Error handling helper functions
@@ -38,12 +51,14 @@ def handle_error(operation: str, error: Exception, level: str = "error", context
     if context_data:
         error_msg += f" | Context: {context_data}"
     
+    # operation dan context juga ikut sebagai field terstruktur di record JSON
+    extra = {'operation': operation, 'context': context_data}
     if level == "error":
-        logger.error(error_msg)
+        logger.error(error_msg, extra=extra)
     elif level == "warning":
-        logger.warning(error_msg)
+        logger.warning(error_msg, extra=extra)
     else:
-        logger.info(error_msg)
+        logger.info(error_msg, extra=extra)
 
 def get_error_message(operation: str, default_msg: str = None) -> str:
     """
@@ -70,26 +85,224 @@ def get_error_message(operation: str, default_msg: str = None) -> str:
     
     return error_mapping.get(operation, default_msg or ErrorMessages.UNKNOWN_ERROR)
 
-user_pending = {}  # Simpan status pending user dengan inline keyboard
-user_processes = {}  # Track proses yang sedang berjalan
+job_store = None  # JobStore bersama: pending konfirmasi dan antrean job
+user_processes = {}  # Registry lokal job yang berjalan di instance ini (key: job_id)
+running_jobs = {}  # job_id -> asyncio.Task
+job_wakeup = None  # asyncio.Event untuk membangunkan job_runner_loop
+INSTANCE_ID = make_instance_id()
+transfer_pool = None  # TransferWorkerPool jika TRANSFER_WORKERS > 0
 
-async def delete_messages_safely(context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_ids: list):
+async def run_transfer(job: dict, progress_callback, cancellation_event, pause=None):
+    """
+    Jalankan job transfer di worker pool jika aktif, jika tidak langsung di proses bot.
+    job: dict berisi url, info, user_id, destinations, extract, crawl (atau batch untuk batch file kecil)
+    pause: PauseControl untuk job streaming/crawl (ekstrak arsip dan batch file kecil tidak bisa di-pause)
+    """
+    if transfer_pool:
+        return await transfer_pool.run(job, progress_callback, cancellation_event, pause)
+
+    # Import di sini agar stack transfer (requests, google-auth) tidak memperlambat start bot
+    from downloader import stream_download_to_drive, mirror_small_batch
+    from archive_extract import extract_archive_to_drive
+    from crawler import mirror_directory
+    from drive_index import route_destinations
+
+    # Subfolder per user/tanggal (DRIVE_SUBFOLDER) ditentukan sekali per job dari indeks Drive
+    job = dict(job, destinations=await asyncio.to_thread(route_destinations, job.get('destinations'), job['user_id']))
+    if job.get('crawl'):
+        return await mirror_directory(job['url'], progress_callback, cancellation_event, job['user_id'],
+                                      destinations=job.get('destinations'), store=job_store, pause=pause)
+    if job.get('extract'):
+        return await extract_archive_to_drive(job['url'], job['info'], progress_callback, cancellation_event, job['user_id'],
+                                              destinations=job.get('destinations'))
+    if job.get('batch'):
+        await mirror_small_batch(job['batch'], progress_callback, cancellation_event, job['user_id'],
+                                 destinations=job.get('destinations'))
+        return None
+    return await stream_download_to_drive(job['url'], job['info'], progress_callback, cancellation_event, job['user_id'],
+                                          destinations=job.get('destinations'), pause=pause)
+
+async def reload_runtime_config() -> dict:
+    """Muat ulang konfigurasi runtime dan teruskan ke worker jika ada yang berubah"""
+    changed = await asyncio.to_thread(runtime_settings.reload, job_store)
+    if changed and transfer_pool:
+        transfer_pool.update_config(runtime_settings.snapshot())
+    return changed
+
+async def config_reload_loop():
+    """Cek perubahan file konfigurasi dan override admin (juga dari instance lain) secara berkala"""
+    while True:
+        await asyncio.sleep(RuntimeConfig.RELOAD_INTERVAL)
+        try:
+            await reload_runtime_config()
+        except Exception as e:
+            handle_error("config_reload", e, "warning")
+
+async def memory_report() -> dict:
+    """Jejak memori state job di instance ini, untuk /stats dan log reaper"""
+    return {
+        'rss': process_rss(),
+        'job_records': len(user_processes),
+        'record_bytes': records_size(user_processes.values()),
+        'running_tasks': len(running_jobs),
+        'pending': await asyncio.to_thread(job_store.count_pending) if job_store else 0,
+    }
+
+async def reap_state(bot) -> dict:
+    """
+    Buang state yang ditinggalkan: pending konfirmasi lewat JobConfig.PENDING_TTL (keyboard-nya
+    diganti pesan kedaluwarsa), job selesai lewat masa retensi, dan record/task lokal yatim.
+    """
+    expired = await asyncio.to_thread(job_store.reap_pending, JobConfig.PENDING_TTL)
+    for user_id, pending in expired:
+        try:
+            await bot.edit_message_text(
+                chat_id=pending.chat_id,
+                message_id=pending.confirm_message_id,
+                text=ErrorMessages.CONFIRMATION_EXPIRED
+            )
+        except Exception as e:
+            handle_error("expire_pending", e, "warning", {"user_id": user_id})
+    purged = await asyncio.to_thread(job_store.purge_finished_jobs, JobConfig.FINISHED_JOB_RETENTION)
+
+    # Task yang selesai tanpa sempat membersihkan diri (mis. dibatalkan sebelum mulai)
+    for job_id in [job_id for job_id, task in running_jobs.items() if task.done()]:
+        running_jobs.pop(job_id, None)
+    orphans = [job_id for job_id in user_processes if job_id not in running_jobs]
+    for job_id in orphans:
+        user_processes.pop(job_id, None)
+
+    reaped = {'pending': len(expired), 'jobs': purged, 'records': len(orphans)}
+    if any(reaped.values()):
+        logger.info(f"State dibersihkan: {reaped}, memori: {await memory_report()}")
+    return reaped
+
+async def state_reaper_loop(app: Application):
+    """Jalankan reap_state() berkala agar instance yang hidup lama tetap datar pemakaian memorinya"""
+    while True:
+        await asyncio.sleep(JobConfig.REAP_INTERVAL)
+        try:
+            await reap_state(app.bot)
+        except Exception as e:
+            handle_error("reap_state", e, "warning")
+
+async def run_schedule(bot, schedule: dict):
+    """
+    Satu jalan jadwal: HEAD kondisional dengan ETag/Last-Modified terakhir. Sumber yang tidak
+    berubah selesai dengan satu 304 tanpa transfer; yang berubah masuk antrean job biasa.
+    """
+    from validator import check_for_update
+
+    schedule_id = schedule['id']
+    next_run = next_run_time(schedule['cron'], schedule_key(schedule['user_id'], schedule['url']))
+    active_jobs = await asyncio.to_thread(job_store.get_active_jobs, schedule['user_id'])
+    active_ids = {job['id'] for job in active_jobs}
+    if schedule['last_job_id'] in active_ids:
+        await asyncio.to_thread(job_store.finish_schedule_run, schedule_id, next_run, "dilewati: run sebelumnya masih berjalan")
+        return
+
+    changed, result = await check_for_update(schedule['url'], schedule['etag'], schedule['last_modified'])
+    if 'error' in result:
+        logger.warning(f"Jadwal {schedule_id} gagal dicek: {result['error']}")
+        await asyncio.to_thread(
+            job_store.finish_schedule_run, schedule_id, min(next_run, time.time() + ScheduleConfig.RETRY_DELAY), f"gagal: {result['error']}"
+        )
+        return
+    if not changed:
+        logger.info(f"Jadwal {schedule_id}: sumber tidak berubah, transfer dilewati")
+        await asyncio.to_thread(job_store.finish_schedule_run, schedule_id, next_run, "tidak berubah")
+        return
+
+    progress_message = await bot.send_message(
+        chat_id=schedule['chat_id'],
+        text=f"{UIConfig.Emoji.INFO} Jadwal #{schedule_id}: {result['filename']} berubah, mirroring dimulai"
+    )
+    payload = {
+        'url': result.get('url', schedule['url']),
+        'info': result,
+        'destinations': schedule['destinations'],
+        'extract': False,
+        'crawl': False,
+        'chat_id': schedule['chat_id'],
+        'info_message_id': None,
+        'progress_message_id': progress_message.message_id,
+        'schedule_id': schedule_id
+    }
+    job_id = await asyncio.to_thread(job_store.enqueue_job, schedule['user_id'], payload)
+    await asyncio.to_thread(job_store.finish_schedule_run, schedule_id, next_run, "berubah, masuk antrean", job_id)
+    logger.info(f"Jadwal {schedule_id}: sumber berubah, job {job_id} masuk antrean")
+    if job_wakeup:
+        job_wakeup.set()
+    await attach_progress_keyboard(bot, schedule['chat_id'], progress_message.message_id, job_id, is_pausable(payload))
+
+async def schedule_loop(app: Application):
+    """
+    Cek jadwal jatuh tempo berkala. Per cek hanya MAX_RUNS_PER_CHECK jadwal yang diproses dengan
+    jeda RUN_SPACING, sisanya menunggu cek berikutnya, agar jadwal yang jatuh tempo bersamaan
+    tidak membanjiri antrean transfer.
+    """
+    while True:
+        await asyncio.sleep(ScheduleConfig.CHECK_INTERVAL)
+        try:
+            due = await asyncio.to_thread(job_store.claim_due_schedules, time.time(), ScheduleConfig.MAX_RUNS_PER_CHECK, ScheduleConfig.CLAIM_LEASE)
+        except Exception as e:
+            handle_error("schedule", e, "warning")
+            continue
+        for index, schedule in enumerate(due):
+            if index:
+                await asyncio.sleep(ScheduleConfig.RUN_SPACING)
+            try:
+                await run_schedule(app.bot, schedule)
+            except Exception as e:
+                handle_error("schedule", e, "warning", {"schedule_id": schedule['id']})
+
+async def on_startup(app: Application):
+    """post_init hook: buka job store, jalankan worker pool (jika dikonfigurasi) dan job runner"""
+    global job_store, job_wakeup, transfer_pool
+    job_store = await asyncio.to_thread(create_job_store)
+    job_wakeup = asyncio.Event()
+    await asyncio.to_thread(runtime_settings.reload, job_store)
+    if TRANSFER_WORKERS > 0:
+        transfer_pool = TransferWorkerPool(TRANSFER_WORKERS, bandwidth_manager)
+        transfer_pool.config = runtime_settings.snapshot()
+        await transfer_pool.start()
+    app.bot_data['job_runner'] = asyncio.create_task(job_runner_loop(app))
+    app.bot_data['config_reload'] = asyncio.create_task(config_reload_loop())
+    app.bot_data['state_reaper'] = asyncio.create_task(state_reaper_loop(app))
+    app.bot_data['scheduler'] = asyncio.create_task(schedule_loop(app))
+    # Modul transfer dimuat di thread terpisah selagi webhook mulai melayani update
+    app.bot_data['warm_up'] = asyncio.create_task(asyncio.to_thread(warm_up))
+    logger.info(f"Instance {INSTANCE_ID} siap mengambil job")
+
+async def on_shutdown(app: Application):
+    """
+    post_shutdown hook: hentikan job runner dan worker pool.
+    Job yang sedang berjalan tidak ditutup, lease-nya akan kedaluwarsa dan diambil instance lain.
+    """
+    for name in ('job_runner', 'config_reload', 'state_reaper', 'scheduler'):
+        task = app.bot_data.get(name)
+        if task:
+            task.cancel()
+    if transfer_pool:
+        await transfer_pool.stop()
+
+async def delete_messages_safely(bot, chat_id: int, message_ids: list):
     """
     Helper function untuk menghapus pesan secara aman
     Mencegah duplikasi logika penghapusan pesan
     """
     for message_id in message_ids:
         try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
+            await bot.delete_message(chat_id=chat_id, message_id=message_id)
         except Exception as e:
             handle_error("delete_message", e, "warning", {"message_id": message_id, "chat_id": chat_id})
 
-async def send_message_safely(context: ContextTypes.DEFAULT_TYPE, chat_id: int, text: str, **kwargs):
+async def send_message_safely(bot, chat_id: int, text: str, **kwargs):
     """
     Helper function untuk mengirim pesan secara aman
     """
     try:
-        return await context.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+        return await bot.send_message(chat_id=chat_id, text=text, **kwargs)
     except Exception as e:
         handle_error("send_message", e, "error", {"chat_id": chat_id, "text_length": len(text)})
         return None
@@ -101,10 +314,197 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         handle_error("start_command", e, "error", {"user_id": update.effective_user.id if update.effective_user else None})
 
+def extract_urls(text: str) -> list:
+    """
+    Ambil token http(s) dari pesan (dipisah baris/spasi), urut dan tanpa duplikat.
+    Teks lain di pesan (catatan, nomor urut) diabaikan.
+    """
+    urls = []
+    for token in text.split():
+        parsed = urlparse(token)
+        if parsed.scheme in ('http', 'https') and parsed.netloc and token not in urls:
+            urls.append(token)
+    return urls
+
 async def mirror(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler untuk menerima URL file dari user"""
+    text = update.message.text
+    urls = extract_urls(text)
+    if len(urls) > 1:
+        await mirror_batch(update, context, urls)
+        return
+    # Satu URL lewat jalur biasa; tanpa URL sama sekali validator yang melaporkan error
+    await prepare_mirror(update, urls[0] if urls else text.strip())
+
+def parse_destinations(text: str) -> list:
+    """
+    Parse daftar tujuan /mirrorto: folder ID atau link folder Drive dipisah koma.
+    Raise ValueError jika kosong, bukan folder, atau melebihi MAX_DESTINATIONS.
+    """
+    from drive_source import parse_drive_url
+
+    destinations = []
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        parsed = parse_drive_url(item) if '://' in item else ('folder', item)
+        if not parsed or parsed[0] != 'folder':
+            raise ValueError(f"Bukan folder Google Drive: {item[:60]}")
+        if parsed[1] not in destinations:
+            destinations.append(parsed[1])
+    if not destinations:
+        raise ValueError("Folder tujuan kosong")
+    if len(destinations) > GoogleDriveConfig.MAX_DESTINATIONS:
+        raise ValueError(f"Maksimal {GoogleDriveConfig.MAX_DESTINATIONS} folder tujuan")
+    return destinations
+
+async def mirror_to(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handler untuk command /mirrorto <folder_id,folder_id,...> <url>
+    Satu download di-fan-out ke beberapa folder Drive sekaligus.
+    """
+    args = context.args or []
+    if len(args) != 2:
+        await update.message.reply_text("Format: /mirrorto <folder_id,folder_id,...> <url>")
+        return
+    try:
+        destinations = parse_destinations(args[0])
+    except ValueError as e:
+        await update.message.reply_text(f"{UIConfig.Emoji.ERROR} {e}")
+        return
+    await prepare_mirror(update, args[1], destinations)
+
+async def schedule_mirror(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handler untuk command /schedule
+    /schedule                                        -> daftar jadwal milik user
+    /schedule <menit jam tanggal bulan hari> <url> [folder_id,...]
+    /schedule <@hourly|@daily|@weekly|@monthly> <url> [folder_id,...]
+    Setiap jalan hanya mentransfer jika sumber berubah sejak mirror terakhir yang berhasil.
+    """
+    from drive_source import parse_drive_url
+
+    user_id = update.effective_user.id
+    args = context.args or []
+    usage = "Format: /schedule <menit jam tanggal bulan hari | @daily> <url> [folder_id,...]"
+    try:
+        if not args:
+            schedules = await asyncio.to_thread(job_store.list_schedules, user_id)
+            if not schedules:
+                await update.message.reply_text("Belum ada jadwal. " + usage)
+                return
+            lines = []
+            for schedule in schedules:
+                next_run = time.strftime('%Y-%m-%d %H:%M', time.localtime(schedule['next_run']))
+                lines.append(
+                    f"#{schedule['id']} [{schedule['cron']}] {schedule['url'][:60]}\n"
+                    f"   berikutnya {next_run}, terakhir: {schedule['last_status'] or '-'}"
+                )
+            await update.message.reply_text("\n".join(lines) + "\nHapus dengan /unschedule <id>")
+            return
+
+        cron_text, rest = (args[0], args[1:]) if args[0].startswith('@') else (' '.join(args[:5]), args[5:])
+        if len(rest) not in (1, 2) or not rest[0].startswith(('http://', 'https://')):
+            await update.message.reply_text(usage)
+            return
+        url = rest[0]
+        if parse_drive_url(url):
+            await update.message.reply_text(f"{UIConfig.Emoji.ERROR} Link Google Drive tidak bisa dijadwalkan")
+            return
+        CronSchedule(cron_text)
+        destinations = parse_destinations(rest[1]) if len(rest) == 2 else None
+        if len(await asyncio.to_thread(job_store.list_schedules, user_id)) >= ScheduleConfig.MAX_PER_USER:
+            await update.message.reply_text(f"{UIConfig.Emoji.ERROR} Maksimal {ScheduleConfig.MAX_PER_USER} jadwal per user")
+            return
+
+        next_run = next_run_time(cron_text, schedule_key(user_id, url))
+        schedule_id = await asyncio.to_thread(job_store.add_schedule, user_id, update.effective_chat.id, url, cron_text, destinations, next_run)
+        await update.message.reply_text(
+            f"{UIConfig.Emoji.SUCCESS} Jadwal #{schedule_id} dibuat, jalan pertama "
+            f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(next_run))}"
+        )
+    except (CronError, ValueError) as e:
+        await update.message.reply_text(f"{UIConfig.Emoji.ERROR} {e}")
+    except Exception as e:
+        handle_error("schedule_command", e, "error", {"user_id": user_id})
+        await update.message.reply_text(ErrorMessages.PROCESSING_ERROR)
+
+async def unschedule_mirror(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk command /unschedule <id>"""
+    args = context.args or []
+    if len(args) != 1 or not args[0].lstrip('#').isdigit():
+        await update.message.reply_text("Format: /unschedule <id>")
+        return
+    if await asyncio.to_thread(job_store.delete_schedule, update.effective_user.id, int(args[0].lstrip('#'))):
+        await update.message.reply_text(f"{UIConfig.Emoji.SUCCESS} Jadwal #{args[0].lstrip('#')} dihapus")
+    else:
+        await update.message.reply_text(f"{UIConfig.Emoji.ERROR} Jadwal tidak ditemukan")
+
+async def mirror_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk dokumen/video/audio yang dikirim atau di-forward langsung ke bot"""
+    try:
+        info = document_info(update.message)
+        if not info:
+            return
+        if is_cloud_api() and (info['size'] or 0) > TelegramConfig.CLOUD_DOWNLOAD_LIMIT:
+            await update.message.reply_text(
+                f"File lebih dari {format_bytes(TelegramConfig.CLOUD_DOWNLOAD_LIMIT)} hanya bisa diambil lewat "
+                f"Bot API server lokal ({TelegramConfig.API_URL_ENV})."
+            )
+            return
+
+        info_message = await update.message.reply_text(
+            f"File: {info['filename']}\nUkuran: {format_bytes(info['size'])}\nTipe: {info['type']}"
+        )
+        confirm_message = await send_confirm_keyboard(update)
+        await asyncio.to_thread(job_store.save_pending, update.effective_user.id, PendingRecord(
+            url=f"telegram:{info['telegram_file_id']}",  # URL asli di-resolve lewat getFile saat job berjalan
+            info=info,
+            info_message_id=info_message.message_id,
+            confirm_message_id=confirm_message.message_id,
+            chat_id=confirm_message.chat_id
+        ))
+    except Exception as e:
+        handle_error("mirror_document", e, "error", {
+            "user_id": update.effective_user.id if update.effective_user else None
+        })
+        await update.message.reply_text(ErrorMessages.PROCESSING_ERROR)
+
+async def crawl(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handler untuk command /crawl <url_direktori>
+    Mirror seluruh listing direktori (autoindex) dengan struktur folder yang sama.
+    Crawl ulang URL yang sama hanya meng-upload file baru/berubah.
+    """
+    args = context.args or []
+    if len(args) != 1 or not args[0].startswith(('http://', 'https://')):
+        await update.message.reply_text("Format: /crawl <url_direktori>")
+        return
+    url = args[0]
+    try:
+        info_message = await update.message.reply_text(
+            f"Direktori: {url}\nMode: crawl (file yang tidak berubah sejak crawl sebelumnya dilewati)"
+        )
+        confirm_message = await send_confirm_keyboard(update)
+        await asyncio.to_thread(job_store.save_pending, update.effective_user.id, PendingRecord(
+            url=url,
+            info={'filename': url, 'type': 'directory'},
+            crawl=True,
+            info_message_id=info_message.message_id,
+            confirm_message_id=confirm_message.message_id,
+            chat_id=confirm_message.chat_id
+        ))
+    except Exception as e:
+        handle_error("crawl_command", e, "error", {
+            "user_id": update.effective_user.id if update.effective_user else None,
+            "url": url[:100]
+        })
+        await update.message.reply_text(ErrorMessages.PROCESSING_ERROR)
+
+async def prepare_mirror(update: Update, url: str, destinations: list = None):
+    """Validasi satu URL, tampilkan info file dan simpan pending konfirmasi"""
+    from validator import validate_url_and_file
+    from archive_extract import archive_kind
+
     try:
-        url = update.message.text.strip()
         valid, info = await validate_url_and_file(url)
         if not valid:
             error_msg = info.get('error', 'URL/file tidak valid') if isinstance(info, dict) else str(info)
@@ -115,31 +515,30 @@ async def mirror(update: Update, context: ContextTypes.DEFAULT_TYPE):
         file_size_formatted = format_bytes(info.get('size'))
         
         # Kirim pesan pertama: Informasi file
-        info_message = await update.message.reply_text(
-            f"File: {info['filename']}\nUkuran: {file_size_formatted}\nTipe: {info['type']}"
-        )
-        
-        # Buat inline keyboard untuk konfirmasi
-        keyboard = [
-            [InlineKeyboardButton("✅ Ya", callback_data="confirm_yes"),
-             InlineKeyboardButton("❌ Tidak", callback_data="confirm_no")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        info_text = f"File: {info['filename']}\nUkuran: {file_size_formatted}\nTipe: {info['type']}"
+        if destinations:
+            info_text += f"\nTujuan: {len(destinations)} folder"
+
+        # Arsip bisa di-mirror utuh atau diekstrak per file (link Drive selalu copy server-side).
+        # Zip dibaca lewat Range, tanpa Accept-Ranges: bytes dan ukuran hanya bisa di-mirror utuh
+        kind = None if info.get('drive_id') else archive_kind(info.get('filename'))
+        extractable = bool(kind)
+        if kind == 'zip' and not (info.get('accept_ranges') and info.get('size')):
+            extractable = False
+            info_text += "\nServer tidak mendukung Range, zip hanya bisa di-mirror utuh tanpa ekstrak"
+        info_message = await update.message.reply_text(info_text)
         
-        # Kirim pesan kedua: Konfirmasi dengan inline keyboard
-        confirm_message = await update.message.reply_text(
-            "Lanjutkan mirroring?",
-            reply_markup=reply_markup
-        )
+        confirm_message = await send_confirm_keyboard(update, extractable)
         
         # Simpan status pending user dengan message_id untuk edit nanti
-        user_pending[update.effective_user.id] = {
-            'url': url, 
-            'info': info,
-            'info_message_id': info_message.message_id,
-            'confirm_message_id': confirm_message.message_id,
-            'chat_id': confirm_message.chat_id
-        }
+        await asyncio.to_thread(job_store.save_pending, update.effective_user.id, PendingRecord(
+            url=info.get('url', url),  # validator bisa mengganti URL (mis. link Drive publik)
+            info=info,
+            destinations=destinations,
+            info_message_id=info_message.message_id,
+            confirm_message_id=confirm_message.message_id,
+            chat_id=confirm_message.chat_id
+        ))
         
     except Exception as e:
         handle_error("mirror_command", e, "error", {
@@ -147,15 +546,228 @@ async def mirror(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "url": url[:100] if 'url' in locals() else None
         })
         await update.message.reply_text(ErrorMessages.PROCESSING_ERROR)
-    
-    # Simpan status pending user dengan message_id untuk edit nanti
-    user_pending[update.effective_user.id] = {
-        'url': url, 
-        'info': info,
-        'info_message_id': info_message.message_id,
-        'confirm_message_id': confirm_message.message_id,
-        'chat_id': confirm_message.chat_id
-    }
+
+async def send_confirm_keyboard(update: Update, extractable: bool = False):
+    """Kirim pesan konfirmasi dengan inline keyboard Ya/Tidak (plus Ekstrak untuk arsip)"""
+    keyboard = [
+        [InlineKeyboardButton("✅ Ya", callback_data="confirm_yes"),
+         InlineKeyboardButton("❌ Tidak", callback_data="confirm_no")]
+    ]
+    if extractable:
+        keyboard.append([InlineKeyboardButton("📦 Ya, ekstrak isi arsip", callback_data="confirm_extract")])
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    return await update.message.reply_text(
+        "Lanjutkan mirroring?",
+        reply_markup=reply_markup
+    )
+
+async def mirror_batch(update: Update, context: ContextTypes.DEFAULT_TYPE, urls: list):
+    """
+    Handler untuk beberapa URL sekaligus. Hanya file kecil yang boleh masuk batch
+    karena diproses bersamaan lewat fast path multipart upload.
+    """
+    from validator import validate_url_and_file
+    from downloader import is_small_file
+
+    try:
+        if len(urls) > DownloadConfig.MAX_BATCH_FILES:
+            await update.message.reply_text(ErrorMessages.BATCH_TOO_LARGE.format(limit=DownloadConfig.MAX_BATCH_FILES))
+            return
+
+        # Batasi validasi bersamaan agar satu pesan tidak membuka banyak koneksi sekaligus.
+        # Request validasi (resolver, DNS, HEAD, Drive API) berjalan di thread, event loop tetap bebas
+        semaphore = asyncio.Semaphore(DownloadConfig.BATCH_VALIDATION_CONCURRENCY)
+
+        async def validate(url):
+            async with semaphore:
+                return await validate_url_and_file(url)
+
+        results = await asyncio.gather(*(validate(url) for url in urls))
+
+        items = []
+        rejected = []
+        for url, (valid, info) in zip(urls, results):
+            if not valid:
+                error_msg = info.get('error', 'URL/file tidak valid') if isinstance(info, dict) else str(info)
+                rejected.append(f"{url[:60]}: {error_msg}")
+            elif not is_small_file(info):
+                rejected.append(
+                    f"{info['filename']}: lebih dari {format_bytes(GoogleDriveConfig.SMALL_FILE_THRESHOLD)}, kirim terpisah"
+                )
+            else:
+                items.append((info.get('url', url), info))
+
+        if rejected:
+            await update.message.reply_text("URL/file tidak valid untuk batch:\n" + "\n".join(rejected))
+            return
+
+        total_size = sum(info.get('size') or 0 for _, info in items)
+        file_lines = "\n".join(f"- {info['filename']} ({format_bytes(info.get('size'))})" for _, info in items)
+        info_message = await update.message.reply_text(
+            f"Batch: {len(items)} file\nTotal ukuran: {format_bytes(total_size)}\n{file_lines}"
+        )
+        confirm_message = await send_confirm_keyboard(update)
+
+        await asyncio.to_thread(job_store.save_pending, update.effective_user.id, PendingRecord(
+            url=items[0][0],
+            info=items[0][1],
+            batch=items,
+            info_message_id=info_message.message_id,
+            confirm_message_id=confirm_message.message_id,
+            chat_id=confirm_message.chat_id
+        ))
+
+    except Exception as e:
+        handle_error("mirror_batch", e, "error", {
+            "user_id": update.effective_user.id if update.effective_user else None,
+            "url_count": len(urls)
+        })
+        await update.message.reply_text(ErrorMessages.PROCESSING_ERROR)
+
+def progress_keyboard(job_id: int, pausable: bool = False, paused: bool = False):
+    """
+    Tombol di pesan progress: Pause/Resume (jika job bisa di-pause) dan Stop.
+    Setiap tombol membawa job_id agar hanya job pada pesan ini yang dijeda/dihentikan.
+    """
+    buttons = []
+    if pausable:
+        buttons.append(InlineKeyboardButton("▶️ Resume", callback_data=f"resume_mirror:{job_id}") if paused
+                       else InlineKeyboardButton("⏸ Pause", callback_data=f"pause_mirror:{job_id}"))
+    buttons.append(InlineKeyboardButton("⏹ Stop Mirroring", callback_data=f"stop_mirror:{job_id}"))
+    return InlineKeyboardMarkup([buttons])
+
+def is_pausable(payload: dict) -> bool:
+    """Ekstrak arsip dan batch file kecil tidak punya batas chunk tunggal untuk pause"""
+    return not payload.get('extract') and not payload.get('batch')
+
+async def attach_progress_keyboard(bot, chat_id: int, message_id: int, job_id: int, pausable: bool = False):
+    """
+    Pasang tombol job (Pause jika job bisa di-pause, Stop) ke pesan progress setelah job punya
+    ID di store, sehingga job yang masih antre pun sudah bisa dijeda atau dihentikan
+    """
+    try:
+        await bot.edit_message_reply_markup(chat_id=chat_id, message_id=message_id, reply_markup=progress_keyboard(job_id, pausable))
+    except Exception as e:
+        handle_error("edit_message", e, "warning", {"operation": "attach_keyboard", "job_id": job_id})
+
+def callback_job_id(data: str):
+    """Ambil job_id dari callback_data '<aksi>:<job_id>', None jika tidak ada"""
+    _, _, job_id = data.partition(':')
+    return int(job_id) if job_id.isdigit() else None
+
+def make_progress_callback(bot, job_id: int):
+    """
+    Buat progress_callback untuk satu job. State tampilan disimpan di JobRecord user_processes[job_id],
+    registry lokal milik instance yang sedang menjalankan job tersebut; bot hanya dipegang closure ini.
+    """
+    async def progress_callback(percent, error=None, done=False, cancelled=False, message="", downloaded=0, total=None, speed=0, eta=None, elapsed=0, filename=""):
+        try:
+            # Cek apakah pesan akhir sudah ditampilkan atau job sudah tidak ada di registry
+            record = user_processes.get(job_id)
+            if record is None or record.finished:
+                return
+            record.touch()
+        
+            if cancelled:
+                # Tandai sebelum operasi async untuk mencegah race condition
+                record.transition(CANCELLED)
+            
+                # Hapus pesan info file yang dikirim sebelumnya menggunakan helper function
+                if record.info_message_id:
+                    await delete_messages_safely(
+                        bot, 
+                        record.chat_id, 
+                        [record.info_message_id]
+                    )
+            
+                # Tampilkan pesan pembatalan
+                try:
+                    await bot.edit_message_text(
+                        chat_id=record.chat_id,
+                        message_id=record.progress_message_id,
+                        text=SuccessMessages.MIRRORING_CANCELLED
+                    )
+                except Exception as e:
+                    handle_error("edit_message", e, "warning", {
+                        "operation": "cancellation", 
+                        "chat_id": record.chat_id,
+                        "message_id": record.progress_message_id
+                    })
+            
+            elif error:
+                # Tandai pesan sudah di-edit sebelum operasi async
+                record.transition(FAILED)
+                try:
+                    # Untuk error sesungguhnya - pakai error message dari config
+                    await bot.edit_message_text(
+                        chat_id=record.chat_id,
+                        message_id=record.progress_message_id,
+                        text=f"{UIConfig.Emoji.ERROR} Error: {error}"
+                    )
+                except Exception as e:
+                    handle_error("edit_message", e, "warning", {
+                        "operation": "error_display", 
+                        "chat_id": record.chat_id,
+                        "message_id": record.progress_message_id,
+                        "error_content": str(error)[:50]  # Batasi panjang error message
+                    })
+            elif done:
+                # Tandai pesan sudah di-edit sebelum operasi async
+                record.transition(DONE)
+                try:
+                    await bot.edit_message_text(
+                        chat_id=record.chat_id,
+                        message_id=record.progress_message_id,
+                        text=SuccessMessages.MIRRORING_COMPLETED
+                    )
+                except Exception as e:
+                    handle_error("edit_message", e, "warning", {
+                        "operation": "completion", 
+                        "chat_id": record.chat_id,
+                        "message_id": record.progress_message_id
+                    })
+            else:
+                # Batasi frekuensi edit pesan sesuai UIConfig.UPDATE_INTERVAL (bisa diubah lewat /config)
+                now = time.monotonic()
+                if now - record.last_edit < UIConfig.UPDATE_INTERVAL:
+                    return
+                record.last_edit = now
+
+                # Buat progress bar sederhana dengan tombol pause/stop; percent None berarti
+                # ukuran sumber tidak diketahui sehingga yang ditampilkan hanya byte diterima
+                if percent is None:
+                    progress_line = f"{UIConfig.Emoji.PROGRESS} Progress: {format_bytes(downloaded)} diterima"
+                else:
+                    bar_length = UIConfig.PROGRESS_BAR_LENGTH
+                    filled_length = int(bar_length * percent / 100)
+                    bar = '■' * filled_length + '□' * (bar_length - filled_length)
+                    progress_line = f"{UIConfig.Emoji.PROGRESS} Progress: [{bar}] {percent}%"
+                pause = record.pause
+                reply_markup = progress_keyboard(job_id, pause is not None, bool(pause and pause.paused))
+            
+                # Format informasi detail dengan emoji dari config
+                progress_info = f"""{UIConfig.Emoji.FILE} File Name: {filename}
+{progress_line}
+{UIConfig.Emoji.TIME} Run Time: {format_time(elapsed)}
+{UIConfig.Emoji.SIZE} Size: {format_bytes(total)}
+{UIConfig.Emoji.DOWNLOAD} Downloaded: {format_bytes(downloaded)}
+{UIConfig.Emoji.SPEED} Speed AVG: {format_speed(speed)}
+{UIConfig.Emoji.ETA} Estimasi: {format_time(eta) if eta else ("Menghitung..." if total else "Tidak diketahui")}"""
+
+                await bot.edit_message_text(
+                    chat_id=record.chat_id,
+                    message_id=record.progress_message_id,
+                    text=progress_info,
+                    reply_markup=reply_markup
+                )
+        except Exception as e:
+            handle_error("edit_message", e, "error", {
+                "operation": "progress_update", 
+                "job_id": job_id,
+                "percent": percent
+            })
+
+    return progress_callback
 
 async def handle_confirm_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler untuk tombol konfirmasi inline keyboard"""
@@ -166,189 +778,55 @@ async def handle_confirm_callback(update: Update, context: ContextTypes.DEFAULT_
         # Jawab callback query
         await query.answer()
         
-        # Cek apakah user memiliki proses yang menunggu konfirmasi
-        if user_id not in user_pending:
-            await query.edit_message_text(ErrorMessages.NO_PENDING_CONFIRMATION)
+        # Ambil (dan hapus) pending secara atomik agar klik ganda atau instance lain
+        # tidak memproses konfirmasi yang sama dua kali
+        pending = await asyncio.to_thread(job_store.pop_pending, user_id)
+        if not pending:
+            await query.edit_message_text(ErrorMessages.NO_PENDING_PROCESS)
             return
         
-        # Ambil data dari pending
-        pending_data = user_pending[user_id]
-        url = pending_data['url']
-        info = pending_data['info']
-        info_message_id = pending_data['info_message_id']
-        
-        if query.data == "confirm_yes":
+        if query.data in ("confirm_yes", "confirm_extract"):
             # Hapus pesan konfirmasi (pesan kedua), biarkan pesan info tetap ada
             await query.delete_message()
             
-            # Buat cancellation event untuk proses ini (async-compatible)
-            cancellation_event = asyncio.Event()
-            
-            # Kirim pesan awal dengan format yang diinginkan + tombol Stop
-            keyboard = [[InlineKeyboardButton("⏹ Stop Mirroring", callback_data="stop_mirror")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            # Kirim pesan awal, tombol Pause/Stop dipasang setelah job punya ID
             progress_message = await context.bot.send_message(
                 chat_id=query.message.chat_id,
-                text=SuccessMessages.MIRRORING_STARTED,
-                reply_markup=reply_markup
+                text=SuccessMessages.MIRRORING_STARTED
             )
 
-            # Simpan info proses yang sedang berjalan - optimalkan memory usage
-            user_processes[user_id] = {
-                'cancellation_event': cancellation_event,
-                'progress_message_id': progress_message.message_id,  # Simpan hanya ID, bukan object
-                'user_id': user_id,
-                'info_message_id': info_message_id,
+            # Masukkan ke antrean bersama, job akan diklaim oleh instance yang punya kapasitas
+            payload = {
+                'url': pending.url,
+                'info': pending.info,
+                'batch': pending.batch,
+                'destinations': pending.destinations,
+                'extract': query.data == "confirm_extract",
+                'crawl': bool(pending.crawl),
                 'chat_id': query.message.chat_id,
-                'bot': context.bot,  # Simpan hanya bot, bukan seluruh context (memory leak fix)
-                'message_edited': False  # Flag untuk cegah duplikasi edit
+                'info_message_id': pending.info_message_id,
+                'progress_message_id': progress_message.message_id
             }
-
-            async def progress_callback(percent, error=None, done=False, cancelled=False, message="", downloaded=0, total=0, speed=0, eta=None, elapsed=0, filename=""):
-                try:
-                    # Cek apakah pesan sudah pernah di-edit atau user sudah tidak ada di proses
-                    if user_id not in user_processes or user_processes[user_id].get('message_edited', False):
-                        return
-                    
-                    # Ambil process info sekali untuk digunakan di semua kondisi
-                    process_info = user_processes[user_id]
-                    
-                    if cancelled:
-                        # Tandai sebelum operasi async untuk mencegah race condition
-                        user_processes[user_id]['message_edited'] = True
-                        
-                        # Hapus pesan info file yang dikirim sebelumnya menggunakan helper function
-                        if 'info_message_id' in process_info:
-                            await delete_messages_safely(
-                                context, 
-                                process_info['chat_id'], 
-                                [process_info['info_message_id']]
-                            )
-                        
-                        # Tampilkan pesan pembatalan
-                        try:
-                            await process_info['bot'].edit_message_text(
-                                chat_id=process_info['chat_id'],
-                                message_id=process_info['progress_message_id'],
-                                text=SuccessMessages.MIRRORING_CANCELLED
-                            )
-                        except Exception as e:
-                            handle_error("edit_message", e, "warning", {
-                                "operation": "cancellation", 
-                                "chat_id": process_info['chat_id'],
-                                "message_id": process_info['progress_message_id']
-                            })
-                        
-                        # Hapus dari proses setelah edit berhasil
-                        user_processes.pop(user_id, None)
-                    elif error:
-                        # Tandai pesan sudah di-edit sebelum operasi async
-                        user_processes[user_id]['message_edited'] = True
-                        try:
-                            # Untuk error sesungguhnya - pakai error message dari config
-                            await process_info['bot'].edit_message_text(
-                                chat_id=process_info['chat_id'],
-                                message_id=process_info['progress_message_id'],
-                                text=f"{UIConfig.Emoji.ERROR} Error: {error}"
-                            )
-                        except Exception as e:
-                            handle_error("edit_message", e, "warning", {
-                                "operation": "error_display", 
-                                "chat_id": process_info['chat_id'],
-                                "message_id": process_info['progress_message_id'],
-                                "error_content": str(error)[:50]  # Batasi panjang error message
-                            })
-                        # Hapus dari proses yang sedang berjalan setelah edit berhasil/gagal
-                        user_processes.pop(user_id, None)
-                    elif done:
-                        # Tandai pesan sudah di-edit sebelum operasi async
-                        user_processes[user_id]['message_edited'] = True
-                        try:
-                            await process_info['bot'].edit_message_text(
-                                chat_id=process_info['chat_id'],
-                                message_id=process_info['progress_message_id'],
-                                text=SuccessMessages.MIRRORING_COMPLETED
-                            )
-                        except Exception as e:
-                            handle_error("edit_message", e, "warning", {
-                                "operation": "completion", 
-                                "chat_id": process_info['chat_id'],
-                                "message_id": process_info['progress_message_id']
-                            })
-                        # Hapus dari proses yang sedang berjalan setelah edit berhasil/gagal
-                        user_processes.pop(user_id, None)
-                    else:
-                        # Buat progress bar sederhana dengan tombol stop
-                        bar_length = UIConfig.PROGRESS_BAR_LENGTH
-                        filled_length = int(bar_length * percent / 100)
-                        bar = '■' * filled_length + '□' * (bar_length - filled_length)
-                        keyboard = [[InlineKeyboardButton("⏹ Stop Mirroring", callback_data="stop_mirror")]]
-                        reply_markup = InlineKeyboardMarkup(keyboard)
-                        
-                        # Format informasi detail dengan emoji dari config
-                        progress_info = f"""{UIConfig.Emoji.FILE} File Name: {filename}
-{UIConfig.Emoji.PROGRESS} Progress: [{bar}] {percent}%
-{UIConfig.Emoji.TIME} Run Time: {format_time(elapsed)}
-{UIConfig.Emoji.SIZE} Size: {format_bytes(total)}
-{UIConfig.Emoji.DOWNLOAD} Downloaded: {format_bytes(downloaded)}
-{UIConfig.Emoji.SPEED} Speed AVG: {format_speed(speed)}
-{UIConfig.Emoji.ETA} Estimasi: {format_time(eta) if eta else "Menghitung..."}"""
-
-                        await process_info['bot'].edit_message_text(
-                            chat_id=process_info['chat_id'],
-                            message_id=process_info['progress_message_id'],
-                            text=progress_info,
-                            reply_markup=reply_markup
-                        )
-                except Exception as e:
-                    handle_error("edit_message", e, "error", {
-                        "operation": "progress_update", 
-                        "user_id": user_id,
-                        "percent": percent
-                    })
-
-            # Jalankan mirroring di background task
-            async def run_mirror():
-                try:
-                    result = await stream_download_to_drive(url, info, progress_callback, cancellation_event)
-                    # Kirim hasil akhir sebagai pesan baru jika belum di-handle di callback
-                    if user_id in user_processes:  # Jika belum dihapus (tidak error/done)
-                        await context.bot.send_message(
-                            chat_id=query.message.chat_id,
-                            text=result
-                        )
-                        user_processes.pop(user_id, None)
-                except Exception as e:
-                    handle_error("mirror_process", e, "error", {
-                        "user_id": user_id,
-                        "url": url[:100]  # Batasi panjang URL
-                    })
-                    await context.bot.send_message(
-                        chat_id=query.message.chat_id,
-                        text=f"🚨 Error: {str(e)} 🚨"
-                    )
-                    user_processes.pop(user_id, None)
-
-            # Jalankan task secara async
-            asyncio.create_task(run_mirror())
+            job_id = await asyncio.to_thread(job_store.enqueue_job, user_id, payload)
+            logger.info(f"Job {job_id} milik user {user_id} masuk antrean")
+            if job_wakeup:
+                job_wakeup.set()
+            await attach_progress_keyboard(context.bot, query.message.chat_id, progress_message.message_id, job_id, is_pausable(payload))
             
         elif query.data == "confirm_no":
             # Hapus kedua pesan menggunakan helper function (mencegah duplikasi)
             await delete_messages_safely(
-                context, 
-                pending_data['chat_id'], 
-                [pending_data['confirm_message_id'], pending_data['info_message_id']]
+                context.bot, 
+                pending.chat_id, 
+                [pending.confirm_message_id, pending.info_message_id]
             )
             # Kirim pesan pembatalan menggunakan helper function
             await send_message_safely(
-                context,
+                context.bot,
                 query.message.chat_id,
                 SuccessMessages.CONFIRMATION_CANCELLED
             )
         
-        # Hapus dari pending setelah diproses
-        user_pending.pop(user_id, None)
-        
     except Exception as e:
         handle_error("confirmation", e, "error", {
             "user_id": user_id,
@@ -363,7 +841,116 @@ async def handle_confirm_callback(update: Update, context: ContextTypes.DEFAULT_
                 chat_id=query.message.chat_id,
                 text=ErrorMessages.CONFIRMATION_ERROR
             )
-        user_pending.pop(user_id, None)
+
+async def job_runner_loop(app: Application):
+    """Klaim job dari store selama kapasitas instance ini masih ada"""
+    while True:
+        try:
+            while len(running_jobs) < JobConfig.MAX_CONCURRENT_JOBS:
+                job = await asyncio.to_thread(job_store.claim_job, INSTANCE_ID, JobConfig.LEASE_SECONDS)
+                if not job:
+                    break
+                running_jobs[job['id']] = asyncio.create_task(execute_job(app.bot, job))
+        except Exception as e:
+            handle_error("claim_job", e, "error", {"instance_id": INSTANCE_ID})
+
+        try:
+            await asyncio.wait_for(job_wakeup.wait(), JobConfig.POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        job_wakeup.clear()
+
+def heartbeat_check(job_id: int, pausable: bool):
+    """
+    Renew lease dan baca permintaan Stop/Pause dari store (sinkron, dijalankan di thread
+    agar busy timeout SQLite tidak memblokir event loop).
+    Mengembalikan (lease_ok, cancel_requested, pause_requested).
+    """
+    if not job_store.renew_lease(job_id, INSTANCE_ID, JobConfig.LEASE_SECONDS):
+        return False, False, False
+    return True, job_store.is_cancel_requested(job_id), pausable and job_store.is_pause_requested(job_id)
+
+async def job_heartbeat(job_id: int, cancellation_event: asyncio.Event, pause: PauseControl = None):
+    """Renew lease berkala dan teruskan permintaan Stop/Pause/Resume dari instance lain"""
+    while True:
+        await asyncio.sleep(JobConfig.HEARTBEAT_INTERVAL)
+        try:
+            lease_ok, cancel_requested, pause_requested = await asyncio.to_thread(
+                heartbeat_check, job_id, pause is not None
+            )
+            if not lease_ok:
+                logger.warning(f"Lease job {job_id} hilang, job dihentikan di instance ini")
+                cancellation_event.set()
+                return
+            if cancel_requested:
+                cancellation_event.set()
+            if pause:
+                if pause_requested:
+                    pause.pause()
+                else:
+                    pause.resume()
+        except Exception as e:
+            handle_error("job_heartbeat", e, "warning", {"job_id": job_id})
+
+async def execute_job(bot, job: dict):
+    """Jalankan satu job yang sudah diklaim instance ini"""
+    job_id = job['id']
+    user_id = job['user_id']
+    payload = job['payload']
+    chat_id = payload['chat_id']
+
+    # Buat cancellation event untuk proses ini (async-compatible)
+    cancellation_event = asyncio.Event()
+    if job['cancel_requested']:
+        cancellation_event.set()
+    pausable = is_pausable(payload)
+    pause = PauseControl(job.get('pause_requested', False)) if pausable else None
+
+    # Record lokal hanya berisi ID pesan dan kontrol job, bukan bot/context
+    user_processes[job_id] = JobRecord(
+        job_id, user_id, chat_id, payload['info_message_id'], payload['progress_message_id'],
+        cancellation_event, pause, RUNNING
+    )
+    heartbeat = asyncio.create_task(job_heartbeat(job_id, cancellation_event, pause))
+    result = None
+
+    try:
+        if payload.get('batch'):
+            transfer_job = {'batch': payload['batch'], 'user_id': user_id}
+        else:
+            transfer_job = {'url': payload['url'], 'info': payload['info'], 'user_id': user_id}
+        transfer_job['destinations'] = payload.get('destinations')
+        transfer_job['extract'] = payload.get('extract', False)
+        transfer_job['crawl'] = payload.get('crawl', False)
+        result = await run_transfer(transfer_job, make_progress_callback(bot, job_id), cancellation_event, pause)
+        # Kirim hasil akhir sebagai pesan baru jika belum di-handle di callback
+        if result and not user_processes[job_id].finished:
+            await bot.send_message(chat_id=chat_id, text=result)
+    except Exception as e:
+        handle_error("mirror_process", e, "error", {
+            "job_id": job_id,
+            "user_id": user_id,
+            "url": (payload.get('url') or '')[:100]  # Batasi panjang URL
+        })
+        result = f"🚨 Error: {str(e)} 🚨"
+        await send_message_safely(bot, chat_id, result)
+    finally:
+        heartbeat.cancel()
+        record = user_processes.pop(job_id, None)
+        running_jobs.pop(job_id, None)
+        try:
+            # Job yang berakhir tanpa pesan akhir dari progress_callback dianggap gagal
+            status = record.state if record and record.finished else FAILED
+            await asyncio.to_thread(job_store.finish_job, job_id, INSTANCE_ID, status, result)
+            # Mirror terjadwal: ETag/Last-Modified baru disimpan hanya jika transfer berhasil,
+            # agar run berikutnya mengambil ulang sumber yang gagal di-mirror
+            if payload.get('schedule_id') and status == DONE:
+                await asyncio.to_thread(
+                    job_store.save_schedule_validators, payload['schedule_id'], payload['info'].get('etag'), payload['info'].get('last_modified')
+                )
+        except Exception as e:
+            handle_error("finish_job", e, "error", {"job_id": job_id})
+        job_wakeup.set()
 
 async def stop_mirror(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler untuk tombol Stop Mirroring"""
@@ -374,55 +961,249 @@ async def stop_mirror(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Jawab callback query
         await query.answer()
         
-        # Cek apakah user memiliki proses yang sedang berjalan
-        if user_id not in user_processes:
+        # Hanya job pada pesan ini, job lain milik user yang sama tetap berjalan
+        job_id = callback_job_id(query.data)
+        active_jobs = await asyncio.to_thread(job_store.get_active_jobs, user_id)
+        job = next((job for job in active_jobs if job['id'] == job_id), None)
+        if not job:
             await query.edit_message_text(ErrorMessages.NO_ACTIVE_PROCESS)
             return
         
-        # Tandai cancellation event
-        process_info = user_processes[user_id]
-        cancellation_event = process_info['cancellation_event']
+        # Tandai cancel di store, instance pemilik job membacanya saat heartbeat
+        await asyncio.to_thread(job_store.request_cancel, job_id, user_id)
         
-        # Set event untuk memberhentikan proses
-        cancellation_event.set()
+        # Job yang berjalan di instance ini langsung dihentikan tanpa menunggu heartbeat
+        record = user_processes.get(job_id)
+        if record:
+            record.cancellation_event.set()
         
-        # Pesan pembatalan akan ditangani oleh progress_callback di downloader.py
-        # Tidak perlu edit manual di sini untuk menghindari duplikasi
+        # Job yang masih antre belum punya progress_callback, edit pesannya di sini.
+        # Pesan pembatalan job yang berjalan ditangani oleh progress_callback
+        if job['status'] == 'queued':
+            await query.edit_message_text(SuccessMessages.MIRRORING_CANCELLED)
         
-        logger.info(f"User {user_id} menghentikan proses mirroring")
-        logger.info(f"Cancellation event status: {cancellation_event.is_set()}")
+        logger.info(f"User {user_id} menghentikan job {job_id}")
         
     except Exception as e:
         handle_error("cancellation", e, "error", {
             "user_id": user_id,
-            "has_active_process": user_id in user_processes
+            "callback_data": query.data
         })
         await query.edit_message_text(ErrorMessages.CANCELLATION_FAILED)
 
+async def toggle_pause(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handler untuk tombol Pause/Resume. Job berhenti di batas chunk berikutnya, chunk yang antre
+    di-commit ke Drive dan koneksi sumber dilepas; resume melanjutkan dari offset via Range.
+    """
+    query = update.callback_query
+    user_id = query.from_user.id
+    paused = query.data.startswith("pause_mirror:")
+    job_id = callback_job_id(query.data)
+
+    try:
+        # Hanya job pada pesan ini; tandai di store, instance pemilik job membacanya saat heartbeat
+        if not await asyncio.to_thread(job_store.request_pause, job_id, user_id, paused):
+            await query.answer(ErrorMessages.NO_ACTIVE_PROCESS)
+            return
+
+        # Job yang berjalan di instance ini langsung di-pause/resume tanpa menunggu heartbeat
+        record = user_processes.get(job_id)
+        if record and record.user_id == user_id and record.pause:
+            if paused:
+                record.pause.pause()
+            else:
+                record.pause.resume()
+
+        await query.answer(SuccessMessages.MIRRORING_PAUSED if paused else SuccessMessages.MIRRORING_RESUMED)
+        await query.edit_message_reply_markup(progress_keyboard(job_id, True, paused))
+        logger.info(f"User {user_id} {'menjeda' if paused else 'melanjutkan'} job {job_id}")
+
+    except Exception as e:
+        handle_error("pause", e, "error", {"user_id": user_id, "job_id": job_id, "paused": paused})
+
+async def set_limit(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handler untuk command /limit (khusus admin)
+    /limit                          -> tampilkan batas saat ini
+    /limit global <rate> [download|upload]
+    /limit user <user_id> <rate|default>
+    """
+    user_id = update.effective_user.id if update.effective_user else None
+    if user_id not in ADMIN_IDS:
+        await update.message.reply_text("Perintah ini khusus admin.")
+        return
+
+    args = context.args or []
+    try:
+        if not args:
+            limits = bandwidth_manager.get_limits()
+            lines = [f"Global {d}: {format_speed(rate) if rate else 'tanpa batas'}" for d, rate in limits['global'].items()]
+            default_rate = limits['per_user_default']
+            lines.append(f"Default per user: {format_speed(default_rate) if default_rate else 'tanpa batas'}")
+            lines += [f"User {uid}: {format_speed(rate) if rate else 'tanpa batas'}" for uid, rate in limits['users'].items()]
+            await update.message.reply_text("\n".join(lines))
+        elif args[0] == "global" and len(args) in (2, 3):
+            direction = args[2] if len(args) == 3 else None
+            if direction not in (None, 'download', 'upload'):
+                raise ValueError(f"Arah tidak dikenal: {direction}")
+            bandwidth_manager.set_global_limit(parse_bytes(args[1]), direction)
+            await update.message.reply_text(f"{UIConfig.Emoji.SUCCESS} Batas global diperbarui")
+        elif args[0] == "user" and len(args) == 3:
+            rate = None if args[2] == "default" else parse_bytes(args[2])
+            bandwidth_manager.set_user_limit(int(args[1]), rate)
+            await update.message.reply_text(f"{UIConfig.Emoji.SUCCESS} Batas user {args[1]} diperbarui")
+        else:
+            await update.message.reply_text("Format: /limit [global <rate> [download|upload] | user <user_id> <rate|default>]")
+    except ValueError as e:
+        handle_error("set_limit", e, "warning", {"user_id": user_id, "args": args})
+        await update.message.reply_text(f"{UIConfig.Emoji.ERROR} {e}")
+
+def _format_net_stats(label, net):
+    """Satu baris ringkasan get_net_stats() untuk /stats"""
+    hit_rate = net.get('dns_hit_rate')
+    return (
+        f"{label}: DNS hit {f'{hit_rate:.0%}' if hit_rate is not None else '-'} "
+        f"(hit {net.get('dns_hits', 0)}, miss {net.get('dns_misses', 0)}, fallback {net.get('dns_fallbacks', 0)}), "
+        f"lookup p50/p95 {net.get('dns_p50_ms', '-')}/{net.get('dns_p95_ms', '-')} ms, "
+        f"connect p50/p95 {net.get('connect_p50_ms', '-')}/{net.get('connect_p95_ms', '-')} ms, "
+        f"IPv6/IPv4 {net.get('connect_ipv6', 0)}/{net.get('connect_ipv4', 0)}, "
+        f"fallback {net.get('connect_fallbacks', 0)}, gagal {net.get('connect_errors', 0)}"
+    )
+
+async def show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler untuk command /stats (khusus admin): statistik cache DNS, koneksi, memori state job, resolver dan logging"""
+    user_id = update.effective_user.id if update.effective_user else None
+    if user_id not in ADMIN_IDS:
+        await update.message.reply_text("Perintah ini khusus admin.")
+        return
+
+    try:
+        from resolvers import get_resolver_stats
+        lines = [_format_net_stats("Bot", get_net_stats())]
+        if transfer_pool:
+            lines += [_format_net_stats(f"Worker {pid}", net) for pid, net in transfer_pool.worker_stats.items()]
+        resolver = get_resolver_stats()
+        lines.append("Resolver: " + ", ".join(f"{key} {value}" for key, value in resolver.items()))
+        memory = await memory_report()
+        lines.append(
+            f"Memori: RSS {format_bytes(memory['rss'])}, "
+            f"record job {memory['job_records']} ({format_bytes(memory['record_bytes'])}), "
+            f"task {memory['running_tasks']}, pending {memory['pending']}"
+        )
+        logging_stats = get_logging_stats()
+        lines.append("Logging: " + ", ".join(f"{key} {value}" for key, value in logging_stats.items()))
+        await update.message.reply_text("\n".join(lines))
+    except Exception as e:
+        handle_error("show_stats", e, "error", {"user_id": user_id})
+
+async def set_config(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handler untuk command /config (khusus admin)
+    /config                   -> tampilkan nilai efektif dan lapisan asalnya
+    /config set <key> <value> -> override admin, berlaku di semua instance dan job berjalan
+    /config reset <key>       -> hapus override admin
+    /config reload            -> muat ulang file dan environment sekarang
+    """
+    user_id = update.effective_user.id if update.effective_user else None
+    if user_id not in ADMIN_IDS:
+        await update.message.reply_text("Perintah ini khusus admin.")
+        return
+
+    args = context.args or []
+    try:
+        if not args:
+            lines = [f"{key} = {value} ({source})" for key, value, source in runtime_settings.describe()]
+            await update.message.reply_text("\n".join(lines))
+            return
+        if args[0] == "set" and len(args) == 3:
+            value = parse_value(args[1], args[2])
+            await asyncio.to_thread(job_store.save_setting, args[1], value)
+        elif args[0] == "reset" and len(args) == 2:
+            if args[1] not in TUNABLES:
+                raise ValueError(f"Key konfigurasi tidak dikenal: {args[1]}")
+            await asyncio.to_thread(job_store.save_setting, args[1], None)
+        elif args[0] != "reload" or len(args) != 1:
+            await update.message.reply_text("Format: /config [set <key> <value> | reset <key> | reload]")
+            return
+        changed = await reload_runtime_config()
+        summary = ", ".join(f"{key}={value}" for key, value in changed.items()) or "tidak ada perubahan"
+        await update.message.reply_text(f"{UIConfig.Emoji.SUCCESS} Konfigurasi diperbarui: {summary}")
+    except ValueError as e:
+        handle_error("set_config", e, "warning", {"user_id": user_id, "args": args})
+        await update.message.reply_text(f"{UIConfig.Emoji.ERROR} {e}")
+
 # Tambahkan middleware untuk logging request
 async def log_updates(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Log semua update yang diterima untuk debugging"""
+    """
+    Log ringkas setiap update (id, user, jenis). Isi lengkap update hanya diserialisasi
+    jika level DEBUG aktif karena to_dict() mahal di hot path update.
+    """
     try:
-        logger.info(f"📨 Update diterima: {update.to_dict() if update else 'None'}")
+        if not update:
+            return
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📨 Update diterima", extra={'update': update.to_dict()})
+        elif logger.isEnabledFor(logging.INFO):
+            logger.info("📨 Update diterima", extra={
+                'update_id': update.update_id,
+                'user_id': update.effective_user.id if update.effective_user else None,
+                'kind': 'callback' if update.callback_query else 'message',
+                'sample': 'update'
+            })
     except Exception as e:
         # Untuk logging middleware, gunakan level warning agar tidak terlalu verbose
         handle_error("log_updates", e, "warning", {"update_id": update.update_id if update else None})
 
+def build_application() -> Application:
+    """Bangun Application dengan hook start/stop dan semua handler (dipakai main dan load test)"""
+    builder = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+    )
+    if not is_cloud_api():
+        # Bot API server lokal: semua request bot (termasuk getFile) lewat server yang sama
+        builder = builder.base_url(f"{get_api_url()}/bot").base_file_url(f"{get_api_url()}/file/bot")
+    app = builder.build()
+    
+    # Tambahkan logging middleware
+    app.add_handler(MessageHandler(filters.ALL, log_updates), group=-1)
+    
+    app.add_handler(CommandHandler("start", start))
+    app.add_handler(CommandHandler("limit", set_limit))
+    app.add_handler(CommandHandler("config", set_config))
+    app.add_handler(CommandHandler("stats", show_stats))
+    app.add_handler(CommandHandler("mirrorto", mirror_to))
+    app.add_handler(CommandHandler("crawl", crawl))
+    app.add_handler(CommandHandler("schedule", schedule_mirror))
+    app.add_handler(CommandHandler("unschedule", unschedule_mirror))
+    # Handler untuk konfirmasi inline keyboard
+    app.add_handler(CallbackQueryHandler(handle_confirm_callback, pattern="^(confirm_yes|confirm_no|confirm_extract)$"))
+    # Handler untuk tombol Stop
+    app.add_handler(CallbackQueryHandler(stop_mirror, pattern=r"^stop_mirror:\d+$"))
+    # Handler untuk tombol Pause/Resume
+    app.add_handler(CallbackQueryHandler(toggle_pause, pattern=r"^(pause_mirror|resume_mirror):\d+$"))
+    # Handler umum untuk teks (URL)
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, mirror))
+    # Handler untuk file yang dikirim langsung ke bot
+    app.add_handler(MessageHandler(filters.Document.ALL | filters.VIDEO | filters.AUDIO, mirror_document))
+    return app
+
 def main():
     """Fungsi utama untuk menjalankan bot"""
+    # Validasi konfigurasi dulu agar konfigurasi salah gagal cepat sebelum koneksi apa pun
+    errors, warnings = validate_config()
+    for warning in warnings:
+        logger.warning(f"⚠️ {warning}")
+    if errors:
+        for error in errors:
+            logger.error(f"❌ Konfigurasi tidak valid: {error}")
+        raise SystemExit(1)
+
     try:
-        app = Application.builder().token(TELEGRAM_TOKEN).build()
-        
-        # Tambahkan logging middleware
-        app.add_handler(MessageHandler(filters.ALL, log_updates), group=-1)
-        
-        app.add_handler(CommandHandler("start", start))
-        # Handler untuk konfirmasi inline keyboard
-        app.add_handler(CallbackQueryHandler(handle_confirm_callback, pattern="^(confirm_yes|confirm_no)$"))
-        # Handler untuk tombol Stop
-        app.add_handler(CallbackQueryHandler(stop_mirror, pattern="^stop_mirror$"))
-    # Handler umum untuk teks (URL)
-        app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, mirror))
+        app = build_application()
         
         # Jalankan webhook dengan path yang jelas
         logger.info(f"🚀 Starting webhook on port {PORT}")
@@ -0,0 +1,64 @@
+# Sumber dokumen Telegram: file yang dikirim langsung ke bot di-stream dari Bot API
+
+import os
+import logging
+from config import TelegramConfig, DownloadConfig
+
+logger = logging.getLogger(__name__)
+
+class TelegramFileError(Exception):
+    """getFile gagal (file terlalu besar untuk Bot API cloud, token salah, dsb)"""
+    pass
+
+def get_api_url():
+    """
+    URL Bot API server. Default Bot API cloud, set TELEGRAM_API_URL ke Bot API server
+    lokal (telegram-bot-api --local) untuk file di atas 20MB atau ke server tiruan saat pengujian.
+    """
+    return os.getenv(TelegramConfig.API_URL_ENV, TelegramConfig.DEFAULT_API_URL).rstrip('/')
+
+def is_cloud_api():
+    """True jika memakai Bot API cloud yang membatasi getFile sampai 20MB"""
+    return get_api_url() == TelegramConfig.DEFAULT_API_URL
+
+def document_info(message):
+    """
+    Ambil info file dari pesan dokumen/video/audio dalam format dict info validator.
+    Mengembalikan None jika pesan tidak membawa file.
+    """
+    attachment = message.document or message.video or message.audio
+    if not attachment:
+        return None
+    filename = getattr(attachment, 'file_name', None) or f"{attachment.file_unique_id}.bin"
+    return {
+        'filename': filename,
+        'size': attachment.file_size,
+        'type': getattr(attachment, 'mime_type', None) or 'application/octet-stream',
+        'telegram_file_id': attachment.file_id
+    }
+
+def resolve_telegram_file(file_id, token=None):
+    """
+    Panggil getFile dan kembalikan (url, None) untuk download lewat HTTP, atau
+    (None, path) jika Bot API server lokal mode --local mengembalikan path absolut di disk.
+    """
+    import requests # type: ignore  # import lazy: modul ini ikut dimuat saat start bot
+    token = token or os.getenv("TELEGRAM_TOKEN")
+    api_url = get_api_url()
+    try:
+        resp = requests.get(f"{api_url}/bot{token}/getFile", params={'file_id': file_id}, timeout=DownloadConfig.TIMEOUT)
+        data = resp.json()
+    except Exception as e:
+        # Detail exception memuat URL dengan token bot: hanya ke log (diredaksi), tidak ke user
+        logger.warning(f"getFile {file_id} gagal: {e}")
+        raise TelegramFileError("Gagal menghubungi Bot API")
+    if not data.get('ok'):
+        raise TelegramFileError(f"getFile gagal: {data.get('description', resp.status_code)}")
+
+    file_path = data['result']['file_path']
+    if os.path.isabs(file_path):
+        if not os.path.exists(file_path):
+            raise TelegramFileError("File dari Bot API lokal tidak ditemukan di disk bot")
+        logger.info(f"Dokumen Telegram {file_id} dibaca dari disk Bot API lokal")
+        return None, file_path
+    return f"{api_url}/file/bot{token}/{file_path}", None
@@ -0,0 +1,5 @@
+# Modul bot berada di root repo (tanpa package), tambahkan ke sys.path untuk test
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,100 @@
+# Test parser jawaban DNS dengan paket rekaman dan batas ukuran cache DNS
+
+import socket
+import pytest
+import http_layer
+from http_layer import DnsCache, DnsError, DnsMismatchError, _build_query, _parse_response, _read_name
+from config import NetConfig
+
+# A example.com -> 93.184.216.34 (TTL 300), nama jawaban lewat pointer kompresi ke pertanyaan
+A_EXAMPLE_COM = bytes.fromhex(
+    '123481800001000100000000076578616d706c6503636f6d0000010001'
+    'c00c000100010000012c00045db8d822'
+)
+# AAAA cdn.example.org -> CNAME edge.cdnprovider.net (TTL 120) -> 2001:db8::1 (TTL 30),
+# ditambah record AAAA untuk nama lain (evil.example) yang harus diabaikan
+AAAA_CNAME_CHAIN = bytes.fromhex(
+    '0001818000010003000000000363646e076578616d706c65036f726700001c0001'
+    'c00c0005000100000078001604656467650b63646e70726f7669646572036e657400'
+    'c02d001c00010000001e001020010db8000000000000000000000001'
+    '046576696c076578616d706c6500001c000100000005001020010db8000000000000000000000bad'
+)
+# NXDOMAIN untuk missing.example.com
+NXDOMAIN = bytes.fromhex('000781830001000000000000076d697373696e67076578616d706c6503636f6d0000010001')
+# Flag TC (terpotong) untuk example.com
+TRUNCATED = bytes.fromhex('000883800001000000000000076578616d706c6503636f6d0000010001')
+# ID sama dengan A_EXAMPLE_COM tetapi menjawab other.com -> 203.0.113.9
+OTHER_QUESTION = bytes.fromhex(
+    '123481800001000100000000056f7468657203636f6d0000010001'
+    'c00c000100010000012c0004cb007109'
+)
+# Nama pertanyaan berupa pointer ke dirinya sendiri
+POINTER_LOOP = bytes.fromhex('000981800001000000000000c00c00010001')
+
+def test_query_matches_recorded_question():
+    header = bytes.fromhex('123401000001000000000000')  # RD=1, satu pertanyaan, tanpa jawaban
+    assert _build_query(0x1234, 'example.com', 1) == header + A_EXAMPLE_COM[12:29]
+
+def test_parse_a_record():
+    assert _parse_response(A_EXAMPLE_COM, 1, 'example.com') == (['93.184.216.34'], 300)
+
+def test_question_match_ignores_case_and_trailing_dot():
+    assert _parse_response(A_EXAMPLE_COM, 1, 'Example.COM.') == (['93.184.216.34'], 300)
+
+def test_parse_cname_chain_uses_min_ttl_and_ignores_other_owners():
+    addresses, ttl = _parse_response(AAAA_CNAME_CHAIN, 28, 'cdn.example.org')
+    assert addresses == ['2001:db8::1']
+    assert ttl == 30
+
+def test_read_name_follows_pointer():
+    assert _read_name(AAAA_CNAME_CHAIN, 45) == ('edge.cdnprovider.net', 67)
+    assert _read_name(AAAA_CNAME_CHAIN, 67) == ('edge.cdnprovider.net', 69)
+
+def test_nxdomain_is_empty_answer():
+    assert _parse_response(NXDOMAIN, 1, 'missing.example.com') == ([], None)
+
+def test_truncated_response_raises():
+    with pytest.raises(DnsError, match='terpotong'):
+        _parse_response(TRUNCATED, 1, 'example.com')
+
+def test_cut_off_packet_raises():
+    with pytest.raises(DnsError):
+        _parse_response(A_EXAMPLE_COM[:-8], 1, 'example.com')
+
+@pytest.mark.parametrize('host, qtype', [('example.com', 1), ('other.com', 28)])
+def test_question_mismatch_is_rejected(host, qtype):
+    with pytest.raises(DnsMismatchError):
+        _parse_response(OTHER_QUESTION, qtype, host)
+
+def test_pointer_loop_is_rejected():
+    with pytest.raises(DnsError, match='loop'):
+        _parse_response(POINTER_LOOP, 1, 'example.com')
+
+def test_cache_evicts_oldest_when_full(monkeypatch):
+    monkeypatch.setattr(NetConfig, 'DNS_CACHE_MAX_ENTRIES', 3)
+    lookups = []
+
+    def lookup(self, host):
+        lookups.append(host)
+        return [(socket.AF_INET, '192.0.2.1')], http_layer.time.monotonic() + 60
+
+    monkeypatch.setattr(DnsCache, '_lookup', lookup)
+    cache = DnsCache()
+    for host in ('a.test', 'b.test', 'c.test', 'd.test'):
+        cache.resolve(host)
+    assert list(cache._entries) == ['b.test', 'c.test', 'd.test']
+    cache.resolve('b.test')
+    assert lookups == ['a.test', 'b.test', 'c.test', 'd.test']
+
+def test_cache_drops_expired_before_evicting(monkeypatch):
+    monkeypatch.setattr(NetConfig, 'DNS_CACHE_MAX_ENTRIES', 3)
+    ttls = {'old.test': -1}
+
+    def lookup(self, host):
+        return [(socket.AF_INET, '192.0.2.1')], http_layer.time.monotonic() + ttls.get(host, 60)
+
+    monkeypatch.setattr(DnsCache, '_lookup', lookup)
+    cache = DnsCache()
+    for host in ('keep.test', 'old.test', 'x.test', 'y.test'):
+        cache.resolve(host)
+    assert list(cache._entries) == ['keep.test', 'x.test', 'y.test']
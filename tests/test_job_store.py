@@ -0,0 +1,69 @@
+# Test perpindahan status job di SQLiteJobStore mengikuti job_state.TRANSITIONS
+
+import pytest
+from job_store import SQLiteJobStore
+from job_state import InvalidTransition, DONE, FAILED, CANCELLED, RUNNING, QUEUED, sources_of
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteJobStore(str(tmp_path / 'jobs.db'))
+
+def status_of(store, job_id):
+    return store._execute("SELECT status FROM jobs WHERE id = ?", (job_id,))[0]['status']
+
+def test_sources_of_follows_transitions():
+    assert sources_of(RUNNING) == (QUEUED,)
+    assert set(sources_of(QUEUED)) == {'pending', RUNNING}
+    with pytest.raises(InvalidTransition):
+        sources_of('pending')
+
+def test_job_lifecycle(store):
+    job_id = store.enqueue_job(1, {'url': 'https://example.com/a'})
+    assert status_of(store, job_id) == QUEUED
+    assert store.claim_job('a', 60)['id'] == job_id
+    assert status_of(store, job_id) == RUNNING
+    assert store.finish_job(job_id, 'a', DONE, 'ok')
+    assert status_of(store, job_id) == DONE
+    # Job yang sudah selesai tidak bisa ditutup ulang dengan status lain
+    assert not store.finish_job(job_id, 'a', FAILED)
+    assert status_of(store, job_id) == DONE
+
+def test_finish_requires_terminal_status(store):
+    job_id = store.enqueue_job(1, {})
+    store.claim_job('a', 60)
+    with pytest.raises(InvalidTransition):
+        store.finish_job(job_id, 'a', QUEUED)
+
+def test_cancelled_queued_job_is_not_claimed(store):
+    job_id = store.enqueue_job(1, {})
+    assert store.request_cancel(job_id, 1) == 1
+    assert status_of(store, job_id) == CANCELLED
+    assert store.claim_job('a', 60) is None
+
+def test_expired_lease_goes_back_through_queued(store):
+    job_id = store.enqueue_job(1, {})
+    store.claim_job('a', -1)
+    assert store.claim_job('b', 60)['id'] == job_id
+    # Instance lama kehilangan lease: tidak bisa renew maupun menutup job
+    assert not store.renew_lease(job_id, 'a', 60)
+    assert not store.finish_job(job_id, 'a', FAILED)
+    assert store.finish_job(job_id, 'b', CANCELLED)
+
+def test_name_reservation_is_shared_between_store_instances(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    first, second = SQLiteJobStore(path), SQLiteJobStore(path)
+    assert first.reserve_name('folder', 'file.zip', ttl=60)
+    assert not second.reserve_name('folder', 'file.zip', ttl=60)
+    assert second.reserved_names('folder', ttl=60) == {'file.zip'}
+    assert second.reserve_name('folder', 'file (1).zip', ttl=60)
+
+def test_expired_name_reservation_can_be_taken_over(store):
+    assert store.reserve_name('folder', 'file.zip', ttl=60)
+    assert store.reserve_name('folder', 'file.zip', ttl=0)
+    assert store.reserved_names('folder', ttl=0) == set()
+
+def test_queued_job_can_be_paused_before_claim(store):
+    job_id = store.enqueue_job(1, {})
+    assert store.request_pause(job_id, 1, True) == 1
+    assert store.claim_job('a', 60)['pause_requested']
+    assert store.request_pause(job_id, 2, False) == 0
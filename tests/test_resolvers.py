@@ -0,0 +1,136 @@
+# Test resolver sumber secara offline dengan fixture rekaman lewat fetch yang di-inject
+
+import os
+import json
+import asyncio
+import pytest
+import resolvers
+from resolvers import (
+    FetchResult, ResolverError, DropboxResolver, OneDriveResolver, SourceForgeResolver,
+    SourceResolver, GitHubReleaseResolver, MediaFireResolver, find_resolver, resolve_source
+)
+from config import ResolverConfig
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'resolvers')
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+class RecordedFetch:
+    """Fetch palsu: jawab setiap URL dengan fixture yang sudah direkam dan catat panggilannya"""
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self.calls = []
+
+    def __call__(self, url, headers=None):
+        self.calls.append((url, headers))
+        if url not in self.responses:
+            raise AssertionError(f"Fetch tidak terduga: {url}")
+        status, fixture = self.responses[url]
+        return FetchResult(status, url, {}, load_fixture(fixture))
+
+SHARE_LINKS = json.loads(load_fixture('share_links.json'))
+
+@pytest.mark.parametrize('case', SHARE_LINKS['dropbox'])
+def test_dropbox_forces_direct_download(case):
+    fetch = RecordedFetch()
+    result = DropboxResolver().resolve(case['url'], fetch)
+    assert result == {'url': case['expected_url'], 'filename': case['filename']}
+    assert fetch.calls == []
+
+@pytest.mark.parametrize('case', SHARE_LINKS['onedrive'])
+def test_onedrive_uses_shares_api(case):
+    fetch = RecordedFetch()
+    assert OneDriveResolver().resolve(case['url'], fetch) == {'url': case['expected_url']}
+    assert fetch.calls == []
+
+@pytest.mark.parametrize('case', SHARE_LINKS['sourceforge'])
+def test_sourceforge_file_page(case):
+    result = SourceForgeResolver().resolve(case['url'], RecordedFetch())
+    assert result == {'url': case['expected_url'], 'filename': case['filename']}
+
+def test_sourceforge_rejects_project_page():
+    with pytest.raises(ResolverError):
+        SourceForgeResolver().resolve('https://sourceforge.net/projects/example-tool/', RecordedFetch())
+
+def test_github_direct_asset_link_needs_no_fetch():
+    url = 'https://github.com/example/tool/releases/download/v1.2.0/tool-1.2.0-linux-amd64.tar.gz'
+    fetch = RecordedFetch()
+    result = GitHubReleaseResolver().resolve(url, fetch)
+    assert result == {'url': url, 'filename': 'tool-1.2.0-linux-amd64.tar.gz'}
+    assert fetch.calls == []
+
+def test_github_tag_with_single_asset():
+    fetch = RecordedFetch({
+        'https://api.github.com/repos/example/tool/releases/tags/v1.2.0': (200, 'github_release_single_asset.json')
+    })
+    result = GitHubReleaseResolver().resolve('https://github.com/example/tool/releases/tag/v1.2.0', fetch)
+    assert result == {
+        'url': 'https://github.com/example/tool/releases/download/v1.2.0/tool-1.2.0-linux-amd64.tar.gz',
+        'filename': 'tool-1.2.0-linux-amd64.tar.gz',
+        'size': 7340032,
+    }
+    assert fetch.calls[0][1] == {'Accept': 'application/vnd.github+json'}
+
+def test_github_latest_with_multiple_assets_lists_names():
+    fetch = RecordedFetch({
+        'https://api.github.com/repos/example/tool/releases/latest': (200, 'github_release_multi_asset.json')
+    })
+    with pytest.raises(ResolverError, match='2 asset.*tool-1.3.0-windows-amd64.zip'):
+        GitHubReleaseResolver().resolve('https://github.com/example/tool/releases/latest', fetch)
+
+def test_github_api_error_status():
+    fetch = RecordedFetch({
+        'https://api.github.com/repos/example/tool/releases/tags/v9.9.9': (404, 'github_not_found.json')
+    })
+    with pytest.raises(ResolverError, match='404'):
+        GitHubReleaseResolver().resolve('https://github.com/example/tool/releases/tag/v9.9.9', fetch)
+
+def test_mediafire_download_button():
+    url = 'https://www.mediafire.com/file/q1w2e3r4t5y6u7i/report-2024.pdf/file'
+    fetch = RecordedFetch({url: (200, 'mediafire_file_page.html')})
+    result = MediaFireResolver().resolve(url, fetch)
+    assert result == {
+        'url': 'https://download1234.mediafire.com/abcdEFGHijkl/q1w2e3r4t5y6u7i/report-2024.pdf',
+        'filename': 'report-2024.pdf',
+    }
+
+def test_mediafire_page_without_link():
+    url = 'https://www.mediafire.com/file/zzzzzzzzzzzzzzz/gone.zip/file'
+    fetch = RecordedFetch({url: (200, 'mediafire_removed_page.html')})
+    with pytest.raises(ResolverError, match='tidak ditemukan'):
+        MediaFireResolver().resolve(url, fetch)
+
+def test_find_resolver_routing():
+    assert find_resolver('https://www.dropbox.com/s/abc/file.zip?dl=0').name == 'dropbox'
+    assert find_resolver('https://1drv.ms/u/s!abc').name == 'onedrive'
+    assert find_resolver('https://github.com/example/tool/releases/latest').name == 'github'
+    assert find_resolver('https://github.com/example/tool/archive/main.zip') is None
+    assert find_resolver('https://example.com/file.zip') is None
+
+def test_resolve_source_caches_per_ttl(monkeypatch):
+    monkeypatch.setattr(resolvers, '_resolution_cache', {})
+    url = 'https://www.mediafire.com/file/q1w2e3r4t5y6u7i/report-2024.pdf/file'
+    fetch = RecordedFetch({url: (200, 'mediafire_file_page.html')})
+    first = asyncio.run(resolve_source(url, fetch))
+    second = asyncio.run(resolve_source(url, fetch))
+    assert first['resolver'] == 'mediafire'
+    assert second == first
+    assert len(fetch.calls) == 1
+
+def test_resolver_without_resolve_cannot_be_created():
+    class Incomplete(SourceResolver):
+        hosts = ('example.com',)
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_resolve_source_evicts_oldest_when_full(monkeypatch):
+    monkeypatch.setattr(resolvers, '_resolution_cache', {})
+    monkeypatch.setattr(ResolverConfig, 'CACHE_MAX_ENTRIES', 3)
+    urls = [f'https://www.dropbox.com/s/{name}/file.zip?dl=0' for name in 'abcd']
+    for url in urls:
+        asyncio.run(resolve_source(url, RecordedFetch()))
+    assert list(resolvers._resolution_cache) == urls[1:]
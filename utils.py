@@ -1,3 +1,5 @@
+import re
+
 def format_bytes(size):
     if size is None:
         return "Tidak diketahui"
@@ -9,6 +11,14 @@ def format_bytes(size):
         n += 1
     return f"{size:.2f} {power_labels[n]}B"
 
+def parse_bytes(text):
+    """Parse ukuran seperti '512K', '10M', '1.5G' atau '1048576' menjadi bytes"""
+    match = re.fullmatch(r'([\d.]+)\s*([KMGT]?)(?:B)?(?:/S)?', text.strip().upper())
+    if not match:
+        raise ValueError(f"Format ukuran tidak valid: {text}")
+    multipliers = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    return int(float(match.group(1)) * multipliers[match.group(2)])
+
 def format_time(seconds):
     """Format seconds into human readable time (days, hours, minutes, seconds)"""
     if seconds is None or seconds < 0:
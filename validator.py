@@ -9,11 +9,16 @@ from typing import Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from config import DownloadConfig, ErrorMessages, GoogleDriveConfig
 from utils import format_bytes
+from drive_source import parse_drive_url, validate_drive_url, direct_download_url
+from resolvers import resolve_source, ResolverError
+from http_layer import install as install_http_layer, prefetch
 import logging
 
 # Setup logger untuk validator
 logger = logging.getLogger(__name__)
 
+install_http_layer()
+
 # Simple cache untuk hasil validasi
 _validation_cache: Dict[str, Tuple[dict, datetime]] = {}
 _circuit_breaker_failures: Dict[str, int] = {}
@@ -60,6 +65,94 @@ def get_validator_stats() -> dict:
         'circuit_breaker_active': sum(1 for count in _circuit_breaker_failures.values() if count >= 5)
     }
 
+def _file_info_from_response(url: str, resp, resolved: Optional[dict] = None) -> Tuple[bool, dict]:
+    """
+    Bangun info file (nama, ukuran, tipe, ETag/Last-Modified) dari header response HEAD/GET.
+    
+    Returns:
+        Tuple[bool, dict]: (is_valid, result_data)
+    """
+    content_type = resp.headers.get('Content-Type', '')
+    content_length = resp.headers.get('Content-Length', None)
+    
+    # Validasi konten berdasarkan header
+    if content_length:
+        try:
+            file_size = int(content_length)
+            if file_size > GoogleDriveConfig.MAX_FILE_SIZE_BYTES:
+                max_size_formatted = format_bytes(GoogleDriveConfig.MAX_FILE_SIZE_BYTES)
+                return False, {"error": f"File terlalu besar. Maksimal: {max_size_formatted}"}
+            if file_size == 0:
+                return False, {"error": "File kosong (0 bytes)"}
+        except ValueError:
+            return False, {"error": "Ukuran file tidak valid"}
+    
+    # Validasi tipe konten
+    if content_type and not any(valid_type in content_type.lower() for valid_type in ['application/', 'video/', 'audio/', 'image/', 'text/']):
+        # Cek apakah ini file yang valid (bukan halaman web)
+        if 'text/html' in content_type.lower():
+            return False, {"error": "URL mengarah ke halaman web, bukan file download"}
+    
+    # Ekstrak nama file dari URL dengan membersihkan parameter
+    parsed_url = urlparse(url)
+    filename = unquote(parsed_url.path.split('/')[-1])
+    
+    # Jika nama file kosong atau tidak valid, buat nama default
+    if not filename or '.' not in filename:
+        # Coba dapatkan nama dari Content-Disposition header
+        content_disp = resp.headers.get('Content-Disposition', '')
+        if 'filename=' in content_disp:
+            try:
+                filename = content_disp.split('filename=')[-1].strip('"\'')
+            except:
+                pass
+        
+        # Jika masih tidak ada nama file, buat nama default
+        if not filename:
+            ext = mimetypes.guess_extension(content_type.split(';')[0].strip()) if content_type else '.bin'
+            filename = f"download{ext or '.unknown'}"
+        
+        # Jika masih tidak ada nama file, buat default berdasarkan tipe
+        if not filename or '.' not in filename:
+            ext = mimetypes.guess_extension(content_type.split(';')[0].strip()) or '.bin'
+            filename = f"downloaded_file{ext}"
+    
+    # Perbaiki tipe konten jika generic
+    if content_type == 'application/octet-stream' or not content_type:
+        # Tebak tipe dari ekstensi file
+        guessed_type, _ = mimetypes.guess_type(filename)
+        if guessed_type:
+            content_type = guessed_type
+        else:
+            content_type = 'application/octet-stream'
+    
+    # Sumber tanpa Content-Length (chunked/dibuat dinamis) tetap valid dengan ukuran None:
+    # di-stream dengan Content-Range terbuka dan dibatasi MAX_FILE_SIZE_BYTES selama transfer,
+    # tanpa request tambahan untuk mencari ukurannya
+    size = int(content_length) if content_length else None
+    
+    # Nama dari resolver lebih akurat daripada path URL download; ukuran dari resolver
+    # (mis. asset GitHub) dipakai jika server download tidak mengirim Content-Length
+    if resolved and resolved.get('filename'):
+        filename = resolved['filename']
+    if size is None and resolved and resolved.get('size'):
+        size = int(resolved['size'])
+        if size > GoogleDriveConfig.MAX_FILE_SIZE_BYTES:
+            return False, {"error": f"File terlalu besar. Maksimal: {format_bytes(GoogleDriveConfig.MAX_FILE_SIZE_BYTES)}"}
+    
+    # Buat hasil validasi
+    result = {
+        'filename': filename, 
+        'size': size, 
+        'type': content_type,
+        'url': url,  # Simpan URL asli untuk reference
+        'etag': resp.headers.get('ETag'),
+        'last_modified': resp.headers.get('Last-Modified'),
+        # Ekstrak zip membaca central directory lewat Range, jadi hanya ditawarkan jika didukung
+        'accept_ranges': resp.headers.get('Accept-Ranges', '').lower() == 'bytes'
+    }
+    return True, result
+
 async def validate_url_and_file(url: str) -> Tuple[bool, dict]:
     """
     Validasi URL dan file dengan caching, circuit breaker, dan exponential backoff.
@@ -72,6 +165,29 @@ async def validate_url_and_file(url: str) -> Tuple[bool, dict]:
     if not url:
         return False, {"error": "URL kosong"}
     
+    # Link Google Drive divalidasi lewat API agar bisa di-copy server-side
+    drive_link = parse_drive_url(url)
+    if drive_link:
+        kind, file_id = drive_link
+        drive_result = await validate_drive_url(url, kind, file_id)
+        if drive_result is not None:
+            return drive_result
+        if kind == 'folder':
+            return False, {"error": "Folder Google Drive tidak dapat diakses dengan kredensial bot"}
+        # Tidak bisa dibaca lewat API, coba sebagai file publik lewat URL download langsung
+        url = direct_download_url(file_id)
+    
+    # Link halaman hosting (GitHub, Dropbox, OneDrive, ...) diubah ke URL download langsung
+    try:
+        resolved = await resolve_source(url)
+    except ResolverError as e:
+        return False, {"error": str(e)}
+    except Exception as e:
+        logger.warning(f"Resolver gagal untuk URL {url[:50]}...: {e}")
+        return False, {"error": f"{ErrorMessages.VALIDATION_ERROR}: {e}"}
+    if resolved:
+        url = resolved['url']
+    
     # Check circuit breaker
     if _should_use_circuit_breaker(url):
         domain = urlparse(url).netloc
@@ -86,6 +202,9 @@ async def validate_url_and_file(url: str) -> Tuple[bool, dict]:
             logger.info(f"Cache hit untuk URL: {url[:50]}...")
             return True, cached_result
     
+    # Resolve host di thread agar HEAD di bawah tidak memblokir event loop untuk DNS
+    await prefetch(url)
+
     # Session untuk connection reuse
     session = requests.Session()
     session.headers.update({
@@ -97,9 +216,11 @@ async def validate_url_and_file(url: str) -> Tuple[bool, dict]:
     
     for attempt in range(DownloadConfig.MAX_RETRIES):
         try:
-            resp = session.head(
-                url, 
-                allow_redirects=True, 
+            # HEAD di thread agar validasi bersamaan (batch, probe crawler) tidak memblokir event loop
+            resp = await asyncio.to_thread(
+                session.head,
+                url,
+                allow_redirects=True,
                 timeout=DownloadConfig.TIMEOUT
             )
             
@@ -167,89 +288,76 @@ async def validate_url_and_file(url: str) -> Tuple[bool, dict]:
         error_msg = last_error or f"Gagal validasi URL setelah {DownloadConfig.MAX_RETRIES} percobaan"
         return False, {"error": error_msg}
     
-    # Proses response yang valid
-    content_type = resp.headers.get('Content-Type', '')
-    content_length = resp.headers.get('Content-Length', None)
-    
-    # Validasi konten berdasarkan header
-    if content_length:
-        try:
-            file_size = int(content_length)
-            if file_size > GoogleDriveConfig.MAX_FILE_SIZE_BYTES:
-                max_size_formatted = format_bytes(GoogleDriveConfig.MAX_FILE_SIZE_BYTES)
-                return False, {"error": f"File terlalu besar. Maksimal: {max_size_formatted}"}
-            if file_size == 0:
-                return False, {"error": "File kosong (0 bytes)"}
-        except ValueError:
-            return False, {"error": "Ukuran file tidak valid"}
-    
-    # Validasi tipe konten
-    if content_type and not any(valid_type in content_type.lower() for valid_type in ['application/', 'video/', 'audio/', 'image/', 'text/']):
-        # Cek apakah ini file yang valid (bukan halaman web)
-        if 'text/html' in content_type.lower():
-            return False, {"error": "URL mengarah ke halaman web, bukan file download"}
-    
-    # Ekstrak nama file dari URL dengan membersihkan parameter
-    parsed_url = urlparse(url)
-    filename = unquote(parsed_url.path.split('/')[-1])
+    valid, result = _file_info_from_response(url, resp, resolved)
+    if not valid:
+        return False, result
+    size = result['size']
+    filename = result['filename']
     
-    # Jika nama file kosong atau tidak valid, buat nama default
-    if not filename or '.' not in filename:
-        # Coba dapatkan nama dari Content-Disposition header
-        content_disp = resp.headers.get('Content-Disposition', '')
-        if 'filename=' in content_disp:
-            try:
-                filename = content_disp.split('filename=')[-1].strip('"\'')
-            except:
-                pass
-        
-        # Jika masih tidak ada nama file, buat nama default
-        if not filename:
-            ext = mimetypes.guess_extension(content_type.split(';')[0].strip()) if content_type else '.bin'
-            filename = f"download{ext or '.unknown'}"
-        
-        # Jika masih tidak ada nama file, buat default berdasarkan tipe
-        if not filename or '.' not in filename:
-            ext = mimetypes.guess_extension(content_type.split(';')[0].strip()) or '.bin'
-            filename = f"downloaded_file{ext}"
+    # Simpan ke cache untuk optimasi berikutnya
+    cache_key = _get_cache_key(url)
+    _validation_cache[cache_key] = (result, datetime.now())
+    logger.info(f"Validasi sukses untuk URL: {url[:50]}... | File: {filename} | Size: {format_bytes(size)}")
+    if size is None:
+        logger.info(f"Sumber {url[:50]}... tidak mengirim Content-Length, ukuran diketahui setelah transfer selesai")
     
-    # Perbaiki tipe konten jika generic
-    if content_type == 'application/octet-stream' or not content_type:
-        # Tebak tipe dari ekstensi file
-        guessed_type, _ = mimetypes.guess_type(filename)
-        if guessed_type:
-            content_type = guessed_type
-        else:
-            content_type = 'application/octet-stream'
+    # Record success untuk circuit breaker
+    _record_success(url)
     
-    # Validasi ukuran file
-    if not content_length:
-        return False, {"error": "Tidak dapat mengetahui ukuran file"}
+    return True, result
+
+async def check_for_update(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Tuple[bool, dict]:
+    """
+    Re-validasi kondisional untuk job terjadwal: satu HEAD dengan If-None-Match/If-Modified-Since.
+    304 (atau ETag/Last-Modified yang sama dari server yang mengabaikan header kondisional)
+    berarti sumber tidak berubah sehingga tidak perlu transfer.
     
+    Returns:
+        Tuple[bool, dict]: (changed, result_data). result_data berisi "error" jika gagal,
+        kosong jika tidak berubah, atau info file seperti validate_url_and_file jika berubah
+    """
+    url = url.strip()
     try:
-        size = int(content_length)
-        if size > GoogleDriveConfig.MAX_FILE_SIZE_BYTES:
-            max_size_formatted = format_bytes(GoogleDriveConfig.MAX_FILE_SIZE_BYTES)
-            return False, {"error": f"Ukuran file melebihi {max_size_formatted}"}
-        if size == 0:
-            return False, {"error": "File kosong (0 bytes)"}
-    except ValueError:
-        return False, {"error": "Ukuran file tidak valid"}
+        resolved = await resolve_source(url)
+    except Exception as e:
+        return False, {"error": str(e)}
+    if resolved:
+        url = resolved['url']
+    if _should_use_circuit_breaker(url):
+        return False, {"error": "Server terlalu sering gagal. Coba lagi nanti."}
     
-    # Buat hasil validasi
-    result = {
-        'filename': filename, 
-        'size': size, 
-        'type': content_type,
-        'url': url  # Simpan URL asli untuk reference
-    }
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
     
-    # Simpan ke cache untuk optimasi berikutnya
-    cache_key = _get_cache_key(url)
-    _validation_cache[cache_key] = (result, datetime.now())
-    logger.info(f"Validasi sukses untuk URL: {url[:50]}... | File: {filename} | Size: {format_bytes(size)}")
+    await prefetch(url)
+    try:
+        resp = await asyncio.to_thread(
+            requests.head, url, headers=headers, allow_redirects=True, timeout=DownloadConfig.TIMEOUT
+        )
+    except requests.RequestException as e:
+        _record_failure(url)
+        logger.warning(f"Cek update gagal: {e}")
+        return False, {"error": ErrorMessages.CONNECTION_ERROR}
     
-    # Record success untuk circuit breaker
+    if resp.status_code == 304:
+        _record_success(url)
+        return False, {}
+    if resp.status_code != 200:
+        _record_failure(url)
+        return False, {"error": f"URL tidak dapat diakses. Status: {resp.status_code}"}
     _record_success(url)
     
-    return True, result
\ No newline at end of file
+    new_etag = resp.headers.get('ETag')
+    new_modified = resp.headers.get('Last-Modified')
+    if (etag and new_etag == etag) or (not etag and last_modified and new_modified == last_modified):
+        logger.info(f"Sumber {url[:50]}... tidak berubah (server mengabaikan header kondisional)")
+        return False, {}
+    
+    valid, result = _file_info_from_response(url, resp, resolved)
+    if not valid:
+        return False, result
+    _validation_cache[_get_cache_key(url)] = (result, datetime.now())
+    return True, result
@@ -0,0 +1,356 @@
+# Pool proses worker untuk transfer, komunikasi progress/cancel/hasil lewat Pipe
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import Counter
+from bandwidth import BandwidthManager, DIRECTIONS, PRIORITY_NORMAL
+from config import BandwidthConfig
+from log_pipeline import setup_logging
+from runtime_config import runtime_settings
+from pause_control import PauseControl
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Sisi proses worker
+# ---------------------------------------------------------------------------
+
+class _RemoteBandwidth:
+    """
+    Pengganti bandwidth_manager di proses worker. Throttle diteruskan ke proses bot agar
+    batas global/per user tetap berlaku lintas worker, tetapi per REMOTE_GRANT_BATCH_KB
+    (bukan per blok baca) agar IPC dan event loop bot tidak berada di jalur setiap blok.
+    Arah tanpa batas sama sekali tidak meminta token; statusnya dicek ulang paling
+    lambat setiap REMOTE_LIMIT_RECHECK detik lewat jawaban grant.
+    """
+    priority_for = staticmethod(BandwidthManager.priority_for)
+
+    def __init__(self, runner, job_id, limited=None):
+        self.runner = runner
+        self.job_id = job_id
+        self.debt = Counter()  # arah -> byte yang belum dimintakan token
+        now = time.monotonic()
+        # arah -> batas waktu arah ini dianggap tanpa batas
+        self.unlimited_until = {direction: now + BandwidthConfig.REMOTE_LIMIT_RECHECK
+                                for direction, is_limited in (limited or {}).items() if not is_limited}
+
+    async def throttle(self, direction, nbytes, user_id=None, priority=PRIORITY_NORMAL):
+        recheck = False
+        if direction in self.unlimited_until:
+            if time.monotonic() < self.unlimited_until[direction]:
+                return
+            del self.unlimited_until[direction]
+            recheck = True
+        self.debt[direction] += nbytes
+        if not recheck and self.debt[direction] < BandwidthConfig.REMOTE_GRANT_BATCH_KB * 1024:
+            return
+        nbytes, self.debt[direction] = self.debt[direction], 0
+        limited = await self.runner.request_grant(self.job_id, direction, nbytes, user_id, priority)
+        if not limited:
+            self.unlimited_until[direction] = time.monotonic() + BandwidthConfig.REMOTE_LIMIT_RECHECK
+
+class _WorkerRunner:
+    """
+    Loop utama proses worker. Thread pembaca menjadi satu-satunya pembaca Pipe:
+    job masuk ke antrean, cancel dan grant bandwidth diteruskan ke event loop job aktif,
+    snapshot konfigurasi runtime langsung diterapkan (dibaca job di batas chunk berikutnya).
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.jobs = queue.Queue()
+        self.send_lock = threading.Lock()
+        self.loop = None
+        self.current_job_id = None
+        self.cancel_event = None
+        self.pause = None
+        self.pending_pause = {}
+        self.cancelled_ids = set()
+        self.grants = {}
+        self.grant_ids = itertools.count()
+
+    def send(self, message):
+        with self.send_lock:
+            self.conn.send(message)
+
+    def _read_loop(self):
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                self.jobs.put(None)
+                return
+
+            kind = message.get('type')
+            if kind in ('job', 'shutdown'):
+                self.jobs.put(message if kind == 'job' else None)
+            elif kind == 'cancel':
+                self.cancelled_ids.add(message['job_id'])
+                if message['job_id'] == self.current_job_id and self.loop:
+                    self.loop.call_soon_threadsafe(self.cancel_event.set)
+            elif kind == 'pause':
+                if message['job_id'] == self.current_job_id and self.loop:
+                    action = self.pause.pause if message['paused'] else self.pause.resume
+                    self.loop.call_soon_threadsafe(action)
+                else:
+                    # Job belum dimulai, status terakhir dipakai saat job mulai
+                    self.pending_pause[message['job_id']] = message['paused']
+            elif kind == 'config':
+                runtime_settings.apply_values(message['values'])
+            elif kind == 'grant' and self.loop:
+                future = self.grants.pop(message['grant_id'], None)
+                if future:
+                    self.loop.call_soon_threadsafe(future.set_result, message.get('limited', True))
+
+    async def request_grant(self, job_id, direction, nbytes, user_id, priority):
+        """Minta token nbytes ke proses bot, mengembalikan True jika arah ini masih dibatasi"""
+        future = self.loop.create_future()
+        grant_id = next(self.grant_ids)
+        self.grants[grant_id] = future
+        self.send({
+            'type': 'throttle', 'job_id': job_id, 'grant_id': grant_id,
+            'direction': direction, 'nbytes': nbytes, 'user_id': user_id, 'priority': priority
+        })
+        return await future
+
+    async def _run_job(self, job):
+        # Import di sini agar modul transfer hanya dimuat di proses worker
+        from downloader import stream_download_to_drive, mirror_small_batch
+        from archive_extract import extract_archive_to_drive
+        from crawler import mirror_directory
+        from drive_index import route_destinations
+        from http_layer import get_net_stats
+
+        job_id = job['job_id']
+        self.cancel_event = asyncio.Event()
+        self.pause = PauseControl(self.pending_pause.pop(job_id, job.get('paused', False)))
+        self.current_job_id = job_id
+        self.loop = asyncio.get_running_loop()
+        # Cancel yang datang sebelum job sempat dimulai
+        if job_id in self.cancelled_ids:
+            self.cancel_event.set()
+
+        async def progress_callback(percent, **kwargs):
+            self.send({'type': 'progress', 'job_id': job_id, 'percent': percent, 'kwargs': kwargs})
+
+        bandwidth = _RemoteBandwidth(self, job_id, job.get('limited'))
+        try:
+            job = dict(job, destinations=await asyncio.to_thread(route_destinations, job.get('destinations'), job['user_id']))
+            if job.get('crawl'):
+                result = await mirror_directory(
+                    job['url'], progress_callback, self.cancel_event, job['user_id'], bandwidth, job.get('destinations'),
+                    pause=self.pause
+                )
+            elif job.get('extract'):
+                result = await extract_archive_to_drive(
+                    job['url'], job['info'], progress_callback, self.cancel_event, job['user_id'], bandwidth,
+                    job.get('destinations')
+                )
+            elif job.get('batch'):
+                await mirror_small_batch(job['batch'], progress_callback, self.cancel_event, job['user_id'], bandwidth, job.get('destinations'))
+                result = None
+            else:
+                result = await stream_download_to_drive(
+                    job['url'], job['info'], progress_callback, self.cancel_event, job['user_id'], bandwidth,
+                    job.get('destinations'), self.pause
+                )
+        except Exception as e:
+            logger.exception(f"Job {job_id} gagal di worker: {e}")
+            result = f"🚨 Error: {e} 🚨"
+        finally:
+            self.current_job_id = None
+            self.cancelled_ids.discard(job_id)
+            self.pending_pause.pop(job_id, None)
+        self.send({'type': 'result', 'job_id': job_id, 'result': result, 'net_stats': get_net_stats()})
+
+    def run(self):
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            asyncio.run(self._run_job(job))
+            self.loop = None
+
+def _worker_main(conn):
+    """Entry point proses worker"""
+    setup_logging()
+    _WorkerRunner(conn).run()
+
+# ---------------------------------------------------------------------------
+# Sisi proses bot (supervisor)
+# ---------------------------------------------------------------------------
+
+class _WorkerHandle:
+    """Satu proses worker beserta Pipe dan job yang sedang dijalankan"""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.events = None  # asyncio.Queue event untuk job aktif
+
+class TransferWorkerPool:
+    """
+    Menjalankan transfer di proses worker terpisah agar loop transfer, hashing dan TLS
+    tidak bersaing GIL dengan event loop bot. Satu worker menjalankan satu job sekaligus.
+    """
+
+    def __init__(self, size, bandwidth):
+        self.size = size
+        self.bandwidth = bandwidth
+        self.context = multiprocessing.get_context('spawn')
+        self.job_ids = itertools.count(1)
+        self._idle = None
+        self._workers = []
+        self.config = None  # snapshot konfigurasi runtime terakhir, dikirim juga ke worker baru
+        self.worker_stats = {}  # pid -> statistik jaringan dari job terakhir worker
+
+    async def start(self):
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._idle.put_nowait(self._spawn())
+        logger.info(f"Transfer worker pool aktif dengan {self.size} proses")
+
+    def _spawn(self):
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        worker = _WorkerHandle(process, parent_conn)
+        asyncio.get_running_loop().add_reader(parent_conn.fileno(), self._on_readable, worker)
+        if self.config:
+            parent_conn.send({'type': 'config', 'values': self.config})
+        self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker):
+        """Lepas worker yang mati dari event loop"""
+        try:
+            asyncio.get_running_loop().remove_reader(worker.conn.fileno())
+        except Exception:
+            pass
+        worker.conn.close()
+        self.worker_stats.pop(worker.process.pid, None)
+        if worker in self._workers:
+            self._workers.remove(worker)
+
+    def _usable(self, worker):
+        """
+        Worker boleh dipakai lagi hanya jika masih terdaftar dan Pipe-nya terbuka.
+        Setelah _retire() (mis. EOF di Pipe) proses bisa masih hidup sesaat, jadi
+        is_alive() saja tidak cukup.
+        """
+        return worker in self._workers and not worker.conn.closed and worker.process.is_alive()
+
+    def _replace(self, worker):
+        """Pensiunkan worker yang tidak bisa dipakai (hentikan prosesnya jika masih hidup) dan buat penggantinya"""
+        self._retire(worker)
+        if worker.process.is_alive():
+            worker.process.terminate()
+        return self._spawn()
+
+    def _on_readable(self, worker):
+        try:
+            while worker.conn.poll():
+                message = worker.conn.recv()
+                if message['type'] == 'throttle':
+                    asyncio.create_task(self._grant(worker, message))
+                elif worker.events is not None:
+                    worker.events.put_nowait(message)
+        except (EOFError, OSError):
+            logger.error(f"Worker pid={worker.process.pid} berhenti tiba-tiba")
+            self._retire(worker)
+            if worker.events is not None:
+                worker.events.put_nowait({'type': 'result', 'result': "🚨 Error: worker transfer berhenti tiba-tiba 🚨"})
+
+    async def _grant(self, worker, message):
+        await self.bandwidth.throttle(message['direction'], message['nbytes'], message['user_id'], message['priority'])
+        try:
+            worker.conn.send({
+                'type': 'grant', 'grant_id': message['grant_id'],
+                'limited': self.bandwidth.is_limited(message['direction'], message['user_id'])
+            })
+        except (OSError, ValueError):
+            pass
+
+    async def _watch_cancel(self, worker, job_id, cancellation_event):
+        await cancellation_event.wait()
+        try:
+            worker.conn.send({'type': 'cancel', 'job_id': job_id})
+        except (OSError, ValueError):
+            pass
+
+    async def run(self, job, progress_callback=None, cancellation_event=None, pause=None):
+        """
+        Jalankan job di worker yang sedang idle dan teruskan progress ke progress_callback.
+        job: dict berisi url, info, user_id, destinations, extract, crawl (dan batch untuk batch file kecil).
+        pause: PauseControl opsional, setiap perubahan status diteruskan ke worker.
+        """
+        worker = await self._idle.get()
+        if not self._usable(worker):
+            worker = self._replace(worker)
+
+        job_id = next(self.job_ids)
+        worker.events = asyncio.Queue()
+        watcher = asyncio.create_task(self._watch_cancel(worker, job_id, cancellation_event)) if cancellation_event else None
+
+        def forward_pause(paused):
+            try:
+                worker.conn.send({'type': 'pause', 'job_id': job_id, 'paused': paused})
+            except (OSError, ValueError):
+                pass
+
+        if pause:
+            pause.add_listener(forward_pause)
+        try:
+            limited = {direction: self.bandwidth.is_limited(direction, job.get('user_id')) for direction in DIRECTIONS}
+            worker.conn.send(dict(job, type='job', job_id=job_id, paused=bool(pause and pause.paused), limited=limited))
+            while True:
+                message = await worker.events.get()
+                if message['type'] == 'progress':
+                    if progress_callback:
+                        await progress_callback(message['percent'], **message['kwargs'])
+                elif message['type'] == 'result':
+                    if 'net_stats' in message:
+                        self.worker_stats[worker.process.pid] = message['net_stats']
+                    return message['result']
+        finally:
+            if watcher:
+                watcher.cancel()
+            if pause:
+                pause.remove_listener(forward_pause)
+            worker.events = None
+            if self._usable(worker):
+                self._idle.put_nowait(worker)
+            else:
+                self._idle.put_nowait(self._replace(worker))
+
+    def update_config(self, values):
+        """Kirim snapshot konfigurasi runtime ke semua worker, termasuk yang sedang menjalankan job"""
+        self.config = values
+        for worker in list(self._workers):
+            try:
+                worker.conn.send({'type': 'config', 'values': values})
+            except (OSError, ValueError):
+                pass
+
+    async def stop(self):
+        """Hentikan semua worker"""
+        loop = asyncio.get_running_loop()
+        for worker in list(self._workers):
+            try:
+                loop.remove_reader(worker.conn.fileno())
+                worker.conn.send({'type': 'shutdown'})
+            except (OSError, ValueError):
+                pass
+        for worker in list(self._workers):
+            await asyncio.to_thread(worker.process.join, 5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            self._retire(worker)
+        logger.info("Transfer worker pool dihentikan")